@@ -1,18 +1,48 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Response
+from fastapi.responses import StreamingResponse
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 import osmnx as ox
 import networkx as nx
 import folium
-from datetime import datetime
+from datetime import datetime, timedelta
 from typing import List, Dict, Optional
 import json
+import os
 import psycopg2
 from psycopg2.extras import RealDictCursor
 import math
 import requests
 import numpy as np
-import pickle
+import struct
+import copy
+import itertools
+import time
+from edge_weighting import GraphArrays, VectorizedEdgeWeighter
+from graph_store import GraphStore
+from graph_cache import RegionGraphCache
+from path_diversity import DiversePathFinder, PENALTY_STEP
+from route_search import (RouteSearch, Landmarks, heuristic_rate, edge_lower_bounds,
+                          dijkstra_to_targets, dijkstra_within, PARETO_MAX_ROUTES)
+from cch import CCH
+from spatial_index import PointIndex
+from incident_feed import IncidentFeed
+from db_pool import get_pool
+from route_workers import RouteWorkerPool
+from route_cache import RouteCache
+from feedback_learner import FeedbackLearner, road_seconds_by_class
+from weight_artifact import load_weight_artifact, check_legacy_pickle
+from session_store import make_session_store
+from speed_observations import (make_speed_store, match_position_pairs, speed_bucket,
+                                OBSERVED_SPEED_REFRESH_SECONDS)
+from polyline import encode_polyline, POLYLINE_PRECISION
+from navigation_timing import navigation_timing
+from snapping import GraphSnapper
+from vector_tiles import (TileCache, tile_bbox, valid_tile, segments_in_bbox, render_tile,
+                          EMPTY_SEGMENTS, ROAD_TILE_MIN_ZOOM, MVT_MEDIA_TYPE)
+from isochrone import (isochrone_polygons, ISOCHRONE_MAX_MINUTES, ISOCHRONE_MAX_BUDGETS,
+                       ISOCHRONE_CACHE_SIZE)
 
 app = FastAPI()
 
@@ -33,8 +63,9 @@ DB_CONFIG = {
     'port': 5432
 }
 
-def get_db_connection():
-    return psycopg2.connect(**DB_CONFIG)
+# Shared pool; use `with db_pool.connection() as conn` and keep async handlers
+# off the event loop with `await db_pool.run(...)`
+db_pool = get_pool(DB_CONFIG)
 
 # Realistic Bangalore city speeds (based on actual traffic conditions)
 INCIDENT_TYPE_MAPPING = {
@@ -53,8 +84,18 @@ SPEED_RANGES = {
     'RC': {'avg': 2, 'color': '#660000', 'name': 'Road Closed'} # Nearly blocked
 }
 
-optimizer_cache = {}
-active_sessions = {}
+# TTL-bounded; shared across uvicorn workers when SESSION_STORE_PATH is set
+active_sessions = make_session_store()
+graph_store = GraphStore()
+
+# 'dijkstra' (no heuristic), 'astar', 'bidirectional', 'alt' (bidirectional + landmarks)
+# or 'cch' (customizable contraction hierarchy over the whole stored region)
+ROUTE_SEARCH_MODE = os.getenv('ROUTE_SEARCH_MODE', 'bidirectional')
+# /api/optimize-route modes: K diverse routes on combined_weight, or the Pareto front
+ROUTE_MODES = ('diverse', 'pareto')
+# How diverse alternatives are generated: overlap penalties, or via-node alternatives
+DIVERSITY_METHODS = ('penalty', 'via')
+PARETO_OBJECTIVES = ('travel_time', 'cost', 'fuel')
 
 class RouteRequest(BaseModel):
     src_lat: float
@@ -62,6 +103,40 @@ class RouteRequest(BaseModel):
     dst_lat: float
     dst_lon: float
     scenario: str = "personal"
+    departure_time: Optional[datetime] = None  # defaults to now
+    time_dependent: bool = False  # evaluate each edge at its arrival time (hourly profiles)
+    mode: str = "diverse"  # or "pareto": non-dominated routes over travel time, cost and fuel
+    diversity: str = "penalty"  # diverse mode only: "penalty" or "via"
+
+class SnapTraceRequest(BaseModel):
+    points: List[List[float]]  # [[lat, lon], ...]
+
+class MatrixRequest(BaseModel):
+    sources: List[List[float]]  # [[lat, lon], ...]
+    targets: List[List[float]]
+    scenario: str = "logistics"
+    weight: str = "combined_weight"  # what each path minimizes: combined_weight, travel_time or length
+
+class IsochroneRequest(BaseModel):
+    lat: float
+    lon: float
+    scenario: str = "personal"
+    departure_time: Optional[datetime] = None  # defaults to now
+    budgets_minutes: List[float] = [10, 20, 30]
+
+class NavigationPosition(BaseModel):
+    session_id: str
+    lat: float
+    lon: float
+    timestamp: Optional[datetime] = None  # defaults to now
+
+class TracePosition(BaseModel):
+    lat: float
+    lon: float
+    timestamp: datetime
+
+class PositionTrace(BaseModel):
+    positions: List[TracePosition]  # consecutive positions of one vehicle, oldest first
 
 class NavigationSession(BaseModel):
     user_id: Optional[str] = "guest"
@@ -71,6 +146,7 @@ class NavigationSession(BaseModel):
     src_lon: float
     dst_lat: float
     dst_lon: float
+    scenario: str = "personal"
 
 # ============================================================================
 # ADAPTIVE OPTIMIZER CLASSES (Embedded)
@@ -81,56 +157,52 @@ class IncidentDataFetcher:
     
     def __init__(self, db_config: dict):
         self.db_config = db_config
+        self.db_pool = get_pool(db_config)
         self.incident_severity = INCIDENT_TYPE_MAPPING
     
-    def fetch_incidents(self, bbox: tuple = None) -> List[dict]:
-        """Fetch incidents with optional bounding box filter"""
-        try:
-            conn = psycopg2.connect(**self.db_config)
+    def query_incidents(self, bbox: tuple = None, since: datetime = None) -> List[dict]:
+        """Incidents from the last 24 hours, optionally within bbox and at or after `since`; raises on DB errors"""
+        conditions = ["latitude IS NOT NULL", "longitude IS NOT NULL",
+                      "sd > NOW() - INTERVAL '24 hours'"]
+        params = []
+        if bbox:
+            min_lat, min_lon, max_lat, max_lon = bbox
+            conditions += ["latitude BETWEEN %s AND %s", "longitude BETWEEN %s AND %s"]
+            params += [min_lat, max_lat, min_lon, max_lon]
+        if since is not None:
+            conditions.append("sd >= %s")
+            params.append(since)
+        
+        query = f"""
+            SELECT 
+                id, ty, latitude, longitude, cs, d, sd, f, t, l
+            FROM incidents
+            WHERE {' AND '.join(conditions)}
+            ORDER BY sd DESC
+        """
+        with self.db_pool.connection() as conn:
             cursor = conn.cursor(cursor_factory=RealDictCursor)
-            
-            if bbox:
-                min_lat, min_lon, max_lat, max_lon = bbox
-                query = """
-                    SELECT 
-                        id, ty, latitude, longitude, cs, d, sd, f, t, l
-                    FROM incidents
-                    WHERE latitude IS NOT NULL 
-                    AND longitude IS NOT NULL
-                    AND latitude BETWEEN %s AND %s
-                    AND longitude BETWEEN %s AND %s
-                    AND sd > NOW() - INTERVAL '24 hours'
-                    ORDER BY sd DESC
-                """
-                cursor.execute(query, (min_lat, max_lat, min_lon, max_lon))
-            else:
-                query = """
-                    SELECT 
-                        id, ty, latitude, longitude, cs, d, sd, f, t, l
-                    FROM incidents
-                    WHERE latitude IS NOT NULL 
-                    AND longitude IS NOT NULL
-                    AND sd > NOW() - INTERVAL '24 hours'
-                    ORDER BY sd DESC
-                """
-                cursor.execute(query)
-            
+            cursor.execute(query, params)
             incidents = cursor.fetchall()
             cursor.close()
-            conn.close()
-            
-            incident_list = []
-            for inc in incidents:
-                inc_dict = dict(inc)
-                ty = int(inc_dict.get('ty', 1))
-                severity = self.incident_severity.get(ty, self.incident_severity[1])
-                inc_dict.update({
-                    'severity': severity,
-                    'lat': float(inc_dict['latitude']),
-                    'lon': float(inc_dict['longitude'])
-                })
-                incident_list.append(inc_dict)
-            
+        
+        incident_list = []
+        for inc in incidents:
+            inc_dict = dict(inc)
+            ty = int(inc_dict.get('ty', 1))
+            severity = self.incident_severity.get(ty, self.incident_severity[1])
+            inc_dict.update({
+                'severity': severity,
+                'lat': float(inc_dict['latitude']),
+                'lon': float(inc_dict['longitude'])
+            })
+            incident_list.append(inc_dict)
+        return incident_list
+    
+    def fetch_incidents(self, bbox: tuple = None) -> List[dict]:
+        """Fetch incidents with optional bounding box filter"""
+        try:
+            incident_list = self.query_incidents(bbox)
             print(f"✓ Fetched {len(incident_list)} incidents")
             return incident_list
             
@@ -142,10 +214,16 @@ class IncidentDataFetcher:
 class TrafficDataSimulator:
     """Integrates real incidents with time-based patterns"""
     
-    def __init__(self, incident_fetcher: IncidentDataFetcher):
+    def __init__(self, incident_fetcher: IncidentDataFetcher, incident_feed: IncidentFeed = None):
         self.incident_fetcher = incident_fetcher
+        self.incident_feed = incident_feed
         self.incidents = []
-        self.incident_grid = {}
+        self.incident_index = None
+        # With a feed snapshot, incident_index is the snapshot's own index: incident_keep masks
+        # its rows to the loaded bbox and incident_pos maps a row to its position in incidents
+        self.incident_keep = None
+        self.incident_pos = None
+        self.snapshot_key = None
         
         self.hourly_congestion_factors = {
             7: 1.8, 8: 2.0, 9: 1.7,
@@ -163,22 +241,35 @@ class TrafficDataSimulator:
         }
     
     def load_incidents(self, bbox: tuple):
-        self.incidents = self.incident_fetcher.fetch_incidents(bbox)
-        self._build_incident_grid()
-    
-    def _build_incident_grid(self):
-        GRID_RES = 2000
-        self.incident_grid = {}
-        
-        for incident in self.incidents:
-            lat, lon = incident['lat'], incident['lon']
-            grid_x = int(lon * GRID_RES)
-            grid_y = int(lat * GRID_RES)
-            key = f"{grid_x},{grid_y}"
-            
-            if key not in self.incident_grid:
-                self.incident_grid[key] = []
-            self.incident_grid[key].append(incident)
+        snapshot = self.incident_feed.snapshot if self.incident_feed else None
+        if snapshot is None:
+            # Feed not running or not synced yet: query the database directly
+            self.incidents = self.incident_fetcher.fetch_incidents(bbox)
+            self.snapshot_key = None
+            self._build_incident_index()
+        else:
+            key = (snapshot.version, bbox)
+            if key == self.snapshot_key:
+                return
+            inside = snapshot.bbox_mask(bbox)
+            self.incidents = [snapshot.incidents[i] for i in np.nonzero(inside)[0].tolist()]
+            self.incident_index = snapshot.index
+            self.incident_keep = inside
+            self.incident_pos = np.cumsum(inside) - 1
+            self.snapshot_key = key
+    
+    @property
+    def snapshot_version(self) -> Optional[int]:
+        """Version of the feed snapshot the loaded incidents came from (None when read from the database)"""
+        return self.snapshot_key[0] if self.snapshot_key is not None else None
+    
+    def _build_incident_index(self):
+        self.incident_index = PointIndex(
+            [inc['lat'] for inc in self.incidents],
+            [inc['lon'] for inc in self.incidents]
+        )
+        self.incident_keep = None
+        self.incident_pos = None
     
     def haversine_distance(self, lat1: float, lon1: float, lat2: float, lon2: float) -> float:
         R = 6371000
@@ -190,22 +281,19 @@ class TrafficDataSimulator:
         return R * 2 * math.atan2(math.sqrt(a), math.sqrt(1-a))
     
     def find_nearby_incidents(self, lat: float, lon: float, radius: float = 200) -> List[dict]:
-        GRID_RES = 2000
-        nearby = []
-        
-        grid_x = int(lon * GRID_RES)
-        grid_y = int(lat * GRID_RES)
-        
-        for dx in range(-5, 6):
-            for dy in range(-5, 6):
-                key = f"{grid_x + dx},{grid_y + dy}"
-                if key in self.incident_grid:
-                    for incident in self.incident_grid[key]:
-                        dist = self.haversine_distance(lat, lon, incident['lat'], incident['lon'])
-                        if dist <= radius:
-                            nearby.append({**incident, 'distance': dist})
-        
-        return sorted(nearby, key=lambda x: x['distance'])
+        _, idx, dist = self.nearby_incidents_batch(lat, lon, radius, top=len(self.incidents))
+        return [{**self.incidents[i], 'distance': d} for i, d in zip(idx.tolist(), dist.tolist())]
+    
+    def nearby_incidents_batch(self, lats: np.ndarray, lons: np.ndarray,
+                               radius: float = 200, top: int = 3) -> tuple:
+        """(query index, incident index, distance) for the `top` nearest incidents of every point"""
+        if self.incident_index is None or not self.incidents:
+            empty = np.zeros(0, dtype=np.int64)
+            return empty, empty, np.zeros(0)
+        q, idx, dist = self.incident_index.query_radius_top(lats, lons, radius, k=top, keep=self.incident_keep)
+        if self.incident_pos is not None:
+            idx = self.incident_pos[idx]
+        return q, idx, dist
     
     def get_traffic_factor(self, edge_data: dict, edge_lat: float, edge_lon: float, 
                           current_time: datetime) -> tuple:
@@ -245,6 +333,11 @@ class EdgeWeightLearner:
         }
         self.prediction_errors = []
         self.learning_rate = 0.01
+        # Set from the feedback learner's published model (see apply_model)
+        self.speed_corrections = {}
+        self.model_version = None
+        # Set from the shared weight artifact (see apply_artifact)
+        self.artifact = None
         
         # Realistic Bangalore speeds by road type (km/h)
         self.base_speeds = {
@@ -261,9 +354,16 @@ class EdgeWeightLearner:
             'unclassified': 20,
             'service': 15
         }
+        
+        self.fuel_efficiency = {
+            'motorway': 15, 'trunk': 14, 'primary': 12,
+            'secondary': 11, 'tertiary': 10, 'residential': 9,
+            'motorway_link': 13, 'trunk_link': 12
+        }
     
     def compute_edge_weight(self, edge_data: dict, traffic_factor: float, 
-                          scenario: str = 'personal') -> dict:
+                          scenario: str = 'personal', observed_speed: float = None) -> dict:
+        """observed_speed: base speed implied by live GPS observations, used in place of the tables"""
         length_km = edge_data.get('length', 0) / 1000
         
         # Get road type specific speed
@@ -286,6 +386,9 @@ class EdgeWeightLearner:
                     base_speed = speed_value * 0.7  # Actual achievable is ~70% of limit
             except (ValueError, TypeError):
                 pass
+        base_speed *= self.speed_corrections.get(road_type, 1.0)
+        if observed_speed is not None:
+            base_speed = observed_speed
         
         # Apply traffic factor (from incidents + time of day)
         adjusted_speed = base_speed / traffic_factor
@@ -298,11 +401,7 @@ class EdgeWeightLearner:
         base_cost_per_km = 2.0
         cost = length_km * base_cost_per_km
         
-        fuel_efficiency = {
-            'motorway': 15, 'trunk': 14, 'primary': 12,
-            'secondary': 11, 'tertiary': 10, 'residential': 9,
-            'motorway_link': 13, 'trunk_link': 12
-        }.get(road_type, 10)
+        fuel_efficiency = self.fuel_efficiency.get(road_type, 10)
         
         fuel_cost_per_liter = 100
         fuel = (length_km / fuel_efficiency) * fuel_cost_per_liter
@@ -328,114 +427,371 @@ class EdgeWeightLearner:
             'road_type': road_type
         }
     
-    def load_model(self, filepath: str):
-        try:
-            import os
-            if os.path.exists(filepath):
-                with open(filepath, 'rb') as f:
-                    self.theta = pickle.load(f)
-                print(f"✓ Loaded model from {filepath}")
-        except Exception as e:
-            print(f"⚠ Using default weights: {e}")
+    @property
+    def artifact_version(self) -> Optional[str]:
+        return self.artifact.version if self.artifact is not None else None
+    
+    def apply_artifact(self, artifact):
+        """Take theta and road-class tables from a WeightArtifact (per-edge data is read by the weighter)"""
+        self.theta.update(artifact.theta())
+        self.base_speeds.update(artifact.road_table('speed'))
+        self.fuel_efficiency.update(artifact.road_table('fuel_efficiency'))
+        self.artifact = artifact
+    
+    def apply_model(self, model: dict):
+        """Swap in a model published by FeedbackLearner"""
+        for scenario, vector in model['theta'].items():
+            self.theta[scenario] = np.array(vector, dtype=np.float64)
+        self.speed_corrections = dict(model['speed_corrections'])
+        self.model_version = model['version']
+
+
+# Per-process result cache shared by every optimizer; entries are namespaced by cache_token
+route_cache = RouteCache()
+optimizer_tokens = itertools.count()
+# Observed speeds from live positions; positions land on whichever worker owns their tile,
+# so the store is shared by every process on the host
+speed_store = make_speed_store()
 
 
 class AdaptiveRouteOptimizer:
     """Main optimizer with incident integration"""
     
-    def __init__(self, G: nx.DiGraph, db_config: dict = None):
+    def __init__(self, G: nx.DiGraph, db_config: dict = None, incident_feed: IncidentFeed = None):
         self.G = G
         if db_config:
             self.incident_fetcher = IncidentDataFetcher(db_config)
-            self.traffic_sim = TrafficDataSimulator(self.incident_fetcher)
+            self.traffic_sim = TrafficDataSimulator(self.incident_fetcher, incident_feed)
         else:
             self.incident_fetcher = None
             self.traffic_sim = None
         self.edge_learner = EdgeWeightLearner()
         self.trip_history = []
         self.edge_incidents = {}
+        self.weighter = None
+        self.weights = None
+        # Scenario-independent columns for the applied (hour, incidents), and per-scenario views over them
+        self.shared = None
+        self.scenario_views = {}
+        self.scenario = 'personal'
+        self.search_mode = ROUTE_SEARCH_MODE
+        self.route_search = None
+        self.landmarks = {}
+        self.cch = None
+        self.cch_metrics = {}
+        self.weights_version = 0
+        # Incremental re-weighting state: what the graph's weights currently reflect
+        self.incremental = True
+        self.applied_incidents = {}
+        self.applied_hour = None
+        self.incident_factor = None
+        self.edge_index = None
+        self.snapper = None
+        self.td_profile = None
+        self.cache_token = next(optimizer_tokens)
+        self.observed_key = None
+        self.observed_refreshed = 0.0
+    
+    def get_weighter(self) -> VectorizedEdgeWeighter:
+        """Column arrays are extracted once per graph and reused by every request"""
+        if self.weighter is None:
+            self.weighter = VectorizedEdgeWeighter(GraphArrays(self.G), self.edge_learner)
+        return self.weighter
+    
+    def get_snapper(self) -> GraphSnapper:
+        """Node/edge KD-trees for this graph, built once"""
+        if self.snapper is None:
+            self.snapper = GraphSnapper(self.get_weighter().arrays)
+        return self.snapper
+    
+    def graph_bbox(self) -> tuple:
+        """(min_lat, min_lon, max_lat, max_lon) of the whole graph, for update_graph_weights"""
+        arrays = self.get_weighter().arrays
+        return (float(arrays.node_y.min()), float(arrays.node_x.min()),
+                float(arrays.node_y.max()), float(arrays.node_x.max()))
+    
+    def get_td_profile(self) -> np.ndarray:
+        """(edges, 24) hourly travel-time profile for time-dependent search, built once per incident state"""
+        if self.td_profile is None:
+            if self.incident_factor is None:
+                self.update_graph_weights(self.scenario)
+            self.td_profile = self.get_weighter().travel_time_profile(self.traffic_sim, self.incident_factor)
+        return self.td_profile
+    
+    def get_edge_index(self) -> PointIndex:
+        """Spatial index over edge midpoints, used to find edges near changed incidents"""
+        if self.edge_index is None:
+            arrays = self.get_weighter().arrays
+            self.edge_index = PointIndex(arrays.mid_lat, arrays.mid_lon)
+        return self.edge_index
+    
+    @staticmethod
+    def incident_state(incidents: List[dict]) -> dict:
+        return {inc['id']: (inc.get('ty'), inc.get('sd'), inc['lat'], inc['lon']) for inc in incidents}
+    
+    def changed_incident_edges(self, current: dict) -> np.ndarray:
+        """Edges within 200 m of incidents added, removed or changed since the last update"""
+        previous = self.applied_incidents
+        points = []
+        for inc_id, state in current.items():
+            old = previous.get(inc_id)
+            if old != state:
+                points.append(state[2:])
+                if old is not None:
+                    points.append(old[2:])
+        for inc_id, old in previous.items():
+            if inc_id not in current:
+                points.append(old[2:])
+        if not points:
+            return np.zeros(0, dtype=np.int64)
+        lats, lons = zip(*points)
+        _, edge_ids, _ = self.get_edge_index().query_radius(lats, lons, 200)
+        return np.unique(edge_ids)
+    
+    def refresh_observed_speeds(self, current_time: datetime, force: bool = False) -> np.ndarray:
+        """Load observed speeds for current_time's bucket; returns the edges whose value changed
+
+        Observed speeds already include time-of-day congestion, so they are
+        turned back into a base speed with the incident-free traffic factor.
+        """
+        weighter = self.get_weighter()
+        if not speed_store.has_observations():
+            return np.zeros(0, dtype=np.int64)
+        key = (speed_bucket(current_time), current_time.hour)
+        now = time.monotonic()
+        if not force and key == self.observed_key and now - self.observed_refreshed < OBSERVED_SPEED_REFRESH_SECONDS:
+            return np.zeros(0, dtype=np.int64)
+        self.observed_key = key
+        self.observed_refreshed = now
+        
+        arrays = weighter.arrays
+        observed = speed_store.speeds_for(arrays.edge_index, arrays.num_edges, key[0], current_time.timestamp())
+        clean_factor = weighter.traffic_factors(self.traffic_sim, current_time.hour)
+        observed_base = np.minimum(observed * clean_factor, 120)
+        previous = weighter.observed_base
+        weighter.observed_base = observed_base
+        if previous is None:
+            return np.nonzero(~np.isnan(observed_base))[0]
+        same = (previous == observed_base) | (np.isnan(previous) & np.isnan(observed_base))
+        return np.nonzero(~same)[0]
+    
+    def sync_models(self):
+        """Hot-swap a changed weight artifact or a newer feedback model; the next re-weighting is then full"""
+        artifact = load_weight_artifact()
+        if artifact is not None and artifact.version != self.edge_learner.artifact_version:
+            self.edge_learner.apply_artifact(artifact)
+            if self.traffic_sim:
+                self.traffic_sim.hourly_congestion_factors.update(artifact.hourly_factors())
+                self.traffic_sim.road_type_sensitivity.update(artifact.road_table('sensitivity'))
+            # The feedback model is layered on top of the artifact, so re-apply it
+            self.edge_learner.model_version = None
+            self.weights = None
+            self.landmarks = {}
+        model = feedback_learner.latest()
+        if model is None or model['version'] == self.edge_learner.model_version:
+            return
+        self.edge_learner.apply_model(model)
+        self.weights = None
+        self.landmarks = {}
+        print(f"🧠 Optimizer switched to feedback model v{model['version']}")
     
     def update_graph_weights(self, scenario: str = 'personal', 
                            current_time: datetime = None, bbox: tuple = None):
         if current_time is None:
             current_time = datetime.now()
         
+        self.sync_models()
+        
         if self.traffic_sim and bbox:
             self.traffic_sim.load_incidents(bbox)
         
-        self.edge_incidents = {}
-        
-        for u, v, data in self.G.edges(data=True):
-            u_data = self.G.nodes[u]
-            v_data = self.G.nodes[v]
-            mid_lat = (u_data['y'] + v_data['y']) / 2
-            mid_lon = (u_data['x'] + v_data['x']) / 2
-            
+        weighter = self.get_weighter()
+        hour = current_time.hour
+        incidents = self.traffic_sim.incidents if self.traffic_sim else []
+        current = self.incident_state(incidents)
+        full = not self.incremental or self.weights is None
+        
+        if full:
+            touched = None
+            self.incident_factor = np.ones(weighter.arrays.num_edges)
+            self.edge_incidents = {}
             if self.traffic_sim:
-                traffic_factor, affecting_incidents = self.traffic_sim.get_traffic_factor(
-                    data, mid_lat, mid_lon, current_time
-                )
-                if affecting_incidents:
-                    self.edge_incidents[(u, v)] = affecting_incidents
-            else:
-                traffic_factor = 1.0
+                self.incident_factor, self.edge_incidents = weighter.incident_factors(self.traffic_sim)
+            self.td_profile = None
+            route_cache.invalidate_graph(self.cache_token)
+            self.refresh_observed_speeds(current_time, force=True)
+        else:
+            # Only edges near incidents that changed need a new incident factor
+            touched = self.changed_incident_edges(current)
+            if len(touched):
+                factors, edge_incidents = weighter.incident_factors(self.traffic_sim, touched)
+                self.incident_factor[touched] = factors
+                edges = weighter.arrays.edges
+                for i in touched.tolist():
+                    self.edge_incidents.pop(edges[i], None)
+                self.edge_incidents.update(edge_incidents)
+                if self.td_profile is not None:
+                    self.td_profile[touched] = weighter.travel_time_profile(
+                        self.traffic_sim, self.incident_factor[touched], touched
+                    )
+            # Edges whose observed speed moved are re-weighted the same way
+            touched = np.union1d(touched, self.refresh_observed_speeds(current_time))
+            if len(touched):
+                # Cached routes over re-weighted edges are stale; the rest stay valid
+                edges = weighter.arrays.edges
+                route_cache.invalidate_edges(self.cache_token, [edges[i] for i in touched.tolist()])
+        self.applied_incidents = current
+        
+        if full or hour != self.applied_hour:
+            # Hour-of-day changed: every edge's weight changes
+            traffic_factor = weighter.traffic_factors(self.traffic_sim, hour, self.incident_factor)
+            self.shared = weighter.compute_shared(traffic_factor)
+            self.scenario_views = {scenario: weighter.scenario_view(self.shared, scenario)}
+            self.weights = self.scenario_views[scenario]
+            weighter.apply(self.weights)
+        elif len(touched):
+            traffic_factor = weighter.traffic_factors(
+                self.traffic_sim, hour, self.incident_factor[touched], touched
+            )
+            partial = weighter.compute_shared(traffic_factor, touched)
+            # Views hold the same shared column arrays, so this updates every scenario
+            for key, column in self.shared.items():
+                column[touched] = partial[key]
+            for name, view in self.scenario_views.items():
+                view['combined_weight'][touched] = weighter.scenario_view(partial, name)['combined_weight']
+            if scenario not in self.scenario_views:
+                self.scenario_views[scenario] = weighter.scenario_view(self.shared, scenario)
+            self.weights = self.scenario_views[scenario]
+            weighter.apply(self.weights, touched)
+            if scenario != self.scenario:
+                weighter.apply(self.weights, columns=('combined_weight',))
+        elif scenario != self.scenario:
+            # Same hour and incidents: only combined_weight differs between scenarios
+            if scenario not in self.scenario_views:
+                self.scenario_views[scenario] = weighter.scenario_view(self.shared, scenario)
+            self.weights = self.scenario_views[scenario]
+            weighter.apply(self.weights, columns=('combined_weight',))
+        else:
+            return
+        
+        self.applied_hour = hour
+        self.scenario = scenario
+        self.weights_version += 1
+    
+    def get_landmarks(self, weight: str):
+        """ALT landmark tables, precomputed once per lower-bound metric"""
+        lower_bounds = edge_lower_bounds(weight, self.weights, self.edge_learner, self.scenario)
+        if lower_bounds is None:
+            return None
+        key = (weight, round(float(lower_bounds.sum()), 6))
+        if key not in self.landmarks:
+            self.landmarks[key] = Landmarks(self.get_weighter().arrays, lower_bounds)
+        return self.landmarks[key]
+    
+    def get_cch(self) -> CCH:
+        """Metric-independent CCH preprocessing, done once per graph"""
+        if self.cch is None:
+            start = datetime.now()
+            self.cch = CCH(self.get_weighter().arrays)
+            elapsed = (datetime.now() - start).total_seconds()
+            print(f"✅ CCH built in {elapsed:.1f}s: {self.cch.num_arcs} arcs, {self.cch.num_triangles} triangles")
+        return self.cch
+    
+    def edge_weight_column(self, weight) -> np.ndarray:
+        """Current per-edge values of a weight attribute (or penalized weight function)"""
+        base_weight = getattr(weight, 'base_weight', weight)
+        arrays = self.get_weighter().arrays
+        if base_weight == 'length':
+            column = arrays.length
+        else:
+            column = self.weights[base_weight]
+        counts = getattr(weight, 'counts', None)
+        if counts:
+            column = column.copy()
+            for edge, count in counts.items():
+                column[arrays.edge_index[edge]] *= 1 + count * PENALTY_STEP
+        return column
+    
+    def get_cch_metric(self, weight):
+        """Customize the hierarchy for the current weights (cached per weight and re-weighting)"""
+        cch = self.get_cch()
+        key = (weight, self.weights_version)
+        if key not in self.cch_metrics:
+            self.cch_metrics = {k: m for k, m in self.cch_metrics.items() if k[1] == self.weights_version}
+            self.cch_metrics[key] = cch.customize(self.edge_weight_column(weight))
+        return self.cch_metrics[key]
+    
+    def make_search(self, departure: datetime = None):
+        """search(source, target, weight) using the configured goal-directed backend
+
+        With a departure time the search is time-dependent A* on the hourly
+        travel-time profile; it minimizes arrival time whatever the weight.
+        """
+        if self.route_search is None:
+            self.route_search = RouteSearch(self.G, self.get_weighter().arrays)
+        route_search = self.route_search
+        mode = self.search_mode
+        
+        if self.weights is not None and len(self.weights['base_speed']):
+            max_speed = float(self.weights['base_speed'].max())
+        else:
+            max_speed = max(self.edge_learner.base_speeds.values())
+        
+        if departure is not None:
+            profile = self.get_td_profile()
+            depart_seconds = departure.hour * 3600 + departure.minute * 60 + departure.second
+            # The profile is built without live observed speeds, so the bound must be too
+            profile_speeds = self.get_weighter().base_speeds(observed=False)
+            profile_max_speed = float(profile_speeds.max()) if len(profile_speeds) else max_speed
+            rate = heuristic_rate('travel_time', self.edge_learner, self.scenario, profile_max_speed)
+            edge_index = self.get_weighter().arrays.edge_index
             
-            weights = self.edge_learner.compute_edge_weight(data, traffic_factor, scenario)
+            def td_search(source, target, weight):
+                counts = getattr(weight, 'counts', None) or {}
+                penalty = {edge_index[e]: 1 + count * PENALTY_STEP for e, count in counts.items()}
+                return route_search.td_astar(source, target, profile, depart_seconds, rate=rate, penalty=penalty)
             
-            data['travel_time'] = weights['travel_time']
-            data['cost'] = weights['cost']
-            data['fuel'] = weights['fuel']
-            data['combined_weight'] = weights['combined_weight']
-            data['traffic_factor'] = traffic_factor
-            data['adjusted_speed'] = weights['adjusted_speed']
+            return td_search
+        
+        def search(source, target, weight):
+            base_weight = getattr(weight, 'base_weight', weight)
+            penalized = bool(getattr(weight, 'counts', None))
+            if mode == 'cch' and self.weights is not None and not penalized:
+                distance, path = self.get_cch_metric(weight).query(source, target)
+                if not path:
+                    raise nx.NetworkXNoPath(f"Node {target} not reachable from {source}")
+                return path
+            if mode == 'dijkstra':
+                return route_search.astar(source, target, weight)
+            rate = heuristic_rate(base_weight, self.edge_learner, self.scenario, max_speed)
+            if mode == 'astar':
+                return route_search.astar(source, target, weight, rate=rate)
+            # Penalized alternatives under CCH would need a full customization per attempt;
+            # ALT answers them instead (penalties only raise weights, so its bounds still hold)
+            use_landmarks = mode == 'alt' or (mode == 'cch' and penalized)
+            landmarks = self.get_landmarks(base_weight) if use_landmarks and self.weights is not None else None
+            return route_search.bidirectional_astar(source, target, weight, rate=rate, landmarks=landmarks)
+        
+        return search
     
     def find_k_diverse_paths(self, source: int, target: int, K: int = 4, 
-                           weight: str = 'combined_weight') -> List[List[int]]:
-        paths = []
-        edge_counts = {}
-        
+                           weight: str = 'combined_weight',
+                           method: str = 'penalty', departure: datetime = None) -> List[List[int]]:
+        finder = DiversePathFinder(self.G, self.make_search(departure))
+        if method == 'via':
+            return finder.via_paths(source, target, K=K, weight=weight)
+        return finder.penalty_paths(source, target, K=K, weight=weight)
+    
+    def find_pareto_paths(self, source: int, target: int, max_routes: int = PARETO_MAX_ROUTES) -> List[List[int]]:
+        """Non-dominated routes over PARETO_OBJECTIVES in one label-setting search, fastest first"""
+        if self.route_search is None:
+            self.route_search = RouteSearch(self.G, self.get_weighter().arrays)
+        costs = np.stack([self.weights[name] for name in PARETO_OBJECTIVES], axis=1)
         try:
-            first_path = nx.astar_path(self.G, source, target, weight=weight)
-            paths.append(first_path)
-            
-            for u, v in zip(first_path[:-1], first_path[1:]):
-                edge_counts[(u, v)] = 1
-            
-            attempts = 0
-            max_attempts = K * 3
-            
-            while len(paths) < K and attempts < max_attempts:
-                attempts += 1
-                H = self.G.copy()
-                
-                for (u, v), count in edge_counts.items():
-                    if H.has_edge(u, v):
-                        penalty = 1 + (count * 0.3)
-                        original_weight = self.G[u][v].get(weight, 1.0)
-                        H[u][v][weight] = original_weight * penalty
-                
-                try:
-                    alt_path = nx.astar_path(H, source, target, weight=weight)
-                    path_edges = set(zip(alt_path[:-1], alt_path[1:]))
-                    existing_paths_edges = [set(zip(p[:-1], p[1:])) for p in paths]
-                    
-                    if existing_paths_edges:
-                        max_overlap = max((len(path_edges & existing) / len(path_edges) 
-                                         for existing in existing_paths_edges), default=0)
-                    else:
-                        max_overlap = 0
-                    
-                    if max_overlap < 0.7:
-                        paths.append(alt_path)
-                        for u, v in zip(alt_path[:-1], alt_path[1:]):
-                            edge_counts[(u, v)] = edge_counts.get((u, v), 0) + 1
-                        
-                except nx.NetworkXNoPath:
-                    continue
-                    
+            front = self.route_search.pareto(source, target, costs, max_routes=max_routes)
         except nx.NetworkXNoPath:
             return []
-        
-        return paths
+        return [path for path, _ in front]
     
     def compute_route_metrics(self, route: List[int]) -> dict:
         """Compute detailed metrics with actual road-based calculations"""
@@ -492,7 +848,13 @@ class AdaptiveRouteOptimizer:
                       dst_lat: float, dst_lon: float,
                       scenario: str = 'personal',
                       current_time: datetime = None,
-                      K: int = 4) -> tuple:
+                      K: int = 4, time_dependent: bool = False, mode: str = 'diverse',
+                      diversity: str = 'penalty') -> tuple:
+        """mode 'pareto' returns up to K non-dominated routes instead of K diverse ones
+
+        diversity picks how diverse routes are generated (see DiversePathFinder);
+        Via-node paths come from snapshot weights and are re-timed when time_dependent.
+        """
         if current_time is None:
             current_time = datetime.now()
         
@@ -505,17 +867,53 @@ class AdaptiveRouteOptimizer:
         
         self.update_graph_weights(scenario, current_time, bbox)
         
-        source = ox.distance.nearest_nodes(self.G, src_lon, src_lat)
-        target = ox.distance.nearest_nodes(self.G, dst_lon, dst_lat)
-        
-        routes = self.find_k_diverse_paths(source, target, K=K)
+        source, target = self.get_snapper().nearest_nodes([src_lat, dst_lat], [src_lon, dst_lon])
+        
+        # Time-dependent routes are shared within 15 minutes of departure, snapshot routes within the hour
+        bucket = (current_time.hour, current_time.minute // 15) if time_dependent else current_time.hour
+        cache_key = (self.cache_token, source, target, scenario, K, time_dependent, bucket, mode, diversity)
+        cached = route_cache.get(cache_key)
+        if cached is not None:
+            routes, route_metrics = cached
+            if time_dependent:
+                # Same paths, but times and arrival follow this request's exact departure
+                route_metrics = copy.deepcopy(route_metrics)
+                for route, metrics in zip(routes, route_metrics):
+                    self.apply_td_times(route, metrics, current_time)
+            return routes, route_metrics
+        
+        if mode == 'pareto':
+            # Trade-offs come from snapshot weights; time-dependent times are applied afterwards
+            routes = self.find_pareto_paths(source, target, max_routes=K)
+        elif time_dependent:
+            routes = self.find_k_diverse_paths(source, target, K=K, weight='travel_time', method=diversity,
+                                               departure=current_time)
+        else:
+            routes = self.find_k_diverse_paths(source, target, K=K, method=diversity)
         
         if not routes:
             return [], []
         
         route_metrics = [self.compute_route_metrics(r) for r in routes]
+        if time_dependent:
+            for route, metrics in zip(routes, route_metrics):
+                self.apply_td_times(route, metrics, current_time)
         
+        route_cache.put(cache_key, routes, (routes, route_metrics))
         return routes, route_metrics
+    
+    def apply_td_times(self, route: List[int], metrics: dict, departure: datetime):
+        """Replace snapshot segment times with times evaluated at each segment's arrival"""
+        depart_seconds = departure.hour * 3600 + departure.minute * 60 + departure.second
+        times = self.route_search.td_edge_times(route, self.get_td_profile(), depart_seconds)
+        for segment, seconds in zip(metrics['segment_details'], times):
+            segment['time_seconds'] = seconds
+            segment['speed_kmh'] = segment['distance_km'] / (seconds / 3600) if seconds > 0 else 0
+        total_time = sum(times)
+        metrics['time_seconds'] = total_time
+        metrics['time_minutes'] = total_time / 60
+        metrics['average_speed'] = (metrics['distance_km'] / (total_time / 3600)) if total_time > 0 else 0
+        metrics['arrival_time'] = (departure + timedelta(seconds=total_time)).isoformat()
 
 
 # ============================================================================
@@ -534,90 +932,190 @@ def haversine_distance(lat1, lng1, lat2, lng2):
     return R * 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
 
 
-def get_incidents_using_postgis(route_coords):
-    """Get incidents within 200m and snap to route line"""
+def linestring_wkb(route_coords) -> bytes:
+    """Little-endian WKB LINESTRING from (lat, lng) pairs"""
+    points = np.array([(lng, lat) for lat, lng in route_coords], dtype='<f8')
+    return struct.pack('<BII', 1, 2, len(points)) + points.tobytes()
+
+
+def format_route_incident(inc: dict) -> dict:
+    ty = int(inc.get('ty', 1))
+    config = INCIDENT_TYPE_MAPPING.get(ty, INCIDENT_TYPE_MAPPING[1])
+    return {
+        'id': inc['id'],
+        'lat': float(inc['snapped_lat']),
+        'lng': float(inc['snapped_lng']),
+        'original_lat': float(inc['latitude']),
+        'original_lng': float(inc['longitude']),
+        'ty': ty,
+        'severity': config['color'],
+        'type': config['name'],
+        'icon': config['icon'],
+        'description': inc.get('description', ''),
+        'location': f"{inc.get('location_from', '')} - {inc.get('location_to', '')}",
+        'affected_distance': int(inc['length']),
+        'speed': config['speed'],
+        'distance_to_route': float(inc['distance_m'])
+    }
+
+
+def get_incidents_for_routes(routes_coords: List[list]) -> List[List[dict]]:
+    """Incidents within 200m of each route, snapped to that route; one query for all routes"""
+    results = [[] for _ in routes_coords]
+    # A linestring needs at least two points
+    indices = [i for i, coords in enumerate(routes_coords) if len(coords) >= 2]
+    if not indices:
+        return results
+    
     try:
-        print(f"🔍 Checking incidents for route with {len(route_coords)} points")
-        conn = get_db_connection()
-        cursor = conn.cursor(cursor_factory=RealDictCursor)
-        
-        # Check if incidents table has data
-        cursor.execute("SELECT COUNT(*) as cnt FROM incidents;")
-        count_result = cursor.fetchone()
-        print(f"📊 Incidents table has {count_result['cnt']} rows")
-        
-        if count_result['cnt'] == 0:
-            print("⚠️ No incidents in database")
-            cursor.close()
-            conn.close()
-            return []
-        
-        coords_wkt = ', '.join([f"{lng} {lat}" for lat, lng in route_coords])
-        route_linestring = f"LINESTRING({coords_wkt})"
-        
+        print(f"🔍 Checking incidents for {len(indices)} routes")
+        # Each route's geometry and its geography cast are built once, then
+        # joined against the incidents index
         query = """
-            WITH route_line AS (
-                SELECT ST_SetSRID(ST_GeomFromText(%s), 4326) AS geom
+            WITH route_lines AS (
+                SELECT r.idx, g.geom, g.geom::geography AS geog
+                FROM unnest(%s::int[], %s::bytea[]) AS r(idx, wkb)
+                CROSS JOIN LATERAL (
+                    SELECT ST_SetSRID(ST_GeomFromWKB(r.wkb), 4326) AS geom
+                ) g
             ),
             nearby_incidents AS (
                 SELECT 
+                    rl.idx,
                     i.id, i.ty, i.latitude, i.longitude,
                     i.d as description, i.f as location_from, i.t as location_to,
                     COALESCE(CAST(i.l AS INTEGER), 300) as length,
-                    ST_Distance(i.geom_indexed::geography, (SELECT geom::geography FROM route_line)) as distance_m,
-                    ST_ClosestPoint((SELECT geom FROM route_line), ST_SetSRID(ST_MakePoint(i.longitude, i.latitude), 4326)) as snapped_point
-                FROM incidents i, route_line
+                    ST_Distance(i.geom_indexed::geography, rl.geog) as distance_m,
+                    ST_ClosestPoint(rl.geom, ST_SetSRID(ST_MakePoint(i.longitude, i.latitude), 4326)) as snapped_point
+                FROM route_lines rl
+                JOIN incidents i
+                  ON ST_DWithin(i.geom_indexed::geography, rl.geog, 200)
                 WHERE i.latitude IS NOT NULL AND i.longitude IS NOT NULL
-                AND ST_DWithin(i.geom_indexed::geography, (SELECT geom::geography FROM route_line), 200)
             )
             SELECT 
-                id, ty, latitude, longitude, description, location_from, location_to, length, distance_m,
+                idx, id, ty, latitude, longitude, description, location_from, location_to, length, distance_m,
                 ST_X(snapped_point) as snapped_lng,
                 ST_Y(snapped_point) as snapped_lat
             FROM nearby_incidents
-            ORDER BY distance_m ASC
+            ORDER BY idx, distance_m ASC
         """
         
-        print(f"🔎 Executing PostGIS query...")
-        cursor.execute(query, (route_linestring,))
-        incidents = cursor.fetchall()
-        print(f"📦 Query returned {len(incidents)} incidents")
-        cursor.close()
-        conn.close()
+        with db_pool.connection() as conn:
+            cursor = conn.cursor(cursor_factory=RealDictCursor)
+            cursor.execute(query, (
+                indices,
+                [psycopg2.Binary(linestring_wkb(routes_coords[i])) for i in indices]
+            ))
+            rows = cursor.fetchall()
+            cursor.close()
         
-        route_incidents = []
-        for inc in incidents:
-            ty = int(inc.get('ty', 1))
-            config = INCIDENT_TYPE_MAPPING.get(ty, INCIDENT_TYPE_MAPPING[1])
-            
-            snapped_lat = float(inc['snapped_lat'])
-            snapped_lng = float(inc['snapped_lng'])
-            
-            route_incidents.append({
-                'id': inc['id'],
-                'lat': snapped_lat,
-                'lng': snapped_lng,
-                'original_lat': float(inc['latitude']),
-                'original_lng': float(inc['longitude']),
-                'ty': ty,
-                'severity': config['color'],
-                'type': config['name'],
-                'icon': config['icon'],
-                'description': inc.get('description', ''),
-                'location': f"{inc.get('location_from', '')} - {inc.get('location_to', '')}",
-                'affected_distance': int(inc['length']),
-                'speed': config['speed'],
-                'distance_to_route': float(inc['distance_m'])
-            })
+        for inc in rows:
+            results[inc['idx']].append(format_route_incident(inc))
         
-        print(f"✅ Found {len(route_incidents)} incidents (snapped to route)")
-        return route_incidents
+        print(f"✅ Found {len(rows)} route/incident pairs (snapped to routes)")
+        return results
         
     except Exception as e:
         print(f"❌ PostGIS error: {e}")
         import traceback
         traceback.print_exc()
-        return []
+        return [[] for _ in routes_coords]
+
+
+def get_incidents_using_postgis(route_coords):
+    """Get incidents within 200m and snap to route line"""
+    return get_incidents_for_routes([route_coords])[0]
+
+
+# Incidents are polled in the background; handlers read the in-memory snapshot
+incident_feed = IncidentFeed(IncidentDataFetcher(DB_CONFIG))
+
+
+@app.on_event("startup")
+def start_incident_feed():
+    check_legacy_pickle()
+    incident_feed.start()
+    feedback_learner.start()
+
+
+@app.on_event("shutdown")
+def stop_incident_feed():
+    incident_feed.stop()
+    feedback_learner.stop()
+    route_workers.shutdown()
+    db_pool.close()
+
+
+def create_optimizer(G: nx.DiGraph) -> AdaptiveRouteOptimizer:
+    optimizer = AdaptiveRouteOptimizer(G, DB_CONFIG, incident_feed)
+    optimizer.sync_models()
+    optimizer.get_snapper()
+    print(f"✅ Network cached: {len(G.nodes)} nodes, {len(G.edges)} edges")
+    return optimizer
+
+
+# One shared graph per region; scenarios are cached weight views over it
+optimizer_cache = RegionGraphCache(graph_store, create_optimizer)
+
+
+NO_REGION_DETAIL = ("No offline road graph covers this area. Build one with: "
+                    "python graph_store.py build --osm <extract.osm> --name <region>")
+
+
+def optimizer_bbox(center_lat: float, center_lon: float) -> tuple:
+    return ox.utils_geo.bbox_from_point((center_lat, center_lon), dist=3000)
+
+
+def points_bbox(points: List[List[float]], pad: float = 0.01) -> tuple:
+    """(west, south, east, north) around [lat, lon] points, padded by `pad` degrees"""
+    lats = [p[0] for p in points]
+    lons = [p[1] for p in points]
+    return min(lons) - pad, min(lats) - pad, max(lons) + pad, max(lats) + pad
+
+
+def get_optimizer_for_bbox(bbox: tuple) -> AdaptiveRouteOptimizer:
+    optimizer = optimizer_cache.get(bbox)
+    if optimizer is None:
+        raise HTTPException(status_code=404, detail=NO_REGION_DETAIL)
+    return optimizer
+
+
+def optimizer_key_for_bbox(bbox: tuple) -> tuple:
+    key = optimizer_cache.key_for(bbox)
+    if key is None:
+        raise HTTPException(status_code=404, detail=NO_REGION_DETAIL)
+    return key
+
+
+def get_optimizer(center_lat: float, center_lon: float) -> AdaptiveRouteOptimizer:
+    """Return the cached optimizer for this area, loading its graph from the offline store"""
+    return get_optimizer_for_bbox(optimizer_bbox(center_lat, center_lon))
+
+
+def optimizer_key(center_lat: float, center_lon: float) -> tuple:
+    """Graph cache key for this area; used to pin requests to the worker holding that graph"""
+    return optimizer_key_for_bbox(optimizer_bbox(center_lat, center_lon))
+
+
+def init_route_worker():
+    """Worker process start-up: keep this process's incident snapshot fresh too"""
+    incident_feed.start()
+
+
+def route_worker_stats() -> dict:
+    return {
+        'graph_cache': optimizer_cache.stats(),
+        'incident_version': incident_feed.stats()['version'],
+        'isochrone_cache': isochrone_cache.stats(),
+        'route_cache': route_cache.stats(),
+        'model_version': feedback_learner.stats()['model_version'],
+        'weight_artifact_version': getattr(load_weight_artifact(), 'version', None),
+        'observed_speeds': speed_store.stats()
+    }
+
+
+# Routing runs in worker processes, each with its own warm graph cache
+route_workers = RouteWorkerPool(initializer=init_route_worker, stats_fn=route_worker_stats)
 
 
 # ============================================================================
@@ -647,71 +1145,73 @@ async def search_location(query: str):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def compute_routes(request: RouteRequest, include_map_html: bool = False) -> dict:
+    """Route search, incident snapping and geometry (or folium map); runs in a route worker"""
+    center_lat = (request.src_lat + request.dst_lat) / 2
+    center_lon = (request.src_lon + request.dst_lon) / 2
+    optimizer = get_optimizer(center_lat, center_lon)
+    
+    routes, metrics = optimizer.optimize_route(
+        request.src_lat, request.src_lon,
+        request.dst_lat, request.dst_lon,
+        scenario=request.scenario,
+        K=PARETO_MAX_ROUTES if request.mode == 'pareto' else 3,
+        current_time=request.departure_time,
+        time_dependent=request.time_dependent,
+        mode=request.mode,
+        diversity=request.diversity
+    )
+    
+    if not routes:
+        raise HTTPException(status_code=404, detail="No routes found")
+    
+    routes_coords = [
+        [(optimizer.G.nodes[n]['y'], optimizer.G.nodes[n]['x']) 
+         for n in route if n in optimizer.G.nodes]
+        for route in routes
+    ]
+    
+    # Get incidents for all routes in one PostGIS query
+    all_routes_incidents = get_incidents_for_routes(routes_coords)
+    
+    routes_serializable = [[int(node) for node in route] for route in routes]
+    
+    response = {
+        'routes': routes_serializable,
+        'metrics': metrics,
+        'incidents': all_routes_incidents,
+        'geometry': [encode_polyline(coords) for coords in routes_coords],
+        'polyline_precision': POLYLINE_PRECISION,
+        'mode': request.mode,
+        'status': 'success'
+    }
+    if include_map_html:
+        response['map_html'] = generate_multi_route_map(
+            optimizer.G, routes, metrics, all_routes_incidents,
+            request.src_lat, request.src_lon,
+            request.dst_lat, request.dst_lon
+        )
+    return response
+
+
 @app.post("/api/optimize-route")
-async def optimize_route(request: RouteRequest):
+async def optimize_route(request: RouteRequest, include_map_html: bool = False):
+    """Routes with encoded polylines; pass include_map_html=true for the legacy folium map"""
+    if request.mode not in ROUTE_MODES:
+        raise HTTPException(status_code=400, detail=f"mode must be one of {', '.join(ROUTE_MODES)}")
+    if request.diversity not in DIVERSITY_METHODS:
+        raise HTTPException(status_code=400, detail=f"diversity must be one of {', '.join(DIVERSITY_METHODS)}")
     try:
         print(f"📍 Optimizing route from ({request.src_lat}, {request.src_lon}) to ({request.dst_lat}, {request.dst_lon})")
         
         center_lat = (request.src_lat + request.dst_lat) / 2
         center_lon = (request.src_lon + request.dst_lon) / 2
-        bbox = ox.utils_geo.bbox_from_point((center_lat, center_lon), dist=3000)
-        cache_key = f"{bbox}_{request.scenario}"
-        
-        if cache_key not in optimizer_cache:
-            print("🔄 Loading network data...")
-            G_multi = ox.graph_from_bbox(bbox=bbox, network_type="drive", simplify=True)
-            G = nx.DiGraph()
-            G.graph.update(G_multi.graph)
-            for n, d in G_multi.nodes(data=True):
-                G.add_node(n, **d)
-            for u, v, data in G_multi.edges(data=True):
-                if G.has_edge(u, v):
-                    if data.get('length', float('inf')) < G[u][v].get('length', float('inf')):
-                        G[u][v].update(data)
-                else:
-                    G.add_edge(u, v, **data)
-            
-            optimizer = AdaptiveRouteOptimizer(G, DB_CONFIG)
-            optimizer.edge_learner.load_model('learned_weights.pkl')
-            optimizer_cache[cache_key] = optimizer
-            print(f"✅ Network cached: {len(G.nodes)} nodes, {len(G.edges)} edges")
-        else:
-            optimizer = optimizer_cache[cache_key]
-            print("✅ Using cached network")
-        
-        routes, metrics = optimizer.optimize_route(
-            request.src_lat, request.src_lon,
-            request.dst_lat, request.dst_lon,
-            scenario=request.scenario, K=3
+        return await route_workers.submit(
+            optimizer_key(center_lat, center_lon), compute_routes, request, include_map_html
         )
         
-        if not routes:
-            raise HTTPException(status_code=404, detail="No routes found")
-        
-        # Get incidents for each route using PostGIS
-        all_routes_incidents = []
-        for route in routes:
-            route_coords = [(optimizer.G.nodes[n]['y'], optimizer.G.nodes[n]['x']) 
-                          for n in route if n in optimizer.G.nodes]
-            incidents = get_incidents_using_postgis(route_coords)
-            all_routes_incidents.append(incidents)
-        
-        map_html = generate_multi_route_map(
-            optimizer.G, routes, metrics, all_routes_incidents,
-            request.src_lat, request.src_lon,
-            request.dst_lat, request.dst_lon
-        )
-        
-        routes_serializable = [[int(node) for node in route] for route in routes]
-        
-        return {
-            'routes': routes_serializable,
-            'metrics': metrics,
-            'incidents': all_routes_incidents,
-            'map_html': map_html,
-            'status': 'success'
-        }
-        
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"❌ Error: {str(e)}")
         import traceback
@@ -799,167 +1299,238 @@ def generate_multi_route_map(G, routes, route_metrics, all_incidents, src_lat, s
     return m._parent.render()
 
 
-@app.post("/api/start-navigation")
-async def start_navigation(session: NavigationSession):
-    try:
-        session_id = f"nav_{datetime.now().strftime('%Y%m%d%H%M%S')}_{session.user_id}"
-        
-        center_lat = (session.src_lat + session.dst_lat) / 2
-        center_lon = (session.src_lon + session.dst_lon) / 2
-        bbox = ox.utils_geo.bbox_from_point((center_lat, center_lon), dist=3000)
-        cache_key = f"{bbox}_personal"
-        
-        if cache_key not in optimizer_cache:
-            raise HTTPException(status_code=404, detail="Network data not found. Please optimize route first.")
-        
-        optimizer = optimizer_cache[cache_key]
-        G = optimizer.G
-        
-        # Build route with actual edge data
-        route_segments = []
-        total_distance = 0
+navigation_schema_ready = False
+
+
+def ensure_navigation_schema(cursor):
+    """Create navigation_history and add the feedback columns, once per process"""
+    global navigation_schema_ready
+    if navigation_schema_ready:
+        return
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS navigation_history (
+                id SERIAL PRIMARY KEY,
+                session_id VARCHAR(255) UNIQUE,
+                user_id VARCHAR(255),
+                route_id INTEGER,
+                src_lat DOUBLE PRECISION,
+                src_lon DOUBLE PRECISION,
+                dst_lat DOUBLE PRECISION,
+                dst_lon DOUBLE PRECISION,
+                distance_km DOUBLE PRECISION,
+                estimated_time INTEGER,
+                average_speed DOUBLE PRECISION,
+                start_time TIMESTAMP DEFAULT NOW(),
+                status VARCHAR(50) DEFAULT 'active'
+            )
+    """)
+    cursor.execute("""
+        ALTER TABLE navigation_history
+            ADD COLUMN IF NOT EXISTS scenario VARCHAR(50),
+            ADD COLUMN IF NOT EXISTS road_seconds JSONB,
+            ADD COLUMN IF NOT EXISTS actual_time DOUBLE PRECISION,
+            ADD COLUMN IF NOT EXISTS end_time TIMESTAMP
+    """)
+    navigation_schema_ready = True
+
+
+def record_navigation_start(session_id: str, session: NavigationSession, total_distance: float,
+                            total_time_minutes: int, avg_speed: float, road_seconds: dict = None):
+    with db_pool.connection() as conn:
+        cursor = conn.cursor()
+        ensure_navigation_schema(cursor)
+        cursor.execute("""
+            INSERT INTO navigation_history (session_id, user_id, route_id, src_lat, src_lon, dst_lat, dst_lon,
+                                            distance_km, estimated_time, average_speed, scenario, road_seconds)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+        """, (session_id, session.user_id, session.route_id, session.src_lat, session.src_lon, 
+              session.dst_lat, session.dst_lon, total_distance, total_time_minutes, avg_speed,
+              session.scenario, json.dumps(road_seconds) if road_seconds else None))
+        cursor.close()
+
+
+def fetch_feedback_sessions(limit: int) -> List[dict]:
+    """Newest completed sessions with per-road-class predictions, for the feedback learner"""
+    with db_pool.connection() as conn:
+        cursor = conn.cursor(cursor_factory=RealDictCursor)
+        ensure_navigation_schema(cursor)
+        cursor.execute("""
+            SELECT scenario, road_seconds, actual_time * 60 AS actual_seconds, end_time
+            FROM navigation_history
+            WHERE status = 'completed' AND actual_time > 0 AND road_seconds IS NOT NULL
+            ORDER BY end_time DESC
+            LIMIT %s
+        """, (limit,))
+        rows = cursor.fetchall()
+        cursor.close()
+    return [dict(row) for row in rows]
+
+
+def initial_theta() -> dict:
+    """Theta the first learned model starts from (the weight artifact's, if there is one)"""
+    learner = EdgeWeightLearner()
+    artifact = load_weight_artifact()
+    if artifact is not None:
+        learner.apply_artifact(artifact)
+    return learner.theta
+
+
+# Trains in the API process; every process (route workers included) reads its artifacts
+feedback_learner = FeedbackLearner(fetch_feedback_sessions, default_theta=initial_theta())
+
+
+def record_navigation_feedback(session_id: str, actual_time_minutes: float):
+    with db_pool.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            UPDATE navigation_history
+            SET actual_time = %s, status = 'completed', end_time = NOW()
+            WHERE session_id = %s
+        """, (actual_time_minutes, session_id))
+        cursor.close()
+
+
+def compute_navigation(session: NavigationSession, include_map_html: bool = False) -> dict:
+    """Segment timing, incident impact and geometry (or folium map) for a selected route; runs in a route worker"""
+    center_lat = (session.src_lat + session.dst_lat) / 2
+    center_lon = (session.src_lon + session.dst_lon) / 2
+    optimizer = get_optimizer(center_lat, center_lon)
+    if optimizer.weights is None:
+        # Freshly loaded from the store: weight it the way optimize_route would
+        optimizer.update_graph_weights('personal', bbox=(
+            min(session.src_lat, session.dst_lat) - 0.05,
+            min(session.src_lon, session.dst_lon) - 0.05,
+            max(session.src_lat, session.dst_lat) + 0.05,
+            max(session.src_lon, session.dst_lon) + 0.05
+        ))
+    G = optimizer.G
+    
+    # Build route with actual edge data
+    route_segments = []
+    total_distance = 0
+    
+    for i in range(len(session.selected_route) - 1):
+        u = session.selected_route[i]
+        v = session.selected_route[i + 1]
         
-        for i in range(len(session.selected_route) - 1):
-            u = session.selected_route[i]
-            v = session.selected_route[i + 1]
+        if u in G.nodes and v in G.nodes:
+            u_data = G.nodes[u]
+            v_data = G.nodes[v]
             
-            if u in G.nodes and v in G.nodes:
-                u_data = G.nodes[u]
-                v_data = G.nodes[v]
-                
-                # Get edge data
-                edge_data = G[u][v] if G.has_edge(u, v) else {}
-                
-                segment_distance = edge_data.get('length', 0) / 1000  # km
-                adjusted_speed = edge_data.get('adjusted_speed', 25)  # km/h
-                road_type = edge_data.get('highway', 'residential')
-                if isinstance(road_type, list):
-                    road_type = road_type[0]
-                
-                segment_time_hours = segment_distance / adjusted_speed if adjusted_speed > 0 else segment_distance / 25
-                
-                route_segments.append({
-                    'start': [u_data['y'], u_data['x']],
-                    'end': [v_data['y'], v_data['x']],
-                    'distance_km': segment_distance,
-                    'speed_kmh': adjusted_speed,
-                    'time_seconds': segment_time_hours * 3600,
-                    'road_type': road_type
-                })
-                
-                total_distance += segment_distance
-        
-        route_coords = [seg['start'] for seg in route_segments]
-        if route_segments:
-            route_coords.append(route_segments[-1]['end'])
-        
-        # Get incidents using PostGIS
-        route_coords_tuple = [(c[0], c[1]) for c in route_coords]
-        incidents = get_incidents_using_postgis(route_coords_tuple)
-        
-        # Apply incident impacts to segments
-        segment_speeds = []
-        segment_distances = []
-        
-        for seg in route_segments:
-            base_speed = seg['speed_kmh']
-            segment_distance = seg['distance_km'] * 1000  # meters
+            # Get edge data
+            edge_data = G[u][v] if G.has_edge(u, v) else {}
             
-            # Check incidents affecting this segment
-            min_speed = base_speed
-            for inc in incidents:
-                # Check if incident is near this segment
-                seg_mid_lat = (seg['start'][0] + seg['end'][0]) / 2
-                seg_mid_lng = (seg['start'][1] + seg['end'][1]) / 2
-                
-                dist_to_inc = haversine_distance(
-                    seg_mid_lat, seg_mid_lng,
-                    inc['lat'], inc['lng']
-                )
-                
-                # If incident is within affected distance
-                if dist_to_inc < inc['affected_distance']:
-                    min_speed = min(min_speed, inc['speed'])
+            segment_distance = edge_data.get('length', 0) / 1000  # km
+            adjusted_speed = edge_data.get('adjusted_speed', 25)  # km/h
+            road_type = edge_data.get('highway', 'residential')
+            if isinstance(road_type, list):
+                road_type = road_type[0]
+            
+            segment_time_hours = segment_distance / adjusted_speed if adjusted_speed > 0 else segment_distance / 25
+            
+            route_segments.append({
+                'start': [u_data['y'], u_data['x']],
+                'end': [v_data['y'], v_data['x']],
+                'distance_km': segment_distance,
+                'speed_kmh': adjusted_speed,
+                'time_seconds': segment_time_hours * 3600,
+                'road_type': road_type
+            })
             
-            segment_speeds.append(min_speed)
-            segment_distances.append(segment_distance)
-        
-        # Calculate total realistic time
-        total_time_seconds = 0
-        for dist_m, speed_kmh in zip(segment_distances, segment_speeds):
-            if speed_kmh > 0:
-                total_time_seconds += (dist_m / 1000 / speed_kmh) * 3600
-            else:
-                total_time_seconds += (dist_m / 1000 / 25) * 3600
-        
-        total_time_minutes = int(total_time_seconds / 60)
-        avg_speed = (total_distance / (total_time_seconds / 3600)) if total_time_seconds > 0 else 25
-        
-        print(f"⏱️  Navigation Details:")
-        print(f"   Distance: {total_distance:.2f} km")
-        print(f"   Time: {total_time_minutes} min ({total_time_seconds:.0f} sec)")
-        print(f"   Avg Speed: {avg_speed:.1f} km/h")
-        print(f"   Segments: {len(route_segments)}")
-        print(f"   Incidents: {len(incidents)}")
-        
-        nav_map_html = generate_navigation_map(
+            total_distance += segment_distance
+    
+    route_coords = [seg['start'] for seg in route_segments]
+    if route_segments:
+        route_coords.append(route_segments[-1]['end'])
+    
+    # Get incidents using PostGIS
+    route_coords_tuple = [(c[0], c[1]) for c in route_coords]
+    incidents = get_incidents_using_postgis(route_coords_tuple)
+    
+    # Apply incident impacts to segments and total up the realistic time
+    segment_speeds, total_time_seconds = navigation_timing(route_segments, incidents)
+    
+    total_time_minutes = int(total_time_seconds / 60)
+    avg_speed = (total_distance / (total_time_seconds / 3600)) if total_time_seconds > 0 else 25
+    
+    print(f"⏱️  Navigation Details:")
+    print(f"   Distance: {total_distance:.2f} km")
+    print(f"   Time: {total_time_minutes} min ({total_time_seconds:.0f} sec)")
+    print(f"   Avg Speed: {avg_speed:.1f} km/h")
+    print(f"   Segments: {len(route_segments)}")
+    print(f"   Incidents: {len(incidents)}")
+    
+    nav = {
+        'geometry': {
+            'polyline': encode_polyline(route_coords),
+            'polyline_precision': POLYLINE_PRECISION,
+            'segment_speeds': segment_speeds,
+            'total_time_seconds': total_time_seconds,
+            'incidents': incidents
+        },
+        'total_distance': total_distance,
+        'total_time_minutes': total_time_minutes,
+        'avg_speed': avg_speed,
+        'num_segments': len(route_segments),
+        'num_incidents': len(incidents),
+        'road_seconds': road_seconds_by_class(route_segments, segment_speeds,
+                                              optimizer.edge_learner.speed_corrections)
+    }
+    if include_map_html:
+        nav['map_html'] = generate_navigation_map(
             route_coords, incidents, segment_speeds, total_time_seconds,
             session.src_lat, session.src_lon,
             session.dst_lat, session.dst_lon
         )
+    return nav
+
+
+@app.post("/api/start-navigation")
+async def start_navigation(session: NavigationSession, include_map_html: bool = False):
+    """Starts a session; pass include_map_html=true for the legacy folium map"""
+    try:
+        session_id = f"nav_{datetime.now().strftime('%Y%m%d%H%M%S')}_{session.user_id}"
         
-        active_sessions[session_id] = {
-            'route': session.selected_route,
-            'last_update': datetime.now(),
-            'eta_minutes': total_time_minutes,
-            'distance_km': total_distance,
-            'average_speed': avg_speed
-        }
+        center_lat = (session.src_lat + session.dst_lat) / 2
+        center_lon = (session.src_lon + session.dst_lon) / 2
+        nav = await route_workers.submit(
+            optimizer_key(center_lat, center_lon), compute_navigation, session, include_map_html
+        )
+        total_distance = nav['total_distance']
+        total_time_minutes = nav['total_time_minutes']
+        avg_speed = nav['avg_speed']
+        
+        # The SQLite store can wait on another worker's write lock; keep that off the event loop
+        await run_in_threadpool(
+            active_sessions.create, session_id, session.selected_route, total_time_minutes, total_distance, avg_speed
+        )
         
         # Store in database
         try:
-            conn = get_db_connection()
-            cursor = conn.cursor()
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS navigation_history (
-                    id SERIAL PRIMARY KEY,
-                    session_id VARCHAR(255) UNIQUE,
-                    user_id VARCHAR(255),
-                    route_id INTEGER,
-                    src_lat DOUBLE PRECISION,
-                    src_lon DOUBLE PRECISION,
-                    dst_lat DOUBLE PRECISION,
-                    dst_lon DOUBLE PRECISION,
-                    distance_km DOUBLE PRECISION,
-                    estimated_time INTEGER,
-                    average_speed DOUBLE PRECISION,
-                    start_time TIMESTAMP DEFAULT NOW(),
-                    status VARCHAR(50) DEFAULT 'active'
-                )
-            """)
-            cursor.execute("""
-                INSERT INTO navigation_history (session_id, user_id, route_id, src_lat, src_lon, dst_lat, dst_lon, distance_km, estimated_time, average_speed)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-            """, (session_id, session.user_id, session.route_id, session.src_lat, session.src_lon, 
-                  session.dst_lat, session.dst_lon, total_distance, total_time_minutes, avg_speed))
-            conn.commit()
-            cursor.close()
-            conn.close()
+            await db_pool.run(
+                record_navigation_start, session_id, session, total_distance, total_time_minutes, avg_speed,
+                nav['road_seconds']
+            )
         except Exception as db_error:
             print(f"⚠️ Database logging error: {db_error}")
         
-        return {
+        response = {
             'session_id': session_id,
             'status': 'started',
-            'map_html': nav_map_html,
+            'geometry': nav['geometry'],
             'distance_km': round(total_distance, 2),
             'eta_minutes': total_time_minutes,
             'average_speed': round(avg_speed, 1),
-            'num_segments': len(route_segments),
-            'num_incidents': len(incidents),
+            'num_segments': nav['num_segments'],
+            'num_incidents': nav['num_incidents'],
             'message': f'Navigation started: {total_distance:.1f} km in ~{total_time_minutes} min'
         }
+        if include_map_html:
+            response['map_html'] = nav['map_html']
+        return response
         
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"❌ Navigation error: {e}")
         import traceback
@@ -1206,21 +1777,364 @@ def generate_navigation_map(route_coords, incidents, segment_speeds, total_time_
     return m._parent.render()
 
 
+def compute_tile_segments(z: int, x: int, y: int) -> dict:
+    """Road segments with their current speeds for one tile; runs in a route worker"""
+    west, south, east, north = tile_bbox(z, x, y)
+    optimizer = get_optimizer((south + north) / 2, (west + east) / 2)
+    now = datetime.now()
+    snapshot = incident_feed.snapshot
+    stale_incidents = (snapshot is not None and optimizer.traffic_sim is not None and
+                       optimizer.traffic_sim.snapshot_version != snapshot.version)
+    if optimizer.weights is None or optimizer.applied_hour != now.hour or stale_incidents:
+        # Incidents for the whole graph, not just this tile, so later routes see the same set
+        optimizer.update_graph_weights(optimizer.scenario, now, bbox=optimizer.graph_bbox())
+    return segments_in_bbox(optimizer.get_weighter().arrays, optimizer.weights, (west, south, east, north), SPEED_RANGES)
+
+
+tile_cache = TileCache()
+
+
+@app.get("/tiles/{z}/{x}/{y}.mvt")
+async def traffic_tile(z: int, x: int, y: int):
+    """Vector tile with 'roads' (speed bucket, traffic factor) and 'incidents' layers"""
+    if not valid_tile(z, x, y):
+        raise HTTPException(status_code=404, detail="Tile out of range")
+    
+    # Rendered tiles stay valid until the incident snapshot or the hour changes
+    snapshot = incident_feed.snapshot
+    stamp = (snapshot.version if snapshot is not None else None, datetime.now().hour)
+    if stamp[0] is not None:
+        tile = tile_cache.get((z, x, y), stamp)
+        if tile is not None:
+            return Response(content=tile, media_type=MVT_MEDIA_TYPE)
+    
+    segments = EMPTY_SEGMENTS
+    if z >= ROAD_TILE_MIN_ZOOM:
+        west, south, east, north = tile_bbox(z, x, y)
+        try:
+            key = optimizer_key((south + north) / 2, (west + east) / 2)
+            segments = await route_workers.submit(key, compute_tile_segments, z, x, y)
+        except HTTPException as e:
+            if e.status_code != 404:
+                raise
+            # No stored road graph here: incidents only
+    
+    def render():
+        with db_pool.connection() as conn:
+            return render_tile(conn, z, x, y, segments)
+    
+    try:
+        tile = await db_pool.run(render)
+    except Exception as e:
+        print(f"❌ Tile error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    if stamp[0] is not None:
+        tile_cache.put((z, x, y), stamp, tile)
+    return Response(content=tile, media_type=MVT_MEDIA_TYPE)
+
+
+def compute_snap_trace(points: List[List[float]]) -> dict:
+    """Snap GPS points to the nearest edges of the cached graph; runs in a route worker"""
+    lats = np.array([p[0] for p in points], dtype=np.float64)
+    lons = np.array([p[1] for p in points], dtype=np.float64)
+    optimizer = get_optimizer(float(lats.mean()), float(lons.mean()))
+    snapper = optimizer.get_snapper()
+    snapped = snapper.nearest_edges(lats, lons)
+    
+    arrays = snapper.arrays
+    node_ids = arrays.node_ids
+    matches = []
+    for i, e in enumerate(snapped['edge'].tolist()):
+        matches.append({
+            'lat': float(snapped['lat'][i]),
+            'lon': float(snapped['lon'][i]),
+            'u': int(node_ids[arrays.u_idx[e]]),
+            'v': int(node_ids[arrays.v_idx[e]]),
+            'offset_m': round(float(snapped['offset_m'][i]), 1),
+            'fraction': round(float(snapped['fraction'][i]), 4),
+            'distance_m': round(float(snapped['distance_m'][i]), 1)
+        })
+    return {'matches': matches, 'status': 'success'}
+
+
+@app.post("/api/snap-trace")
+async def snap_trace(request: SnapTraceRequest):
+    """Snap a GPS trace (e.g. live_tracking positions) to road edges with offsets along them"""
+    if not request.points:
+        raise HTTPException(status_code=400, detail="No points given")
+    if any(len(p) != 2 for p in request.points):
+        raise HTTPException(status_code=400, detail="Points must be [lat, lon] pairs")
+    
+    center_lat = sum(p[0] for p in request.points) / len(request.points)
+    center_lon = sum(p[1] for p in request.points) / len(request.points)
+    try:
+        return await route_workers.submit(
+            optimizer_key(center_lat, center_lon), compute_snap_trace, request.points
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"❌ Snap error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+MATRIX_MAX_CELLS = int(os.getenv('MATRIX_MAX_CELLS', '250000'))
+MATRIX_CHUNK_ROWS = int(os.getenv('MATRIX_CHUNK_ROWS', '16'))
+MATRIX_WEIGHTS = ('combined_weight', 'travel_time', 'length')
+
+
+def weighted_optimizer(bbox: tuple, scenario: str, departure: datetime) -> AdaptiveRouteOptimizer:
+    """Cached optimizer covering bbox, weighted for this scenario and departure hour"""
+    optimizer = get_optimizer_for_bbox(bbox)
+    if optimizer.weights is None or optimizer.scenario != scenario \
+            or optimizer.applied_hour != departure.hour:
+        west, south, east, north = bbox
+        optimizer.update_graph_weights(scenario, departure, (south - 0.04, west - 0.04, north + 0.04, east + 0.04))
+    return optimizer
+
+
+def matrix_optimizer(request: MatrixRequest, departure: datetime) -> AdaptiveRouteOptimizer:
+    return weighted_optimizer(points_bbox(request.sources + request.targets), request.scenario, departure)
+
+
+def compute_matrix_snap(request: MatrixRequest, departure: datetime) -> dict:
+    """Bulk-snap sources and targets and weight the graph once; runs in a route worker"""
+    optimizer = matrix_optimizer(request, departure)
+    snapper = optimizer.get_snapper()
+    points = request.sources + request.targets
+    idx, dist = snapper.nearest_node_indices([p[0] for p in points], [p[1] for p in points])
+    node_ids = snapper.arrays.node_ids
+    snapped = [{'node': int(node_ids[i]), 'distance_m': round(float(d), 1)}
+               for i, d in zip(idx.tolist(), dist.tolist())]
+    return {
+        'sources': snapped[:len(request.sources)],
+        'targets': snapped[len(request.sources):],
+        'source_idx': idx[:len(request.sources)].tolist(),
+        'target_idx': idx[len(request.sources):].tolist()
+    }
+
+
+def compute_matrix_rows(request: MatrixRequest, departure: datetime, source_idx: List[int],
+                        target_idx: List[int], rows: List[int]) -> List[dict]:
+    """One-to-many Dijkstra per source row; runs in a route worker"""
+    optimizer = matrix_optimizer(request, departure)
+    arrays = optimizer.get_weighter().arrays
+    indptr, indices, edge_ids = arrays.csr()
+    weights = optimizer.weights
+    column = arrays.length if request.weight == 'length' else weights[request.weight]
+    metric_columns = [weights['travel_time'][edge_ids].tolist(), (arrays.length[edge_ids] / 1000).tolist(),
+                      weights['cost'][edge_ids].tolist(), weights['fuel'][edge_ids].tolist()]
+    edge_weights = column[edge_ids].tolist()
+    indptr_l, indices_l = indptr.tolist(), indices.tolist()
+
+    result = []
+    for row in rows:
+        found = dijkstra_to_targets(indptr_l, indices_l, edge_weights, metric_columns,
+                                    source_idx[row], target_idx)
+        cells = [found.get(t) for t in target_idx]
+        result.append({
+            'source': row,
+            'travel_time_minutes': [round(c[1][0] / 60, 2) if c else None for c in cells],
+            'distance_km': [round(c[1][1], 3) if c else None for c in cells],
+            'cost_rupees': [round(c[1][2], 2) if c else None for c in cells],
+            'fuel_rupees': [round(c[1][3], 3) if c else None for c in cells]
+        })
+    return result
+
+
+@app.post("/api/matrix")
+async def travel_matrix(request: MatrixRequest):
+    """N x M travel time / distance / cost / fuel matrix, streamed as NDJSON (one line per source)"""
+    if not request.sources or not request.targets:
+        raise HTTPException(status_code=400, detail="sources and targets must not be empty")
+    if any(len(p) != 2 for p in request.sources + request.targets):
+        raise HTTPException(status_code=400, detail="Points must be [lat, lon] pairs")
+    if len(request.sources) * len(request.targets) > MATRIX_MAX_CELLS:
+        raise HTTPException(status_code=413, detail=f"Matrix larger than {MATRIX_MAX_CELLS} cells")
+    if request.weight not in MATRIX_WEIGHTS:
+        raise HTTPException(status_code=400, detail=f"weight must be one of {', '.join(MATRIX_WEIGHTS)}")
+
+    departure = datetime.now()
+    key = optimizer_key_for_bbox(points_bbox(request.sources + request.targets))
+    snap = await route_workers.submit(key, compute_matrix_snap, request, departure)
+
+    async def stream():
+        yield json.dumps({
+            'scenario': request.scenario,
+            'weight': request.weight,
+            'departure': departure.isoformat(),
+            'sources': snap['sources'],
+            'targets': snap['targets']
+        }) + '\n'
+        rows = list(range(len(request.sources)))
+        for start in range(0, len(rows), MATRIX_CHUNK_ROWS):
+            try:
+                chunk = await route_workers.submit(
+                    key, compute_matrix_rows, request, departure,
+                    snap['source_idx'], snap['target_idx'], rows[start:start + MATRIX_CHUNK_ROWS]
+                )
+            except HTTPException as e:
+                yield json.dumps({'error': e.detail, 'status_code': e.status_code}) + '\n'
+                return
+            except Exception as e:
+                print(f"❌ Matrix error: {e}")
+                yield json.dumps({'error': str(e), 'status_code': 500}) + '\n'
+                return
+            for row in chunk:
+                yield json.dumps(row) + '\n'
+
+    return StreamingResponse(stream(), media_type='application/x-ndjson')
+
+
+ISOCHRONE_REACH_KMH = 60  # sizes the graph area; faster roads past the edge are cut off
+
+
+def isochrone_bbox(request: IsochroneRequest) -> tuple:
+    """Area drivable within the largest budget, clipped to the region holding the point"""
+    reach_km = max(request.budgets_minutes) / 60 * ISOCHRONE_REACH_KMH
+    west, south, east, north = points_bbox([[request.lat, request.lon]], pad=reach_km / 111 + 0.01)
+    region = graph_store.find_region(points_bbox([[request.lat, request.lon]]))
+    if region is None:
+        raise HTTPException(status_code=404, detail=NO_REGION_DETAIL)
+    r_west, r_south, r_east, r_north = region.bbox
+    return max(west, r_west), max(south, r_south), min(east, r_east), min(north, r_north)
+
+
+isochrone_cache = TileCache(ISOCHRONE_CACHE_SIZE)  # same stamped LRU as tiles, kept per worker
+
+
+def compute_isochrone(request: IsochroneRequest, departure: datetime) -> dict:
+    """Truncated Dijkstra on travel_time from the snapped point; runs in a route worker"""
+    bbox = isochrone_bbox(request)
+    # Snapping only needs the graph; weighting waits until the cache misses
+    snapper = get_optimizer_for_bbox(bbox).get_snapper()
+    idx, snap_dist = snapper.nearest_node_indices([request.lat], [request.lon])
+    source = int(idx[0])
+    node = int(snapper.arrays.node_ids[source])
+    budgets = sorted(set(request.budgets_minutes))
+    
+    snapshot = incident_feed.snapshot
+    key = (optimizer_key_for_bbox(bbox), node, request.scenario, tuple(budgets))
+    stamp = (departure.hour, snapshot.version if snapshot is not None else None)
+    cached = isochrone_cache.get(key, stamp) if stamp[1] is not None else None
+    if cached is not None:
+        return {**cached, 'cached': True}
+
+    optimizer = weighted_optimizer(bbox, request.scenario, departure)
+    arrays = snapper.arrays
+    indptr, indices, edge_ids = arrays.csr()
+    travel_time = optimizer.weights['travel_time']
+    settled = dijkstra_within(indptr, indices, travel_time[edge_ids].tolist(), source, budgets[-1] * 60)
+    node_dist = np.full(arrays.num_nodes, np.inf)
+    node_dist[list(settled)] = list(settled.values())
+    
+    polygons = isochrone_polygons(snapper, node_dist, travel_time, [b * 60 for b in budgets])
+    result = {
+        'type': 'FeatureCollection',
+        'features': [{
+            'type': 'Feature',
+            'geometry': geometry,
+            'properties': {
+                'budget_minutes': budget,
+                'reachable_nodes': int((node_dist <= budget * 60).sum())
+            }
+        } for budget, geometry in zip(budgets, polygons)],
+        'origin': {'node': node, 'snap_distance_m': round(float(snap_dist[0]), 1)},
+        'scenario': request.scenario,
+        'departure': departure.isoformat(),
+        'status': 'success'
+    }
+    if stamp[1] is not None:
+        isochrone_cache.put(key, stamp, result)
+    return {**result, 'cached': False}
+
+
+@app.post("/api/isochrone")
+async def isochrone(request: IsochroneRequest):
+    """Areas reachable within each time budget, as GeoJSON polygons (largest budget last)"""
+    budgets = request.budgets_minutes
+    if not budgets or len(budgets) > ISOCHRONE_MAX_BUDGETS:
+        raise HTTPException(status_code=400, detail=f"Give 1 to {ISOCHRONE_MAX_BUDGETS} budgets")
+    if min(budgets) <= 0 or max(budgets) > ISOCHRONE_MAX_MINUTES:
+        raise HTTPException(status_code=400,
+                            detail=f"Budgets must be between 0 and {ISOCHRONE_MAX_MINUTES:g} minutes")
+    
+    departure = request.departure_time or datetime.now()
+    key = optimizer_key_for_bbox(isochrone_bbox(request))
+    return await route_workers.submit(key, compute_isochrone, request, departure)
+
+
+def compute_speed_observations(points: List[tuple]) -> dict:
+    """Map-match consecutive (lat, lon, time) positions and record edge speeds; runs in a route worker"""
+    lats = [p[0] for p in points]
+    lons = [p[1] for p in points]
+    optimizer = get_optimizer(sum(lats) / len(lats), sum(lons) / len(lons))
+    edges, speeds, times = match_position_pairs(optimizer.get_snapper(), lats, lons, [p[2] for p in points])
+    arrays = optimizer.get_weighter().arrays
+    edges = [arrays.edges[e] for e in edges]
+    if edges:
+        speed_store.add(edges, speeds, times)
+    return {
+        'observations': [{'u': int(u), 'v': int(v), 'speed_kmh': round(speed, 1)}
+                         for (u, v), speed in zip(edges, speeds)],
+        'store': speed_store.stats()
+    }
+
+
+@app.post("/api/navigation-position")
+async def navigation_position(position: NavigationPosition):
+    """Live GPS position for an active session; consecutive positions feed observed edge speeds"""
+    timestamp = position.timestamp or datetime.now()
+    found, previous = await run_in_threadpool(
+        active_sessions.record_position, position.session_id, position.lat, position.lon, timestamp
+    )
+    if not found:
+        raise HTTPException(status_code=404, detail="Session not found")
+    if previous is None:
+        return {'session_id': position.session_id, 'observations': [], 'status': 'recorded'}
+    
+    points = [previous, (position.lat, position.lon, timestamp)]
+    result = await route_workers.submit(
+        optimizer_key((previous[0] + position.lat) / 2, (previous[1] + position.lon) / 2),
+        compute_speed_observations, points
+    )
+    return {'session_id': position.session_id, 'observations': result['observations'], 'status': 'recorded'}
+
+
+@app.post("/api/observed-speeds")
+async def observed_speeds(trace: PositionTrace):
+    """Consecutive positions tracked elsewhere (the live-tracking service); they feed observed edge speeds"""
+    if len(trace.positions) < 2:
+        return {'observations': [], 'status': 'recorded'}
+    points = [(p.lat, p.lon, p.timestamp) for p in trace.positions]
+    lat = sum(p[0] for p in points) / len(points)
+    lon = sum(p[1] for p in points) / len(points)
+    try:
+        result = await route_workers.submit(optimizer_key(lat, lon), compute_speed_observations, points)
+    except HTTPException as e:
+        if e.status_code != 404:
+            raise
+        return {'observations': [], 'status': 'no_graph'}
+    return {'observations': result['observations'], 'status': 'recorded'}
+
+
 @app.get("/api/navigation-status/{session_id}")
 async def get_navigation_status(session_id: str):
     """Get current navigation session status"""
     try:
-        if session_id not in active_sessions:
+        session = await run_in_threadpool(active_sessions.get, session_id)
+        if session is None:
             raise HTTPException(status_code=404, detail="Session not found")
         
-        session = active_sessions[session_id]
-        
         return {
             'session_id': session_id,
             'status': 'active',
             'last_update': session['last_update'].isoformat(),
-            'eta_minutes': session.get('eta_minutes', 0)
+            'eta_minutes': session['eta_minutes'] or 0
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -1233,16 +2147,7 @@ async def submit_navigation_feedback(session_id: str, actual_time_minutes: float
         print(f"📊 Feedback received for session {session_id}: {actual_time_minutes} minutes")
         
         # Update database
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("""
-            UPDATE navigation_history
-            SET actual_time = %s, status = 'completed', end_time = NOW()
-            WHERE session_id = %s
-        """, (actual_time_minutes, session_id))
-        conn.commit()
-        cursor.close()
-        conn.close()
+        await db_pool.run(record_navigation_feedback, session_id, actual_time_minutes)
         
         return {'status': 'success', 'message': 'Feedback recorded'}
     except Exception as e:
@@ -1252,11 +2157,35 @@ async def submit_navigation_feedback(session_id: str, actual_time_minutes: float
 @app.get("/api/health")
 async def health_check():
     """Health check endpoint"""
+    workers = route_workers.stats()
+    if route_workers.num_workers:
+        # Graphs live in the worker processes; each reports its cache with every job
+        graph_caches = [w['worker']['graph_cache'] for w in workers['per_worker'] if w['worker']]
+        route_caches = [w['worker']['route_cache'] for w in workers['per_worker'] if w['worker']]
+    else:
+        graph_caches = [optimizer_cache.stats()]
+        route_caches = [route_cache.stats()]
+    route_hits = sum(cache['hits'] for cache in route_caches)
+    route_lookups = route_hits + sum(cache['misses'] for cache in route_caches)
+    artifact = load_weight_artifact()
+    sessions = await run_in_threadpool(active_sessions.stats)
     return {
         "status": "healthy",
         "timestamp": datetime.now().isoformat(),
-        "cached_networks": len(optimizer_cache),
-        "active_sessions": len(active_sessions)
+        "cached_networks": sum(cache['entries'] for cache in graph_caches),
+        "graph_cache": graph_caches,
+        "incident_feed": incident_feed.stats(),
+        "feedback_learner": feedback_learner.stats(),
+        "weight_artifact": artifact.stats() if artifact is not None else None,
+        "database": db_pool.stats(),
+        "route_workers": workers,
+        "tile_cache": tile_cache.stats(),
+        "route_cache": {
+            "hit_rate": round(route_hits / route_lookups, 4) if route_lookups else 0.0,
+            "per_worker": route_caches
+        },
+        "active_sessions": sessions['live'],
+        "sessions": sessions
     }
 
 
@@ -1270,6 +2199,12 @@ async def root():
             "search": "/api/search-location?query=<location>",
             "optimize": "/api/optimize-route (POST)",
             "navigate": "/api/start-navigation (POST)",
+            "tiles": "/tiles/{z}/{x}/{y}.mvt",
+            "snap": "/api/snap-trace (POST)",
+            "matrix": "/api/matrix (POST, NDJSON)",
+            "isochrone": "/api/isochrone (POST)",
+            "position": "/api/navigation-position (POST)",
+            "observed_speeds": "/api/observed-speeds (POST)",
             "health": "/api/health"
         }
     }
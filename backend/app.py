@@ -9,7 +9,10 @@ import bcrypt
 import jwt
 import datetime
 from functools import wraps
+import json
 import os
+import threading
+import urllib.request
 from dotenv import load_dotenv
 from database import execute_query, execute_query_one, test_connection
 
@@ -19,6 +22,8 @@ load_dotenv()
 app = Flask(__name__, static_folder='../frontend', static_url_path='')
 app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'your_secret_key')
 app.config['JWT_SECRET'] = os.getenv('JWT_SECRET', 'jwt_secret_key')
+# Routing service (api.py); live-tracking positions are forwarded to it as speed observations
+ROUTING_API_URL = os.getenv('ROUTING_API_URL', 'http://localhost:8000')
 
 # Enable CORS for all routes
 CORS(app)
@@ -547,6 +552,19 @@ def start_navigation(current_user):
         return jsonify({'message': f'Error: {str(e)}', 'success': False}), 500
 
 
+def forward_position_pair(previous, current):
+    """Send two consecutive positions to the routing service's observed-speed store; best effort"""
+    body = json.dumps({'positions': [
+        {'lat': float(lat), 'lon': float(lng), 'timestamp': when.isoformat()} for lat, lng, when in (previous, current)
+    ]}).encode('utf-8')
+    req = urllib.request.Request(f"{ROUTING_API_URL}/api/observed-speeds", data=body,
+                                 headers={'Content-Type': 'application/json'}, method='POST')
+    try:
+        urllib.request.urlopen(req, timeout=2).close()
+    except Exception as e:
+        print(f"⚠ Could not forward position to routing service: {e}")
+
+
 @app.route('/api/navigation/update', methods=['POST'])
 @token_required
 def update_navigation(current_user):
@@ -554,6 +572,13 @@ def update_navigation(current_user):
     try:
         data = request.json
         
+        previous = execute_query_one(
+            """SELECT latitude, longitude, last_updated FROM live_tracking
+               WHERE tracking_id = %s AND user_id = %s""",
+            (data.get('tracking_id'), current_user['user_id'])
+        )
+        now = datetime.datetime.now()
+        
         execute_query(
             """UPDATE live_tracking 
                SET latitude = %s, longitude = %s, 
@@ -565,6 +590,12 @@ def update_navigation(current_user):
              data.get('tracking_id'), current_user['user_id'])
         )
         
+        if previous and previous['latitude'] is not None and data.get('lat') is not None and data.get('lng') is not None:
+            threading.Thread(target=forward_position_pair, daemon=True, args=(
+                (previous['latitude'], previous['longitude'], previous['last_updated']),
+                (data['lat'], data['lng'], now)
+            )).start()
+        
         return jsonify({'success': True}), 200
         
     except Exception as e:
@@ -0,0 +1,259 @@
+"""
+Routing benchmarks for the adaptive route optimizer
+Runs against a region from the offline graph store, or a synthetic grid city
+when no region is given.
+
+    python benchmark_routing.py                     # synthetic 80x80 grid
+    python benchmark_routing.py --region bangalore  # stored region
+"""
+
+import argparse
+import math
+import random
+import time
+from datetime import datetime
+
+import networkx as nx
+import numpy as np
+
+from api import AdaptiveRouteOptimizer, TrafficDataSimulator, INCIDENT_TYPE_MAPPING, haversine_distance
+from graph_store import GraphStore
+from navigation_timing import navigation_timing
+
+
+def synthetic_city(size: int = 80, seed: int = 42) -> nx.DiGraph:
+    """Grid road network around central Bangalore with mixed road classes"""
+    rnd = random.Random(seed)
+    road_types = ['primary', 'secondary', 'tertiary', 'residential', 'residential', 'trunk']
+    G = nx.DiGraph()
+    G.graph['crs'] = 'epsg:4326'
+    for i in range(size):
+        for j in range(size):
+            G.add_node(i * size + j,
+                       x=77.55 + j * 0.0015 + rnd.uniform(-0.0002, 0.0002),
+                       y=12.93 + i * 0.0015 + rnd.uniform(-0.0002, 0.0002))
+
+    def straight_line(a, b):
+        na, nb = G.nodes[a], G.nodes[b]
+        dy = math.radians(nb['y'] - na['y'])
+        dx = math.radians(nb['x'] - na['x']) * math.cos(math.radians(na['y']))
+        return 6371009 * math.hypot(dx, dy)
+
+    for i in range(size):
+        for j in range(size):
+            a = i * size + j
+            neighbours = ([a + 1] if j < size - 1 else []) + ([a + size] if i < size - 1 else [])
+            for b in neighbours:
+                highway = rnd.choice(road_types)
+                for u, v in ((a, b), (b, a)):
+                    if rnd.random() < 0.95:
+                        G.add_edge(u, v, length=straight_line(u, v) * rnd.uniform(1.0, 1.3), highway=highway)
+    return G
+
+
+def synthetic_incidents(G: nx.DiGraph, count: int = 300, seed: int = 11) -> list:
+    """Incidents scattered over the graph's extent, shaped like IncidentDataFetcher rows"""
+    rnd = random.Random(seed)
+    xs = [d['x'] for _, d in G.nodes(data=True)]
+    ys = [d['y'] for _, d in G.nodes(data=True)]
+    incidents = []
+    for i in range(count):
+        ty = rnd.choice(list(INCIDENT_TYPE_MAPPING))
+        incidents.append({
+            'id': i, 'ty': ty, 'sd': datetime.now(),
+            'lat': rnd.uniform(min(ys), max(ys)), 'lon': rnd.uniform(min(xs), max(xs)),
+            'severity': INCIDENT_TYPE_MAPPING[ty]
+        })
+    return incidents
+
+
+def load_graph(region_name: str = None) -> nx.DiGraph:
+    if region_name is None:
+        return synthetic_city()
+    for region in GraphStore().regions:
+        if region.name == region_name:
+            return region.load_graph()
+    raise SystemExit(f"Region '{region_name}' not found in graph store")
+
+
+def random_pairs(G: nx.DiGraph, count: int, seed: int = 7) -> list:
+    rnd = random.Random(seed)
+    nodes = list(G.nodes)
+    return [tuple(rnd.sample(nodes, 2)) for _ in range(count)]
+
+
+def bench_edge_weights(optimizer: AdaptiveRouteOptimizer, hour: int = 18, scenario: str = 'personal'):
+    """The original per-edge get_traffic_factor + compute_edge_weight loop against the vectorized update"""
+    print(f"\n⚖️  Edge weights ({len(optimizer.G.edges)} edges, hour {hour:02d}, scenario={scenario})")
+    print(f"{'backend':<28}{'ms':>10}{'max |Δw|':>14}")
+    current_time = datetime.now().replace(hour=hour)
+    G, traffic_sim, learner = optimizer.G, optimizer.traffic_sim, optimizer.edge_learner
+    observed = optimizer.get_weighter().observed_base
+
+    start = time.perf_counter()
+    scalar = []
+    for i, (u, v) in enumerate(optimizer.get_weighter().arrays.edges):
+        data = G[u][v]
+        mid_lat = (G.nodes[u]['y'] + G.nodes[v]['y']) / 2
+        mid_lon = (G.nodes[u]['x'] + G.nodes[v]['x']) / 2
+        traffic_factor, _ = traffic_sim.get_traffic_factor(data, mid_lat, mid_lon, current_time)
+        observed_speed = observed[i] if observed is not None and not math.isnan(observed[i]) else None
+        scalar.append(learner.compute_edge_weight(data, traffic_factor, scenario, observed_speed)['combined_weight'])
+    scalar_ms = (time.perf_counter() - start) * 1000
+    print(f"{'per-edge loop (baseline)':<28}{scalar_ms:>10.1f}{'':>14}")
+
+    optimizer.weights = None  # force a full update rather than an incremental one
+    start = time.perf_counter()
+    optimizer.update_graph_weights(scenario, current_time)
+    vectorized_ms = (time.perf_counter() - start) * 1000
+    max_diff = float(np.abs(np.asarray(scalar) - optimizer.weights['combined_weight']).max())
+    print(f"{'update_graph_weights':<28}{vectorized_ms:>10.1f}{max_diff:>14.2e}")
+    assert max_diff < 1e-6, f"vectorized weights differ from the per-edge loop by {max_diff}"
+
+
+def bench_search_modes(optimizer: AdaptiveRouteOptimizer, pairs: list, weight: str = 'combined_weight'):
+    print(f"\n🔎 Shortest path search ({len(pairs)} queries, weight={weight})")
+    print(f"{'backend':<28}{'avg ms':>10}{'avg settled':>14}")
+
+    start = time.perf_counter()
+    for s, t in pairs:
+        try:
+            nx.astar_path(optimizer.G, s, t, weight=weight)
+        except nx.NetworkXNoPath:
+            pass
+    elapsed = (time.perf_counter() - start) / len(pairs) * 1000
+    print(f"{'nx.astar_path (baseline)':<28}{elapsed:>10.2f}{'n/a':>14}")
+
+    for mode in ('dijkstra', 'astar', 'bidirectional', 'alt', 'cch'):
+        optimizer.search_mode = mode
+        search = optimizer.make_search()
+        if mode == 'alt':
+            optimizer.get_landmarks(weight)  # preprocessing is reported separately
+        if mode == 'cch':
+            optimizer.get_cch_metric(weight)
+        settled = 0
+        start = time.perf_counter()
+        for s, t in pairs:
+            try:
+                search(s, t, weight)
+            except nx.NetworkXNoPath:
+                pass
+            settled += optimizer.route_search.last_settled
+        elapsed = (time.perf_counter() - start) / len(pairs) * 1000
+        settled_text = 'n/a' if mode == 'cch' else f"{settled / len(pairs):.0f}"
+        print(f"{mode:<28}{elapsed:>10.2f}{settled_text:>14}")
+
+
+def bench_cch(optimizer: AdaptiveRouteOptimizer, pairs: list, weight: str = 'combined_weight'):
+    cch = optimizer.get_cch()
+    print(f"\n🏗️  Customizable contraction hierarchy ({len(pairs)} queries, weight={weight})")
+    print(f"   {cch.num_arcs} arcs, {cch.num_triangles} lower triangles")
+
+    for hour in (8, 14, 23):
+        optimizer.update_graph_weights('personal', datetime.now().replace(hour=hour))
+        start = time.perf_counter()
+        metric = optimizer.get_cch_metric(weight)
+        print(f"   customization (hour {hour:02d}): {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    start = time.perf_counter()
+    for s, t in pairs:
+        metric.query(s, t)
+    print(f"   query: {(time.perf_counter() - start) / len(pairs) * 1000:.2f} ms avg")
+
+
+def loop_navigation_timing(route_segments: list, incidents: list) -> tuple:
+    """The original per-segment x per-incident loop from start_navigation, kept as the reference"""
+    segment_speeds = []
+    total_time_seconds = 0
+    for seg in route_segments:
+        min_speed = seg['speed_kmh']
+        for inc in incidents:
+            seg_mid_lat = (seg['start'][0] + seg['end'][0]) / 2
+            seg_mid_lng = (seg['start'][1] + seg['end'][1]) / 2
+            if haversine_distance(seg_mid_lat, seg_mid_lng, inc['lat'], inc['lng']) < inc['affected_distance']:
+                min_speed = min(min_speed, inc['speed'])
+        segment_speeds.append(min_speed)
+        speed = min_speed if min_speed > 0 else 25
+        total_time_seconds += (seg['distance_km'] / speed) * 3600
+    return segment_speeds, total_time_seconds
+
+
+def route_segments_for(G: nx.DiGraph, route: list) -> list:
+    return [{
+        'start': [G.nodes[u]['y'], G.nodes[u]['x']],
+        'end': [G.nodes[v]['y'], G.nodes[v]['x']],
+        'distance_km': G[u][v]['length'] / 1000,
+        'speed_kmh': G[u][v].get('adjusted_speed', 25)
+    } for u, v in zip(route[:-1], route[1:])]
+
+
+def bench_navigation_timing(optimizer: AdaptiveRouteOptimizer, pairs: list, incident_count: int = 200):
+    print(f"\n⏱️  Navigation timing (segments x {incident_count} incidents)")
+    print(f"{'segments':>10}{'loop ms':>12}{'batched ms':>12}{'max |Δt| s':>14}")
+    rnd = random.Random(5)
+    search = optimizer.make_search()
+    routes = []
+    for s, t in pairs:
+        try:
+            routes.append(search(s, t, 'length'))
+        except nx.NetworkXNoPath:
+            pass
+    # Longest routes first, plus one stitched "long trip" of all of them
+    routes.sort(key=len, reverse=True)
+    segment_sets = [route_segments_for(optimizer.G, r) for r in routes[:3]]
+    segment_sets.append([seg for r in routes for seg in route_segments_for(optimizer.G, r)])
+
+    for segments in segment_sets:
+        incidents = []
+        for _ in range(incident_count):
+            seg = rnd.choice(segments)
+            ty = rnd.choice(list(INCIDENT_TYPE_MAPPING))
+            incidents.append({
+                'lat': seg['start'][0] + rnd.uniform(-0.002, 0.002),
+                'lng': seg['start'][1] + rnd.uniform(-0.002, 0.002),
+                'affected_distance': rnd.choice([150, 300, 500]),
+                'speed': INCIDENT_TYPE_MAPPING[ty]['speed']
+            })
+        start = time.perf_counter()
+        _, loop_total = loop_navigation_timing(segments, incidents)
+        loop_ms = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        _, batched_total = navigation_timing(segments, incidents)
+        batched_ms = (time.perf_counter() - start) * 1000
+        print(f"{len(segments):>10}{loop_ms:>12.1f}{batched_ms:>12.1f}{abs(loop_total - batched_total):>14.2e}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Route optimizer benchmarks")
+    parser.add_argument('--region', help='Graph store region (default: synthetic grid)')
+    parser.add_argument('--queries', type=int, default=50)
+    args = parser.parse_args()
+
+    G = load_graph(args.region)
+    print(f"📊 Graph: {len(G.nodes)} nodes, {len(G.edges)} edges")
+
+    optimizer = AdaptiveRouteOptimizer(G)
+    optimizer.traffic_sim = TrafficDataSimulator(None)
+    optimizer.traffic_sim.incidents = synthetic_incidents(G)
+    optimizer.traffic_sim._build_incident_index()
+    start = time.perf_counter()
+    optimizer.update_graph_weights('personal', datetime.now().replace(hour=18))
+    print(f"⚖️  update_graph_weights ({len(optimizer.traffic_sim.incidents)} incidents): "
+          f"{(time.perf_counter() - start) * 1000:.1f} ms")
+
+    bench_edge_weights(optimizer)
+
+    pairs = random_pairs(G, args.queries)
+    start = time.perf_counter()
+    optimizer.get_landmarks('combined_weight')
+    print(f"🗺️  ALT landmark preprocessing: {(time.perf_counter() - start) * 1000:.1f} ms")
+    start = time.perf_counter()
+    optimizer.get_cch()
+    print(f"🏗️  CCH metric-independent preprocessing: {(time.perf_counter() - start) * 1000:.1f} ms")
+    bench_search_modes(optimizer, pairs)
+    bench_cch(optimizer, pairs)
+    bench_navigation_timing(optimizer, pairs)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,328 @@
+"""
+Customizable contraction hierarchy (CCH) for the drive network
+Metric-independent preprocessing (node order + chordal supergraph) runs once per
+graph; customization applies a per-edge weight array (any scenario/hour) with a
+few vectorized passes; queries walk the elimination tree (see CCHMetric.query
+for what that costs in pure Python).
+"""
+
+import math
+from typing import List
+
+import numpy as np
+
+
+def nested_dissection_order(arrays, leaf_size: int = 32) -> np.ndarray:
+    """Geometric nested dissection: recursive median cuts, separators ranked above both halves"""
+    n = arrays.num_nodes
+    coords = (arrays.node_x * np.cos(np.radians(arrays.node_y.mean() if n else 0)), arrays.node_y)
+    loops = arrays.u_idx == arrays.v_idx
+    all_u, all_v = arrays.u_idx[~loops], arrays.v_idx[~loops]
+    degree = np.bincount(np.concatenate([all_u, all_v]), minlength=n)
+
+    order = []
+    left_side = np.zeros(n, dtype=bool)
+    separator = np.zeros(n, dtype=bool)
+    # Each task is (nodes, edge tails, edge heads) or a finished separator to emit
+    stack = [('split', np.arange(n), all_u, all_v)]
+    while stack:
+        task = stack.pop()
+        if task[0] == 'emit':
+            order.extend(task[1].tolist())
+            continue
+        _, nodes, eu, ev = task
+        if len(nodes) <= leaf_size:
+            order.extend(nodes[np.argsort(degree[nodes], kind='stable')].tolist())
+            continue
+
+        spans = [c[nodes].max() - c[nodes].min() for c in coords]
+        axis = coords[int(np.argmax(spans))]
+        values = axis[nodes]
+        median = np.median(values)
+        is_left = values < median
+        if is_left.all() or not is_left.any():
+            is_left = np.arange(len(nodes)) < len(nodes) // 2
+        left_side[nodes] = is_left
+
+        cut = left_side[eu] != left_side[ev]
+        sep_nodes = np.unique(np.where(left_side[eu[cut]], eu[cut], ev[cut]))
+        separator[sep_nodes] = True
+        keep = ~separator[eu] & ~separator[ev] & ~cut
+        eu, ev = eu[keep], ev[keep]
+
+        left_nodes = nodes[is_left & ~separator[nodes]]
+        right_nodes = nodes[~is_left]
+        in_left = left_side[eu]
+        separator[sep_nodes] = False
+
+        # Stack is LIFO: halves are ordered first, the separator last
+        stack.append(('emit', sep_nodes))
+        stack.append(('split', right_nodes, eu[~in_left], ev[~in_left]))
+        stack.append(('split', left_nodes, eu[in_left], ev[in_left]))
+
+    return np.array(order, dtype=np.int64)
+
+
+class CCH:
+    """Metric-independent part: elimination order, upward arcs and lower triangles"""
+
+    def __init__(self, arrays):
+        self.arrays = arrays
+        self._query_lists = None
+        n = arrays.num_nodes
+        u_idx = arrays.u_idx
+        v_idx = arrays.v_idx
+
+        adjacency = [set() for _ in range(n)]
+        for u, v in zip(u_idx.tolist(), v_idx.tolist()):
+            if u != v:
+                adjacency[u].add(v)
+                adjacency[v].add(u)
+
+        # Eliminate in nested-dissection order; the fill edges make the graph chordal
+        order = nested_dissection_order(arrays)
+        self.rank = np.empty(n, dtype=np.int64)
+        self.rank[order] = np.arange(n)
+        upward = [None] * n
+        for v in order.tolist():
+            neighbours = adjacency[v]
+            upward[v] = neighbours
+            for a in neighbours:
+                adjacency[a].discard(v)
+            for a in neighbours:
+                adjacency[a].update(neighbours)
+                adjacency[a].discard(a)
+            adjacency[v] = set()
+
+        # Upward arcs, grouped by lower endpoint and sorted by head rank
+        rank = self.rank
+        self.up_indptr = np.zeros(n + 1, dtype=np.int64)
+        heads = []
+        for v in range(n):
+            ups = sorted(upward[v], key=lambda w: rank[w])
+            heads.extend(ups)
+            self.up_indptr[v + 1] = len(heads)
+        self.arc_head = np.array(heads, dtype=np.int64)
+        self.arc_tail = np.repeat(np.arange(n), np.diff(self.up_indptr))
+        self.num_arcs = len(heads)
+        self.arc_id = {(t, h): a for a, (t, h) in enumerate(zip(self.arc_tail.tolist(), heads))}
+
+        # Elimination tree: parent is the lowest-ranked upper neighbour
+        self.parent = np.full(n, -1, dtype=np.int64)
+        has_up = np.diff(self.up_indptr) > 0
+        self.parent[has_up] = self.arc_head[self.up_indptr[:-1][has_up]]
+        # Ancestors of a node all have distinct depths, so upward searches index by depth
+        depth = [0] * n
+        parent = self.parent.tolist()
+        for v in order[::-1].tolist():
+            if parent[v] >= 0:
+                depth[v] = depth[parent[v]] + 1
+        self.depth = np.array(depth, dtype=np.int64)
+
+        # Original edges -> arcs (direction: True when the edge runs lower -> higher rank)
+        edge_up = rank[u_idx] < rank[v_idx]
+        lower = np.where(edge_up, u_idx, v_idx)
+        higher = np.where(edge_up, v_idx, u_idx)
+        self.edge_arc = np.array(
+            [self.arc_id.get((a, b), -1) for a, b in zip(lower.tolist(), higher.tolist())], dtype=np.int64
+        )
+        self.edge_up = edge_up
+
+        # Lower triangles {x, u, v} with rank x < u < v update arc (u, v) from arcs (x, u), (x, v)
+        level = np.zeros(n, dtype=np.int64)
+        for v in np.argsort(rank).tolist():
+            for k in range(self.up_indptr[v], self.up_indptr[v + 1]):
+                w = heads[k]
+                if level[w] < level[v] + 1:
+                    level[w] = level[v] + 1
+
+        tri_target, tri_xu, tri_xv = [], [], []
+        arc_id = self.arc_id
+        for x in range(n):
+            start, end = self.up_indptr[x], self.up_indptr[x + 1]
+            for i in range(start, end):
+                u = heads[i]
+                for j in range(i + 1, end):
+                    v = heads[j]
+                    tri_target.append(arc_id[(u, v)])
+                    tri_xu.append(i)
+                    tri_xv.append(j)
+        tri_target = np.array(tri_target, dtype=np.int64)
+        tri_xu = np.array(tri_xu, dtype=np.int64)
+        tri_xv = np.array(tri_xv, dtype=np.int64)
+
+        # Customization order: by level of the target arc's lower endpoint
+        tri_level = level[self.arc_tail[tri_target]] if len(tri_target) else np.zeros(0, dtype=np.int64)
+        order = np.argsort(tri_level, kind='stable')
+        self.tri_target = tri_target[order]
+        self.tri_xu = tri_xu[order]
+        self.tri_xv = tri_xv[order]
+        bounds = np.searchsorted(tri_level[order], np.arange(tri_level.max() + 2 if len(tri_level) else 1))
+        self.level_bounds = list(zip(bounds[:-1].tolist(), bounds[1:].tolist()))
+
+        # Triangles grouped by target arc, for unpacking shortcuts
+        by_target = np.argsort(self.tri_target, kind='stable')
+        self.unpack_order = by_target
+        self.unpack_indptr = np.zeros(self.num_arcs + 1, dtype=np.int64)
+        np.cumsum(np.bincount(self.tri_target, minlength=self.num_arcs), out=self.unpack_indptr[1:])
+
+    def query_lists(self) -> tuple:
+        """(up_indptr, head depth per arc, parent, depth, arc tail) as plain lists"""
+        if self._query_lists is None:
+            self._query_lists = (self.up_indptr.tolist(), self.depth[self.arc_head].tolist(),
+                                 self.parent.tolist(), self.depth.tolist(), self.arc_tail.tolist())
+        return self._query_lists
+
+    @property
+    def num_triangles(self) -> int:
+        return len(self.tri_target)
+
+    def customize(self, edge_weights: np.ndarray) -> 'CCHMetric':
+        """Apply one metric (per-edge weights in GraphArrays edge order)"""
+        original_up = np.full(self.num_arcs, math.inf)
+        original_down = np.full(self.num_arcs, math.inf)
+        valid = self.edge_arc >= 0
+        up_edges = valid & self.edge_up
+        down_edges = valid & ~self.edge_up
+        np.minimum.at(original_up, self.edge_arc[up_edges], edge_weights[up_edges])
+        np.minimum.at(original_down, self.edge_arc[down_edges], edge_weights[down_edges])
+
+        up = original_up.copy()
+        down = original_down.copy()
+        for start, end in self.level_bounds:
+            if start == end:
+                continue
+            target = self.tri_target[start:end]
+            xu = self.tri_xu[start:end]
+            xv = self.tri_xv[start:end]
+            # u -> x -> v and v -> x -> u
+            np.minimum.at(up, target, down[xu] + up[xv])
+            np.minimum.at(down, target, down[xv] + up[xu])
+        return CCHMetric(self, up, down, original_up, original_down)
+
+    def nbytes(self) -> int:
+        return sum(a.nbytes for a in (
+            self.rank, self.depth, self.up_indptr, self.arc_head, self.arc_tail, self.parent, self.edge_arc,
+            self.tri_target, self.tri_xu, self.tri_xv, self.unpack_order, self.unpack_indptr
+        ))
+
+
+class CCHMetric:
+    """Customized arc weights; answers shortest path queries on the hierarchy"""
+
+    def __init__(self, cch: CCH, up: np.ndarray, down: np.ndarray,
+                 original_up: np.ndarray, original_down: np.ndarray):
+        self.cch = cch
+        self.up = up
+        self.down = down
+        self.original_up = original_up
+        self.original_down = original_down
+        # Plain lists are much faster than NumPy scalars in the query loops
+        self._up_list = up.tolist()
+        self._down_list = down.tolist()
+
+    def _upward_search(self, start: int, weights: list) -> tuple:
+        """Distances and arcs used over the elimination-tree ancestors of start, indexed by depth"""
+        up_indptr, head_depth, parent, depth, _ = self.cch.query_lists()
+        d = depth[start]
+        dist = [math.inf] * (d + 1)
+        via = [-1] * (d + 1)
+        dist[d] = 0.0
+        v = start
+        while v != -1:
+            dv = dist[d]
+            if dv < math.inf:
+                for k in range(up_indptr[v], up_indptr[v + 1]):
+                    h = head_depth[k]
+                    nd = dv + weights[k]
+                    if nd < dist[h]:
+                        dist[h] = nd
+                        via[h] = k
+            v = parent[v]
+            d -= 1
+        return dist, via
+
+    def _common_depth(self, s: int, t: int) -> int:
+        """Depth of the lowest common ancestor of s and t; -1 when they are in different trees"""
+        _, _, parent, depth, _ = self.cch.query_lists()
+        while depth[s] > depth[t]:
+            s = parent[s]
+        while depth[t] > depth[s]:
+            t = parent[t]
+        while s != t:
+            s, t = parent[s], parent[t]
+            if s == -1:
+                return -1
+        return depth[s]
+
+    def query(self, source, target) -> tuple:
+        """(distance, node path) between two graph node ids; (inf, []) when unreachable
+
+        Both searches only walk the elimination-tree ancestors (about 200
+        nodes on the 6.4k-node benchmark grid) but relax each one's upward
+        arcs (about 14k per side) in Python: roughly 2.5 ms per query there,
+        against 9 ms for bidirectional A*, so milliseconds rather than
+        microseconds.
+        """
+        node_index = self.cch.arrays.node_index
+        s, t = node_index[source], node_index[target]
+        common = self._common_depth(s, t)
+        if common < 0:
+            return math.inf, []
+        forward, forward_via = self._upward_search(s, self._up_list)
+        backward, backward_via = self._upward_search(t, self._down_list)
+
+        best, meeting = min(
+            (df + db, d) for d, (df, db) in enumerate(zip(forward[:common + 1], backward[:common + 1]))
+        )
+        if best == math.inf:
+            return math.inf, []
+
+        # Forward half: arcs walked lower -> higher; backward half: higher -> lower
+        _, _, _, depth, arc_tail = self.cch.query_lists()
+        arcs = []
+        d = meeting
+        while forward_via[d] != -1:
+            k = forward_via[d]
+            arcs.append((k, True))
+            d = depth[arc_tail[k]]
+        arcs.reverse()
+        d = meeting
+        while backward_via[d] != -1:
+            k = backward_via[d]
+            arcs.append((k, False))
+            d = depth[arc_tail[k]]
+
+        path = [s]
+        for k, upward in arcs:
+            self._unpack(k, upward, path)
+        node_ids = self.cch.arrays.node_ids
+        return best, [node_ids[i] for i in path]
+
+    def _unpack(self, k: int, upward: bool, path: List[int]):
+        """Append the original-edge expansion of arc k (excluding its start node)"""
+        cch = self.cch
+        stack = [(k, upward)]
+        while stack:
+            k, upward = stack.pop()
+            weight = self.up[k] if upward else self.down[k]
+            original = self.original_up[k] if upward else self.original_down[k]
+            tail, head = int(cch.arc_tail[k]), int(cch.arc_head[k])
+            if original == weight:
+                path.append(head if upward else tail)
+                continue
+            triangles = cch.unpack_order[cch.unpack_indptr[k]:cch.unpack_indptr[k + 1]]
+            xu, xv = cch.tri_xu[triangles], cch.tri_xv[triangles]
+            # u -> x -> v upward, v -> x -> u downward
+            first, second = (xu, xv) if upward else (xv, xu)
+            match = np.nonzero(self.down[first] + self.up[second] == weight)[0]
+            if not len(match):
+                raise RuntimeError(f"Cannot unpack CCH arc {k}")
+            i = match[0]
+            # Push in reverse order
+            if upward:
+                stack.append((int(xv[i]), True))
+                stack.append((int(xu[i]), False))
+            else:
+                stack.append((int(xu[i]), True))
+                stack.append((int(xv[i]), False))
@@ -0,0 +1,133 @@
+"""
+Pooled PostgreSQL access for the route service
+Connections come from a shared psycopg2 ThreadedConnectionPool with a server-side
+statement timeout; async endpoints run their queries through run_in_threadpool
+so waiting on PostgreSQL never blocks the event loop.
+"""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from psycopg2 import pool
+from fastapi.concurrency import run_in_threadpool
+
+DB_POOL_MIN = int(os.getenv('DB_POOL_MIN', '1'))
+DB_POOL_MAX = int(os.getenv('DB_POOL_MAX', '10'))
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv('DB_STATEMENT_TIMEOUT_MS', '5000'))
+DB_CHECKOUT_TIMEOUT = float(os.getenv('DB_CHECKOUT_TIMEOUT', '10'))
+
+
+class PoolTimeout(Exception):
+    """No connection became free within the checkout timeout"""
+
+
+class DatabasePool:
+    """Thread-safe connection pool; checkouts wait for a free slot instead of failing"""
+
+    def __init__(self, db_config: dict, minconn: int = DB_POOL_MIN, maxconn: int = DB_POOL_MAX,
+                 statement_timeout_ms: int = DB_STATEMENT_TIMEOUT_MS,
+                 checkout_timeout: float = DB_CHECKOUT_TIMEOUT):
+        self.db_config = db_config
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.statement_timeout_ms = statement_timeout_ms
+        self.checkout_timeout = checkout_timeout
+        self._pool = None
+        self._pool_lock = threading.Lock()
+        # ThreadedConnectionPool raises when exhausted; the semaphore makes callers queue
+        self._slots = threading.BoundedSemaphore(maxconn)
+        self._metrics_lock = threading.Lock()
+        self.in_use = 0
+        self.checkouts = 0
+        self.timeouts = 0
+        self.errors = 0
+        self.discarded = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def _get_pool(self) -> pool.ThreadedConnectionPool:
+        # Created on first use so importing the API never needs a live database
+        if self._pool is None:
+            with self._pool_lock:
+                if self._pool is None:
+                    self._pool = pool.ThreadedConnectionPool(
+                        self.minconn, self.maxconn,
+                        options=f"-c statement_timeout={self.statement_timeout_ms}",
+                        **self.db_config
+                    )
+        return self._pool
+
+    @contextmanager
+    def connection(self):
+        """Check out a connection; commits on success, rolls back on error"""
+        start = time.monotonic()
+        if not self._slots.acquire(timeout=self.checkout_timeout):
+            with self._metrics_lock:
+                self.timeouts += 1
+            raise PoolTimeout(f"No database connection free after {self.checkout_timeout:g}s")
+
+        conn = None
+        try:
+            conn = self._get_pool().getconn()
+            waited = time.monotonic() - start
+            with self._metrics_lock:
+                self.checkouts += 1
+                self.in_use += 1
+                self.wait_total += waited
+                self.wait_max = max(self.wait_max, waited)
+
+            try:
+                yield conn
+                conn.commit()
+            except Exception:
+                with self._metrics_lock:
+                    self.errors += 1
+                if not conn.closed:
+                    conn.rollback()
+                raise
+        finally:
+            if conn is not None:
+                broken = bool(conn.closed)
+                with self._metrics_lock:
+                    self.in_use -= 1
+                    self.discarded += broken
+                self._pool.putconn(conn, close=broken)
+            self._slots.release()
+
+    async def run(self, fn, *args, **kwargs):
+        """Run a blocking DB function in the threadpool"""
+        return await run_in_threadpool(fn, *args, **kwargs)
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.closeall()
+            self._pool = None
+
+    def stats(self) -> dict:
+        with self._metrics_lock:
+            return {
+                'max_connections': self.maxconn,
+                'in_use': self.in_use,
+                'checkouts': self.checkouts,
+                'timeouts': self.timeouts,
+                'errors': self.errors,
+                'discarded': self.discarded,
+                'avg_wait_ms': round(self.wait_total / self.checkouts * 1000, 2) if self.checkouts else 0.0,
+                'max_wait_ms': round(self.wait_max * 1000, 2),
+                'statement_timeout_ms': self.statement_timeout_ms
+            }
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(db_config: dict) -> DatabasePool:
+    """One shared pool per database configuration"""
+    key = tuple(sorted(db_config.items()))
+    with _pools_lock:
+        if key not in _pools:
+            _pools[key] = DatabasePool(db_config)
+        return _pools[key]
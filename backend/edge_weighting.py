@@ -0,0 +1,251 @@
+"""
+Vectorized edge weighting for the adaptive route optimizer
+Extracts per-edge columns once per cached graph and re-weights every edge in bulk
+"""
+
+import numpy as np
+
+
+class GraphArrays:
+    """Column view of a DiGraph's nodes and edges, extracted once per graph"""
+
+    def __init__(self, G):
+        self.node_ids = list(G.nodes)
+        self.node_index = {n: i for i, n in enumerate(self.node_ids)}
+        self.node_x = np.array([G.nodes[n]['x'] for n in self.node_ids], dtype=np.float64)
+        self.node_y = np.array([G.nodes[n]['y'] for n in self.node_ids], dtype=np.float64)
+
+        # Edge order is fixed here; every per-edge array in the optimizer uses it
+        self.edges = []
+        self.edge_data = []
+        for u, v, data in G.edges(data=True):
+            self.edges.append((u, v))
+            self.edge_data.append(data)
+        self.edge_index = {e: i for i, e in enumerate(self.edges)}
+
+        self.u_idx = np.array([self.node_index[u] for u, _ in self.edges], dtype=np.int64)
+        self.v_idx = np.array([self.node_index[v] for _, v in self.edges], dtype=np.int64)
+        self.mid_lat = (self.node_y[self.u_idx] + self.node_y[self.v_idx]) / 2
+        self.mid_lon = (self.node_x[self.u_idx] + self.node_x[self.v_idx]) / 2
+        self.length = np.array([d.get('length', 0) for d in self.edge_data], dtype=np.float64)
+
+        # Road class as integer codes into a small vocabulary
+        self.road_types = []
+        road_lookup = {}
+        codes = []
+        for d in self.edge_data:
+            road_type = d.get('highway', 'residential')
+            if isinstance(road_type, list):
+                road_type = road_type[0]
+            if road_type not in road_lookup:
+                road_lookup[road_type] = len(self.road_types)
+                self.road_types.append(road_type)
+            codes.append(road_lookup[road_type])
+        self.road_code = np.array(codes, dtype=np.int32)
+
+        # Usable OSM maxspeed (already scaled to ~70% achievable), NaN when absent
+        self.maxspeed_base = np.array(
+            [self._parse_maxspeed(d.get('maxspeed')) for d in self.edge_data],
+            dtype=np.float64
+        )
+
+    @staticmethod
+    def _parse_maxspeed(osm_maxspeed) -> float:
+        if not osm_maxspeed:
+            return np.nan
+        if isinstance(osm_maxspeed, list):
+            osm_maxspeed = osm_maxspeed[0]
+        try:
+            speed_value = float(osm_maxspeed)
+        except (ValueError, TypeError):
+            return np.nan
+        # Only use if reasonable for Indian city (5-80 km/h)
+        if 5 <= speed_value <= 80:
+            return speed_value * 0.7
+        return np.nan
+
+    @property
+    def num_edges(self) -> int:
+        return len(self.edges)
+
+    @property
+    def num_nodes(self) -> int:
+        return len(self.node_ids)
+
+    def csr(self, reverse: bool = False) -> tuple:
+        """(indptr, neighbour index, edge id) adjacency, forward or reversed; built once"""
+        cache_name = '_reverse_csr' if reverse else '_csr'
+        cached = getattr(self, cache_name, None)
+        if cached is None:
+            tail, head = (self.v_idx, self.u_idx) if reverse else (self.u_idx, self.v_idx)
+            order = np.argsort(tail, kind='stable')
+            indptr = np.zeros(self.num_nodes + 1, dtype=np.int64)
+            np.cumsum(np.bincount(tail, minlength=self.num_nodes), out=indptr[1:])
+            cached = (indptr, head[order], order)
+            setattr(self, cache_name, cached)
+        return cached
+
+    def road_lookup(self, table: dict, default: float, edge_ids: np.ndarray = None) -> np.ndarray:
+        """Map a per-road-type dict onto every edge (or just edge_ids)"""
+        codes = self.road_code if edge_ids is None else self.road_code[edge_ids]
+        lut = np.array([table.get(rt, default) for rt in self.road_types], dtype=np.float64)
+        if not len(lut):
+            return np.zeros(len(codes), dtype=np.float64)
+        return lut[codes]
+
+    def nbytes(self) -> int:
+        return sum(a.nbytes for a in (
+            self.node_x, self.node_y, self.u_idx, self.v_idx, self.mid_lat,
+            self.mid_lon, self.length, self.road_code, self.maxspeed_base
+        ))
+
+
+class VectorizedEdgeWeighter:
+    """Batched equivalent of TrafficDataSimulator.get_traffic_factor + EdgeWeightLearner.compute_edge_weight"""
+
+    def __init__(self, arrays: GraphArrays, edge_learner):
+        self.arrays = arrays
+        self.edge_learner = edge_learner
+        # Per-edge base speed implied by live observations (NaN where too few); set by the optimizer
+        self.observed_base = None
+        self._edge_correction = None
+        self._edge_correction_version = None
+
+    def edge_corrections(self) -> np.ndarray:
+        """Per-edge speed multipliers from the learner's weight artifact (None when it has none)"""
+        artifact = getattr(self.edge_learner, 'artifact', None)
+        if artifact is None or not artifact.has_edge_corrections:
+            return None
+        if self._edge_correction_version != artifact.version:
+            node_ids = np.asarray(self.arrays.node_ids, dtype=np.int64)
+            self._edge_correction = artifact.edge_corrections(node_ids[self.arrays.u_idx],
+                                                              node_ids[self.arrays.v_idx])
+            self._edge_correction_version = artifact.version
+        return self._edge_correction
+
+    def base_speeds(self, edge_ids: np.ndarray = None, observed: bool = True) -> np.ndarray:
+        base = self.arrays.road_lookup(self.edge_learner.base_speeds, 25, edge_ids)
+        maxspeed = self.arrays.maxspeed_base if edge_ids is None else self.arrays.maxspeed_base[edge_ids]
+        speeds = np.where(np.isnan(maxspeed), base, maxspeed)
+        corrections = getattr(self.edge_learner, 'speed_corrections', None)
+        if corrections:
+            speeds = speeds * self.arrays.road_lookup(corrections, 1.0, edge_ids)
+        edge_correction = self.edge_corrections()
+        if edge_correction is not None:
+            speeds = speeds * (edge_correction if edge_ids is None else edge_correction[edge_ids])
+        if observed and self.observed_base is not None:
+            obs = self.observed_base if edge_ids is None else self.observed_base[edge_ids]
+            speeds = np.where(np.isnan(obs), speeds, obs)
+        return speeds
+
+    def incident_factors(self, traffic_sim, edge_ids: np.ndarray = None) -> tuple:
+        """Per-edge incident factor (1.0 when unaffected) and the incidents affecting each edge
+
+        One batched spatial query over all edge midpoints (or just edge_ids);
+        the three nearest incidents within 200 m decide each edge's factor.
+        """
+        if edge_ids is None:
+            edge_ids = np.arange(self.arrays.num_edges)
+        factors = np.ones(len(edge_ids), dtype=np.float64)
+        edge_incidents = {}
+        if not traffic_sim.incidents:
+            return factors, edge_incidents
+
+        q, inc_idx, dist = traffic_sim.nearby_incidents_batch(
+            self.arrays.mid_lat[edge_ids], self.arrays.mid_lon[edge_ids], radius=200, top=3
+        )
+        if not len(q):
+            return factors, edge_incidents
+
+        incidents = traffic_sim.incidents
+        delay = np.array([inc['severity']['delay_factor'] for inc in incidents], dtype=np.float64)
+        np.maximum.at(factors, q, delay[inc_idx] * (1.0 - dist / 200))
+
+        edges = self.arrays.edges
+        for qi, ii, d in zip(edge_ids[q].tolist(), inc_idx.tolist(), dist.tolist()):
+            edge_incidents.setdefault(edges[qi], []).append({**incidents[ii], 'distance': d})
+        return factors, edge_incidents
+
+    def traffic_factors(self, traffic_sim, hour: int, incident_factor: np.ndarray = None,
+                        edge_ids: np.ndarray = None) -> np.ndarray:
+        """incident_factor must line up with edge_ids when a subset is given"""
+        if traffic_sim is None:
+            count = self.arrays.num_edges if edge_ids is None else len(edge_ids)
+            return np.ones(count, dtype=np.float64)
+        base_factor = traffic_sim.hourly_congestion_factors.get(hour, 1.0)
+        sensitivity = self.arrays.road_lookup(traffic_sim.road_type_sensitivity, 1.0, edge_ids)
+        total = base_factor * sensitivity
+        if incident_factor is not None:
+            total = total * incident_factor
+        return np.maximum(total, 0.5)
+
+    def travel_time_profile(self, traffic_sim, incident_factor: np.ndarray = None,
+                            edge_ids: np.ndarray = None) -> np.ndarray:
+        """(edges, 24) float32 travel time in seconds for entering each edge at each hour
+
+        Column h equals compute_shared(traffic_factors(h))['travel_time'].
+        """
+        length = self.arrays.length if edge_ids is None else self.arrays.length[edge_ids]
+        if traffic_sim is None:
+            total = np.ones((len(length), 24))
+        else:
+            hourly = np.array([traffic_sim.hourly_congestion_factors.get(h, 1.0) for h in range(24)])
+            sensitivity = self.arrays.road_lookup(traffic_sim.road_type_sensitivity, 1.0, edge_ids)
+            total = sensitivity[:, None] * hourly[None, :]
+            if incident_factor is not None:
+                total = total * incident_factor[:, None]
+            total = np.maximum(total, 0.5)
+        # Observations belong to one 15-minute bucket, so they stay out of the all-day profile
+        base_speed = self.base_speeds(edge_ids, observed=False)[:, None]
+        adjusted_speed = np.minimum(np.maximum(base_speed / total, 2), base_speed)
+        return np.ascontiguousarray((length[:, None] / 1000 / adjusted_speed) * 3600, dtype=np.float32)
+
+    def compute_shared(self, traffic_factor: np.ndarray, edge_ids: np.ndarray = None) -> dict:
+        """Scenario-independent columns for one (hour, incident state)"""
+        learner = self.edge_learner
+        length = self.arrays.length if edge_ids is None else self.arrays.length[edge_ids]
+        length_km = length / 1000
+        base_speed = self.base_speeds(edge_ids)
+
+        adjusted_speed = np.minimum(np.maximum(base_speed / traffic_factor, 2), base_speed)
+        travel_time = (length_km / adjusted_speed) * 3600
+
+        cost = length_km * 2.0
+        fuel_efficiency = self.arrays.road_lookup(learner.fuel_efficiency, 10, edge_ids)
+        fuel = (length_km / fuel_efficiency) * 100
+
+        return {
+            'length_km': length_km,
+            'travel_time': travel_time,
+            'cost': cost,
+            'fuel': fuel,
+            'traffic_factor': traffic_factor,
+            'adjusted_speed': adjusted_speed,
+            'base_speed': base_speed
+        }
+
+    def scenario_view(self, shared: dict, scenario: str = 'personal') -> dict:
+        """Per-scenario weights: the shared columns plus this scenario's combined_weight"""
+        learner = self.edge_learner
+        theta = np.asarray(learner.theta.get(scenario, learner.theta['personal']), dtype=np.float64)
+        combined_weight = (theta[0] * (shared['length_km'] / 10) + theta[1] * (shared['travel_time'] / 600) +
+                           theta[2] * (shared['cost'] / 20) + theta[3] * (shared['fuel'] / 50))
+        return {**shared, 'combined_weight': np.maximum(combined_weight, 0.01)}
+
+    def compute(self, traffic_factor: np.ndarray, scenario: str = 'personal',
+                edge_ids: np.ndarray = None) -> dict:
+        """Compute all edge weights (or just edge_ids) for one (scenario, hour) in a handful of array ops"""
+        return self.scenario_view(self.compute_shared(traffic_factor, edge_ids), scenario)
+
+    def apply(self, weights: dict, edge_ids: np.ndarray = None, columns: tuple = None):
+        """Write computed columns (all of them by default) back onto the graph's edge attribute dicts"""
+        keys = columns or ('travel_time', 'cost', 'fuel', 'combined_weight', 'traffic_factor', 'adjusted_speed')
+        edge_data = self.arrays.edge_data
+        if edge_ids is None:
+            columns = [weights[k].tolist() for k in keys]
+            for data, *values in zip(edge_data, *columns):
+                data.update(zip(keys, values))
+        else:
+            columns = [weights[k][edge_ids].tolist() for k in keys]
+            for i, *values in zip(edge_ids.tolist(), *columns):
+                edge_data[i].update(zip(keys, values))
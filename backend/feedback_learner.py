@@ -0,0 +1,206 @@
+"""
+Batched online learning from navigation feedback
+A daemon thread periodically pulls completed navigation sessions (predicted
+seconds per road class, actual trip time), fits per-road-class speed corrections
+with ridge least squares and nudges each scenario's theta with one batched
+gradient step. Every fit is written as a versioned JSON artifact; route workers
+pick up the newest artifact on their next re-weighting, without a restart.
+"""
+
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from typing import List
+
+import numpy as np
+
+FEEDBACK_MODEL_DIR = os.getenv('FEEDBACK_MODEL_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'learned_models'))
+FEEDBACK_TRAIN_SECONDS = float(os.getenv('FEEDBACK_TRAIN_SECONDS', '900'))
+FEEDBACK_MIN_SESSIONS = int(os.getenv('FEEDBACK_MIN_SESSIONS', '20'))
+FEEDBACK_MAX_SESSIONS = int(os.getenv('FEEDBACK_MAX_SESSIONS', '20000'))
+FEEDBACK_CHECK_SECONDS = float(os.getenv('FEEDBACK_CHECK_SECONDS', '30'))  # how often workers look for a new artifact
+FEEDBACK_RIDGE = 5.0  # pulls corrections towards 1.0 for classes with little data
+FEEDBACK_LEARNING_RATE = 0.1
+SPEED_CORRECTION_RANGE = (0.5, 2.0)
+LATEST_POINTER = 'LATEST'
+
+
+def fit_speed_corrections(road_seconds: np.ndarray, actual: np.ndarray, ridge: float = FEEDBACK_RIDGE) -> np.ndarray:
+    """Per-class speed multipliers from (sessions, classes) predicted seconds and actual seconds
+
+    Solves actual ~= road_seconds @ r for time ratios r with every session
+    scaled to relative error, plus a ridge term towards r = 1. Speed
+    correction is 1 / r. road_seconds exclude any earlier correction, so each
+    fit is absolute rather than compounding.
+    """
+    scale = 1 / np.maximum(actual, 1.0)
+    X = road_seconds * scale[:, None]
+    y = actual * scale
+    k = X.shape[1]
+    ratio = np.linalg.solve(X.T @ X + ridge * np.eye(k), X.T @ y + ridge * np.ones(k))
+    low, high = SPEED_CORRECTION_RANGE
+    return np.clip(1 / np.clip(ratio, 1 / high, 1 / low), low, high)
+
+
+def fit_theta(theta: np.ndarray, predicted: np.ndarray, actual: np.ndarray,
+              learning_rate: float = FEEDBACK_LEARNING_RATE) -> np.ndarray:
+    """Batched form of the per-trip update: weight time up when trips ran late, down when early"""
+    relative_error = np.clip((actual - predicted) / np.maximum(predicted, 1.0), -1, 1)
+    theta = np.asarray(theta, dtype=np.float64).copy()
+    theta[1] *= np.exp(learning_rate * relative_error.mean())
+    total = theta.sum()
+    return theta / total if total > 0 else theta
+
+
+class FeedbackLearner:
+    """Trains from navigation_history in the API process; loads the latest artifact anywhere"""
+
+    def __init__(self, fetch_sessions=None, default_theta: dict = None, model_dir: str = FEEDBACK_MODEL_DIR,
+                 train_interval: float = FEEDBACK_TRAIN_SECONDS):
+        # fetch_sessions(limit) -> newest completed sessions first:
+        # [{'scenario', 'road_seconds': {class: uncorrected seconds}, 'actual_seconds', 'end_time'}, ...]
+        self.fetch_sessions = fetch_sessions
+        self.default_theta = {name: list(map(float, vector)) for name, vector in (default_theta or {}).items()}
+        self.model_dir = model_dir
+        self.train_interval = train_interval
+        self._stop = threading.Event()
+        self._thread = None
+        self._train_lock = threading.Lock()
+        self._model = None
+        self._pointer_mtime = None
+        self._next_check = 0.0
+        self.trainings = 0
+        self.errors = 0
+        self.last_error = None
+        self.last_trained = None
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='feedback-learner', daemon=True)
+        self._thread.start()
+        print(f"🧠 Feedback learner started (train every {self.train_interval:g}s)")
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.train_interval):
+            try:
+                self.train()
+            except Exception as e:
+                self.errors += 1
+                self.last_error = str(e)
+                print(f"⚠ Feedback training failed: {e}")
+
+    def train(self) -> dict:
+        """Fit on the latest completed sessions and publish a new artifact (None if nothing new)"""
+        with self._train_lock:
+            sessions = [s for s in self.fetch_sessions(FEEDBACK_MAX_SESSIONS)
+                        if s['actual_seconds'] and s['road_seconds']]
+            if len(sessions) < FEEDBACK_MIN_SESSIONS:
+                return None
+            previous = self.latest(force=True)
+            watermark = max(str(s['end_time']) for s in sessions)
+            if previous is not None and watermark <= previous.get('watermark', ''):
+                # Theta steps are incremental; never apply one twice for the same feedback
+                return None
+            base_theta = previous['theta'] if previous is not None else self.default_theta
+
+            classes = sorted({c for s in sessions for c in s['road_seconds']})
+            road_seconds = np.array([[s['road_seconds'].get(c, 0.0) for c in classes] for s in sessions])
+            actual = np.array([s['actual_seconds'] for s in sessions], dtype=np.float64)
+            predicted = road_seconds.sum(axis=1)
+            corrections = fit_speed_corrections(road_seconds, actual)
+            corrected = (road_seconds / corrections[None, :]).sum(axis=1)
+
+            scenarios = np.array([s.get('scenario') or 'personal' for s in sessions])
+            theta = {name: list(map(float, vector)) for name, vector in base_theta.items()}
+            for name in sorted(set(scenarios.tolist()) & set(theta)):
+                mask = scenarios == name
+                theta[name] = fit_theta(theta[name], predicted[mask], actual[mask]).tolist()
+
+            model = {
+                'version': (previous['version'] if previous else 0) + 1,
+                'created': datetime.now().isoformat(),
+                'samples': len(sessions),
+                'watermark': watermark,
+                'speed_corrections': dict(zip(classes, np.round(corrections, 4).tolist())),
+                'theta': theta,
+                'mean_abs_error_before': round(float(np.abs(actual - predicted).mean()), 1),
+                'mean_abs_error_after': round(float(np.abs(actual - corrected).mean()), 1)
+            }
+            self.publish(model)
+            self.trainings += 1
+            self.last_trained = datetime.now()
+            print(f"🧠 Model v{model['version']}: {len(sessions)} sessions, "
+                  f"ETA error {model['mean_abs_error_before']:.0f}s -> {model['mean_abs_error_after']:.0f}s")
+            return model
+
+    def publish(self, model: dict):
+        """Write the artifact, then atomically repoint LATEST at it"""
+        os.makedirs(self.model_dir, exist_ok=True)
+        name = f"model_v{model['version']:06d}.json"
+        for filename, content in ((name, json.dumps(model, indent=2)), (LATEST_POINTER, name)):
+            tmp = os.path.join(self.model_dir, filename + '.tmp')
+            with open(tmp, 'w') as f:
+                f.write(content)
+            os.replace(tmp, os.path.join(self.model_dir, filename))
+        self._model = model
+
+    def latest(self, force: bool = False) -> dict:
+        """Newest published model, re-checking the pointer at most every FEEDBACK_CHECK_SECONDS"""
+        now = time.monotonic()
+        if not force and now < self._next_check:
+            return self._model
+        self._next_check = now + FEEDBACK_CHECK_SECONDS
+        pointer = os.path.join(self.model_dir, LATEST_POINTER)
+        try:
+            mtime = os.stat(pointer).st_mtime_ns
+            if mtime != self._pointer_mtime or self._model is None:
+                with open(pointer) as f:
+                    name = f.read().strip()
+                with open(os.path.join(self.model_dir, name)) as f:
+                    self._model = json.load(f)
+                self._pointer_mtime = mtime
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            print(f"⚠ Could not load feedback model: {e}")
+        return self._model
+
+    def stats(self) -> dict:
+        model = self._model
+        return {
+            'running': self._thread is not None and self._thread.is_alive(),
+            'model_version': model['version'] if model else None,
+            'samples': model['samples'] if model else 0,
+            'mean_abs_error_before': model['mean_abs_error_before'] if model else None,
+            'mean_abs_error_after': model['mean_abs_error_after'] if model else None,
+            'trainings': self.trainings,
+            'last_trained': self.last_trained.isoformat() if self.last_trained else None,
+            'errors': self.errors,
+            'last_error': self.last_error
+        }
+
+
+def road_seconds_by_class(route_segments: List[dict], segment_speeds: List[float],
+                          speed_corrections: dict = None) -> dict:
+    """Predicted seconds per road class for a navigation session (after incident impact)
+
+    The active speed correction is divided back out, so feedback is always
+    compared with the uncorrected model.
+    """
+    speed_corrections = speed_corrections or {}
+    totals = {}
+    for segment, speed in zip(route_segments, segment_speeds):
+        road = segment['road_type']
+        seconds = segment['distance_km'] / speed * 3600 if speed > 0 else segment['time_seconds']
+        totals[road] = totals.get(road, 0.0) + seconds * speed_corrections.get(road, 1.0)
+    return {road: round(seconds, 1) for road, seconds in totals.items()}
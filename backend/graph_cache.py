@@ -0,0 +1,130 @@
+"""
+Region graph cache for the route optimizer
+Every request inside a stored region is served by one shared graph for that
+region (scenarios are weight views over it, see update_graph_weights). The
+fixed tile grid only decides which route worker a request goes to, so nearby
+requests land on the same worker. Entries are evicted LRU once the estimated
+memory budget is exceeded; a region larger than the whole budget is served
+but not kept.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+
+TILE_DEG = float(os.getenv('GRAPH_TILE_DEG', '0.02'))  # ~2.2 km at Bangalore's latitude
+GRAPH_CACHE_MAX_BYTES = int(os.getenv('GRAPH_CACHE_MAX_BYTES', str(1024 * 1024 * 1024)))
+
+# Rough CPython footprint of networkx node/edge attribute dicts plus the
+# NumPy columns the weighter keeps per edge
+NODE_BYTES = 600
+EDGE_BYTES = 1200
+
+
+def estimate_graph_bytes(G) -> int:
+    return G.number_of_nodes() * NODE_BYTES + G.number_of_edges() * EDGE_BYTES
+
+
+class RegionGraphCache:
+    """LRU cache of one optimizer per region; tile windows key route-worker affinity"""
+
+    def __init__(self, graph_store, factory, tile_deg: float = TILE_DEG,
+                 max_bytes: int = GRAPH_CACHE_MAX_BYTES):
+        self.graph_store = graph_store
+        self.factory = factory
+        self.tile_deg = tile_deg
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.sizes = {}
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.waits = 0  # lookups that waited on a load already in flight
+        self.evictions = 0
+        self.loading = {}  # region name -> Future of the optimizer being built
+        self.lock = threading.Lock()
+
+    def tile_window(self, bbox: tuple) -> tuple:
+        """Tile indices (x0, y0, x1, y1) covering bbox (west, south, east, north)"""
+        west, south, east, north = bbox
+        return (
+            int(west // self.tile_deg), int(south // self.tile_deg),
+            int(east // self.tile_deg), int(north // self.tile_deg)
+        )
+
+    def key_for(self, bbox: tuple):
+        """Affinity key (region, tile window) for bbox, or None if no region covers it"""
+        region = self.graph_store.find_region(bbox)
+        if region is None:
+            return None
+        return (region.name,) + self.tile_window(bbox)
+
+    def get(self, bbox: tuple):
+        """Optimizer over the whole region covering bbox, or None if no region covers it
+
+        The graph is loaded outside the cache lock; concurrent misses for the
+        same region wait on one load instead of each building a copy.
+        """
+        region = self.graph_store.find_region(bbox)
+        if region is None:
+            return None
+        key = region.name
+
+        with self.lock:
+            if key in self.entries:
+                self.hits += 1
+                self.entries.move_to_end(key)
+                return self.entries[key]
+            future = self.loading.get(key)
+            owner = future is None
+            if owner:
+                future = self.loading[key] = Future()
+                self.misses += 1
+            else:
+                self.waits += 1
+        if not owner:
+            return future.result()
+
+        try:
+            G = region.load_graph()
+            optimizer = self.factory(G)
+        except BaseException as e:
+            with self.lock:
+                del self.loading[key]
+            future.set_exception(e)
+            raise
+        size = estimate_graph_bytes(G)
+        with self.lock:
+            del self.loading[key]
+            self.entries[key] = optimizer
+            self.sizes[key] = size
+            self.total_bytes += size
+            self._evict()
+            if key not in self.entries:
+                print(f"⚠ Region '{key}' (~{size / 1e6:.0f} MB) exceeds GRAPH_CACHE_MAX_BYTES; serving it uncached")
+        future.set_result(optimizer)
+        return optimizer
+
+    def _evict(self):
+        while self.total_bytes > self.max_bytes and self.entries:
+            key, _ = self.entries.popitem(last=False)
+            self.total_bytes -= self.sizes.pop(key)
+            self.evictions += 1
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses + self.waits
+        return {
+            'entries': len(self.entries),
+            'bytes': self.total_bytes,
+            'max_bytes': self.max_bytes,
+            'tile_deg': self.tile_deg,
+            'hits': self.hits,
+            'misses': self.misses,
+            'waits': self.waits,
+            'evictions': self.evictions,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0
+        }
@@ -0,0 +1,292 @@
+"""
+Persistent on-disk road graph store
+Holds preprocessed, collapsed drive graphs as memory-mappable CSR arrays so the
+route service never downloads from Overpass at request time.
+
+Build a region offline from an OSM XML extract:
+    python graph_store.py build --osm bangalore.osm --name bangalore
+"""
+
+import argparse
+import json
+import os
+from datetime import datetime
+
+import networkx as nx
+import numpy as np
+
+GRAPH_DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'graph_data')
+STORE_FORMAT_VERSION = 1
+
+# Same exclusions as osmnx's "drive" network_type filter
+NON_DRIVE_HIGHWAYS = {
+    'abandoned', 'bridleway', 'bus_guideway', 'construction', 'corridor', 'cycleway',
+    'elevator', 'escalator', 'footway', 'no', 'path', 'pedestrian', 'planned',
+    'platform', 'proposed', 'raceway', 'razed', 'service', 'steps', 'track'
+}
+
+ARRAY_NAMES = ('node_ids', 'node_x', 'node_y', 'indptr', 'indices', 'length', 'road_code', 'maxspeed')
+
+
+def collapse_multidigraph(G_multi) -> nx.DiGraph:
+    """Collapse parallel edges, keeping the shortest one (as optimize_route always did)"""
+    G = nx.DiGraph()
+    G.graph.update(G_multi.graph)
+    for n, d in G_multi.nodes(data=True):
+        G.add_node(n, **d)
+    for u, v, data in G_multi.edges(data=True):
+        if G.has_edge(u, v):
+            if data.get('length', float('inf')) < G[u][v].get('length', float('inf')):
+                G[u][v].update(data)
+        else:
+            G.add_edge(u, v, **data)
+    return G
+
+
+def _first(value):
+    if isinstance(value, list):
+        return value[0]
+    return value
+
+
+def _maxspeed_value(value) -> float:
+    value = _first(value)
+    if not value:
+        return np.nan
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return np.nan
+
+
+class GraphRegion:
+    """One city/region on disk: CSR adjacency plus per-node and per-edge columns"""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, 'meta.json')) as f:
+            self.meta = json.load(f)
+        self.name = self.meta['name']
+        self.bbox = tuple(self.meta['bbox'])  # (west, south, east, north)
+        self.road_types = self.meta['road_types']
+        self._arrays = None
+
+    @property
+    def arrays(self) -> dict:
+        # Memory-mapped on first use; pages are shared by every process reading the store
+        if self._arrays is None:
+            self._arrays = {
+                name: np.load(os.path.join(self.path, f'{name}.npy'), mmap_mode='r')
+                for name in ARRAY_NAMES
+            }
+        return self._arrays
+
+    def covers(self, bbox: tuple) -> bool:
+        west, south, east, north = bbox
+        r_west, r_south, r_east, r_north = self.bbox
+        return r_west <= west and r_south <= south and r_east >= east and r_north >= north
+
+    def area(self) -> float:
+        west, south, east, north = self.bbox
+        return (east - west) * (north - south)
+
+    def overlap(self, bbox: tuple) -> float:
+        """Area (square degrees) of bbox that lies inside this region"""
+        west, south, east, north = bbox
+        r_west, r_south, r_east, r_north = self.bbox
+        return max(min(east, r_east) - max(west, r_west), 0) * max(min(north, r_north) - max(south, r_south), 0)
+
+    def load_graph(self, bbox: tuple = None) -> nx.DiGraph:
+        """Build a DiGraph for the part of the region inside bbox (west, south, east, north)"""
+        a = self.arrays
+        node_x = np.asarray(a['node_x'])
+        node_y = np.asarray(a['node_y'])
+        indptr = np.asarray(a['indptr'])
+        indices = np.asarray(a['indices'])
+
+        if bbox is None:
+            inside = np.ones(len(node_x), dtype=bool)
+        else:
+            west, south, east, north = bbox
+            inside = (node_x >= west) & (node_x <= east) & (node_y >= south) & (node_y <= north)
+
+        src = np.repeat(np.arange(len(node_x)), np.diff(indptr))
+        edge_mask = inside[src] & inside[indices]
+        edge_ids = np.nonzero(edge_mask)[0]
+        node_sel = np.nonzero(inside)[0]
+
+        node_ids = np.asarray(a['node_ids'])
+        lengths = np.asarray(a['length'])[edge_ids].tolist()
+        codes = np.asarray(a['road_code'])[edge_ids].tolist()
+        maxspeeds = np.asarray(a['maxspeed'])[edge_ids].tolist()
+
+        G = nx.DiGraph()
+        G.graph['crs'] = 'epsg:4326'
+        G.graph['region'] = self.name
+        G.add_nodes_from(
+            (n, {'x': x, 'y': y})
+            for n, x, y in zip(node_ids[node_sel].tolist(), node_x[node_sel].tolist(), node_y[node_sel].tolist())
+        )
+
+        edges = []
+        for u, v, length, code, maxspeed in zip(node_ids[src[edge_ids]].tolist(),
+                                                node_ids[indices[edge_ids]].tolist(),
+                                                lengths, codes, maxspeeds):
+            data = {'length': length}
+            if code >= 0:
+                data['highway'] = self.road_types[code]
+            if maxspeed == maxspeed:  # not NaN
+                data['maxspeed'] = maxspeed
+            edges.append((u, v, data))
+        G.add_edges_from(edges)
+
+        # Cropping can leave fragments; keep the main component like graph_from_bbox does
+        if bbox is not None and len(G):
+            largest = max(nx.weakly_connected_components(G), key=len)
+            if len(largest) < len(G):
+                G = G.subgraph(largest).copy()
+        return G
+
+
+class GraphStore:
+    """Directory of GraphRegion entries, one sub-directory per region"""
+
+    def __init__(self, root: str = GRAPH_DATA_DIR):
+        self.root = root
+        self._regions = None
+
+    @property
+    def regions(self) -> list:
+        if self._regions is None:
+            self._regions = []
+            if os.path.isdir(self.root):
+                for name in sorted(os.listdir(self.root)):
+                    path = os.path.join(self.root, name)
+                    if os.path.exists(os.path.join(path, 'meta.json')):
+                        self._regions.append(GraphRegion(path))
+        return self._regions
+
+    def find_region(self, bbox: tuple):
+        """Smallest stored region that fully covers bbox (west, south, east, north)
+
+        Near a region's edge, or across two adjacent regions, no region covers
+        the whole bbox; the one overlapping it most serves the part it holds.
+        None only when bbox overlaps no region at all.
+        """
+        candidates = [r for r in self.regions if r.covers(bbox)]
+        if candidates:
+            return min(candidates, key=lambda r: r.area())
+        overlapping = [r for r in self.regions if r.overlap(bbox) > 0]
+        if not overlapping:
+            return None
+        return max(overlapping, key=lambda r: r.overlap(bbox))
+
+    def load_graph(self, bbox: tuple):
+        region = self.find_region(bbox)
+        if region is None:
+            return None
+        return region.load_graph(bbox)
+
+    def save_region(self, name: str, G: nx.DiGraph) -> str:
+        """Write a collapsed DiGraph as CSR arrays"""
+        path = os.path.join(self.root, name)
+        os.makedirs(path, exist_ok=True)
+
+        node_ids = list(G.nodes)
+        node_index = {n: i for i, n in enumerate(node_ids)}
+        node_x = np.array([G.nodes[n]['x'] for n in node_ids], dtype=np.float64)
+        node_y = np.array([G.nodes[n]['y'] for n in node_ids], dtype=np.float64)
+
+        road_types = []
+        road_lookup = {}
+        indptr = np.zeros(len(node_ids) + 1, dtype=np.int64)
+        indices, length, road_code, maxspeed = [], [], [], []
+        for i, u in enumerate(node_ids):
+            for v, data in G[u].items():
+                road_type = _first(data.get('highway'))
+                if road_type is None:
+                    code = -1
+                else:
+                    if road_type not in road_lookup:
+                        road_lookup[road_type] = len(road_types)
+                        road_types.append(road_type)
+                    code = road_lookup[road_type]
+                indices.append(node_index[v])
+                length.append(data.get('length', 0))
+                road_code.append(code)
+                maxspeed.append(_maxspeed_value(data.get('maxspeed')))
+            indptr[i + 1] = len(indices)
+
+        arrays = {
+            'node_ids': np.array(node_ids, dtype=np.int64),
+            'node_x': node_x,
+            'node_y': node_y,
+            'indptr': indptr,
+            'indices': np.array(indices, dtype=np.int64),
+            'length': np.array(length, dtype=np.float64),
+            'road_code': np.array(road_code, dtype=np.int16),
+            'maxspeed': np.array(maxspeed, dtype=np.float32),
+        }
+        for array_name, values in arrays.items():
+            np.save(os.path.join(path, f'{array_name}.npy'), values)
+
+        meta = {
+            'name': name,
+            'format_version': STORE_FORMAT_VERSION,
+            'bbox': [float(node_x.min()), float(node_y.min()), float(node_x.max()), float(node_y.max())],
+            'num_nodes': len(node_ids),
+            'num_edges': len(indices),
+            'road_types': road_types,
+            'created': datetime.now().isoformat()
+        }
+        with open(os.path.join(path, 'meta.json'), 'w') as f:
+            json.dump(meta, f, indent=2)
+
+        self._regions = None
+        return path
+
+
+def build_region_from_osm(osm_path: str, name: str, root: str = GRAPH_DATA_DIR) -> str:
+    """Ingest an OSM XML extract, keep the drive network, simplify and collapse it"""
+    import osmnx as ox
+
+    print(f"🔄 Reading OSM extract {osm_path}...")
+    G_multi = ox.graph_from_xml(osm_path, simplify=False, retain_all=True)
+
+    non_drive = [
+        (u, v, k) for u, v, k, d in G_multi.edges(keys=True, data=True)
+        if _first(d.get('highway')) in NON_DRIVE_HIGHWAYS or d.get('area') == 'yes'
+    ]
+    G_multi.remove_edges_from(non_drive)
+    G_multi.remove_nodes_from([n for n, deg in G_multi.degree() if deg == 0])
+
+    G_multi = ox.simplify_graph(G_multi)
+    G_multi = ox.truncate.largest_component(G_multi)
+    G = collapse_multidigraph(G_multi)
+
+    path = GraphStore(root).save_region(name, G)
+    print(f"✅ Region '{name}' stored at {path}: {len(G.nodes)} nodes, {len(G.edges)} edges")
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline road graph store")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    build = sub.add_parser('build', help='Build a region from an OSM XML extract')
+    build.add_argument('--osm', required=True, help='Path to .osm XML extract')
+    build.add_argument('--name', required=True, help='Region name')
+    build.add_argument('--root', default=GRAPH_DATA_DIR)
+
+    sub.add_parser('list', help='List stored regions').add_argument('--root', default=GRAPH_DATA_DIR)
+
+    args = parser.parse_args()
+    if args.command == 'build':
+        build_region_from_osm(args.osm, args.name, args.root)
+    else:
+        for region in GraphStore(args.root).regions:
+            print(f"{region.name}: bbox={region.bbox} nodes={region.meta['num_nodes']} edges={region.meta['num_edges']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""
+Background incident feed for the route optimizer
+A daemon thread polls the incidents table on an `sd` watermark and publishes
+immutable, versioned snapshots with a spatial index, so request handlers read
+incidents without a database round trip.
+"""
+
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import List
+
+import numpy as np
+
+from spatial_index import PointIndex
+
+INCIDENT_POLL_SECONDS = float(os.getenv('INCIDENT_POLL_SECONDS', '5'))
+# Rows deleted from the table are only noticed by a full resync
+INCIDENT_RESYNC_SECONDS = float(os.getenv('INCIDENT_RESYNC_SECONDS', '300'))
+INCIDENT_WINDOW = timedelta(hours=24)
+
+
+def is_active(incident: dict) -> bool:
+    """Same 24 hour window the SQL queries apply"""
+    sd = incident.get('sd')
+    if sd is None:
+        return False
+    return sd > datetime.now(sd.tzinfo) - INCIDENT_WINDOW
+
+
+class IncidentSnapshot:
+    """Active incidents at one version; never mutated once published"""
+
+    def __init__(self, incidents: List[dict], version: int, watermark: datetime = None):
+        # Newest first, like the fetcher's ORDER BY sd DESC
+        self.incidents = tuple(sorted(incidents, key=lambda inc: inc['sd'], reverse=True))
+        self.version = version
+        self.watermark = watermark
+        self.created_at = datetime.now()
+        self.lats = np.array([inc['lat'] for inc in self.incidents], dtype=np.float64)
+        self.lons = np.array([inc['lon'] for inc in self.incidents], dtype=np.float64)
+        self.index = PointIndex(self.lats, self.lons)
+
+    def __len__(self) -> int:
+        return len(self.incidents)
+
+    def bbox_mask(self, bbox: tuple = None) -> np.ndarray:
+        """Boolean mask over incidents inside bbox (min_lat, min_lon, max_lat, max_lon)"""
+        if bbox is None:
+            return np.ones(len(self.incidents), dtype=bool)
+        min_lat, min_lon, max_lat, max_lon = bbox
+        return ((self.lats >= min_lat) & (self.lats <= max_lat) &
+                (self.lons >= min_lon) & (self.lons <= max_lon))
+
+    def in_bbox(self, bbox: tuple = None) -> List[dict]:
+        """Incidents inside bbox; the dicts are shared, treat them as read-only"""
+        if bbox is None:
+            return list(self.incidents)
+        return [self.incidents[i] for i in np.nonzero(self.bbox_mask(bbox))[0].tolist()]
+
+
+class IncidentFeed:
+    """Keeps the latest IncidentSnapshot fresh from a background thread"""
+
+    def __init__(self, fetcher, poll_interval: float = INCIDENT_POLL_SECONDS,
+                 resync_interval: float = INCIDENT_RESYNC_SECONDS):
+        # fetcher.query_incidents(bbox=None, since=None) -> list of incident dicts
+        self.fetcher = fetcher
+        self.poll_interval = poll_interval
+        self.resync_interval = resync_interval
+        self._snapshot = None
+        self._refresh_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.last_full_sync = None
+        self.polls = 0
+        self.errors = 0
+        self.last_error = None
+
+    @property
+    def snapshot(self) -> IncidentSnapshot:
+        """Latest published snapshot, or None until the first sync succeeds"""
+        return self._snapshot
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='incident-feed', daemon=True)
+        self._thread.start()
+        print(f"📡 Incident feed started (poll every {self.poll_interval:g}s)")
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.poll_interval + 1)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.refresh()
+            except Exception as e:
+                self.errors += 1
+                self.last_error = str(e)
+                print(f"⚠ Incident feed refresh failed: {e}")
+            self._stop.wait(self.poll_interval)
+
+    def refresh(self, full: bool = False) -> IncidentSnapshot:
+        """One poll; publishes a new snapshot only when something changed"""
+        with self._refresh_lock:
+            current = self._snapshot
+            full = (full or current is None or
+                    time.monotonic() - self.last_full_sync >= self.resync_interval)
+            self.polls += 1
+
+            if full:
+                rows = self.fetcher.query_incidents()
+                self.last_full_sync = time.monotonic()
+                by_id = {inc['id']: inc for inc in rows}
+                changed = current is None or by_id != {inc['id']: inc for inc in current.incidents}
+            else:
+                # sd >= watermark re-reads rows at the watermark; unchanged ones are ignored
+                rows = self.fetcher.query_incidents(since=current.watermark)
+                by_id = {inc['id']: inc for inc in current.incidents}
+                changed = False
+                for inc in rows:
+                    if by_id.get(inc['id']) != inc:
+                        by_id[inc['id']] = inc
+                        changed = True
+
+            active = [inc for inc in by_id.values() if is_active(inc)]
+            if current is not None and not changed and len(active) == len(current):
+                return current
+
+            watermark = max((inc['sd'] for inc in active), default=current.watermark if current else None)
+            snapshot = IncidentSnapshot(active, current.version + 1 if current else 1, watermark)
+            self._snapshot = snapshot
+            print(f"📡 Incident snapshot v{snapshot.version}: {len(snapshot)} active incidents")
+            return snapshot
+
+    def stats(self) -> dict:
+        snapshot = self._snapshot
+        return {
+            'running': self._thread is not None and self._thread.is_alive(),
+            'version': snapshot.version if snapshot else 0,
+            'incidents': len(snapshot) if snapshot else 0,
+            'watermark': snapshot.watermark.isoformat() if snapshot and snapshot.watermark else None,
+            'age_seconds': round((datetime.now() - snapshot.created_at).total_seconds(), 1) if snapshot else None,
+            'polls': self.polls,
+            'errors': self.errors,
+            'last_error': self.last_error
+        }
@@ -0,0 +1,90 @@
+"""
+Reachability polygons from one truncated Dijkstra over travel_time weights
+Every edge whose tail is reached within a budget contributes the part of it that
+can still be driven; those segments are buffered and unioned into a polygon per
+budget, so all budgets come out of the same search.
+"""
+
+import os
+
+import numpy as np
+from shapely import buffer, linestrings, union_all
+from shapely.geometry import MultiPolygon, Polygon, mapping
+
+ISOCHRONE_MAX_MINUTES = float(os.getenv('ISOCHRONE_MAX_MINUTES', '60'))
+ISOCHRONE_MAX_BUDGETS = int(os.getenv('ISOCHRONE_MAX_BUDGETS', '6'))
+ISOCHRONE_BUFFER_M = float(os.getenv('ISOCHRONE_BUFFER_M', '60'))
+ISOCHRONE_SIMPLIFY_M = float(os.getenv('ISOCHRONE_SIMPLIFY_M', '15'))
+ISOCHRONE_MIN_HOLE_M2 = float(os.getenv('ISOCHRONE_MIN_HOLE_M2', '100000'))  # smaller holes are filled
+ISOCHRONE_CACHE_SIZE = int(os.getenv('ISOCHRONE_CACHE_SIZE', '256'))
+
+
+def reached_segments(snapper, node_dist: np.ndarray, travel_time: np.ndarray, budget: float) -> np.ndarray:
+    """(n, 2, 2) array of projected segments drivable within `budget` seconds
+
+    node_dist holds the search distance of every node (inf when not reached);
+    an edge leaving a reached node is cut at the fraction still affordable.
+    """
+    arrays = snapper.arrays
+    start_dist = node_dist[arrays.u_idx]
+    ids = np.nonzero(start_dist <= budget)[0]
+    if not len(ids):
+        return np.empty((0, 2, 2))
+    cost = travel_time[ids]
+    fraction = np.where(cost > 0, (budget - start_dist[ids]) / np.where(cost > 0, cost, 1), 1.0)
+    fraction = np.clip(fraction, 0, 1)
+
+    # Both directions of a fully driven two-way road are the same segment
+    full = fraction >= 1
+    u, v = arrays.u_idx[ids], arrays.v_idx[ids]
+    pair = np.minimum(u, v).astype(np.int64) * arrays.num_nodes + np.maximum(u, v)
+    _, first = np.unique(pair[full], return_index=True)
+    keep = np.concatenate([np.nonzero(full)[0][first], np.nonzero(~full)[0]])
+    ids, fraction = ids[keep], fraction[keep]
+    start = snapper.seg_start[ids]
+    end = start + (snapper.seg_end[ids] - start) * fraction[:, None]
+    return np.stack([start, end], axis=1)
+
+
+def isochrone_polygons(snapper, node_dist: np.ndarray, travel_time: np.ndarray, budgets_seconds: list,
+                       buffer_m: float = ISOCHRONE_BUFFER_M, simplify_m: float = ISOCHRONE_SIMPLIFY_M) -> list:
+    """One GeoJSON Polygon or MultiPolygon (lon, lat) per budget"""
+    origin = snapper.node_xy[np.argmin(node_dist)]
+    geometries = []
+    for budget in budgets_seconds:
+        segments = reached_segments(snapper, node_dist, travel_time, budget)
+        if len(segments):
+            area = union_all(buffer(linestrings(segments), buffer_m, quad_segs=2))
+        else:
+            # Only the origin node itself is reachable
+            area = buffer(linestrings([[origin, origin]]), buffer_m)[0]
+        area = fill_holes(area.simplify(simplify_m))
+        geometries.append(to_lon_lat(mapping(area), snapper.projection))
+    return geometries
+
+
+def fill_holes(area, min_hole_m2: float = ISOCHRONE_MIN_HOLE_M2):
+    """Drop interior rings (blocks between reached roads) smaller than min_hole_m2"""
+    def fill(polygon):
+        holes = [ring for ring in polygon.interiors if Polygon(ring).area >= min_hole_m2]
+        return Polygon(polygon.exterior, holes)
+
+    if isinstance(area, Polygon):
+        return fill(area)
+    if isinstance(area, MultiPolygon):
+        return MultiPolygon([fill(p) for p in area.geoms])
+    return area
+
+
+def to_lon_lat(geojson: dict, projection) -> dict:
+    """Unproject a GeoJSON Polygon / MultiPolygon from local metres"""
+    def ring(coords):
+        lat, lon = projection.unproject(np.asarray(coords)[:, :2])
+        return [[round(x, 6), round(y, 6)] for x, y in zip(lon.tolist(), lat.tolist())]
+
+    if geojson['type'] == 'Polygon':
+        return {'type': 'Polygon', 'coordinates': [ring(r) for r in geojson['coordinates']]}
+    if geojson['type'] == 'MultiPolygon':
+        return {'type': 'MultiPolygon',
+                'coordinates': [[ring(r) for r in poly] for poly in geojson['coordinates']]}
+    return {'type': 'Polygon', 'coordinates': []}
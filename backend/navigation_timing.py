@@ -0,0 +1,60 @@
+"""
+Batched navigation timing
+Segment midpoints and snapped incidents are held as NumPy arrays; one radius
+query finds every (segment, incident) pair within the incident's affected
+distance, and segment speeds and the ETA come from vectorized reductions.
+"""
+
+from typing import List
+
+import numpy as np
+
+from spatial_index import PointIndex
+
+DEFAULT_SPEED_KMH = 25
+
+
+def segment_arrays(route_segments: List[dict]) -> tuple:
+    """(mid_lat, mid_lon, distance_m, base_speed) for route segments built by start_navigation"""
+    if not route_segments:
+        empty = np.zeros(0)
+        return empty, empty, empty, empty
+    starts = np.array([seg['start'] for seg in route_segments], dtype=np.float64)
+    ends = np.array([seg['end'] for seg in route_segments], dtype=np.float64)
+    mid = (starts + ends) / 2
+    distance_m = np.array([seg['distance_km'] for seg in route_segments], dtype=np.float64) * 1000
+    base_speed = np.array([seg['speed_kmh'] for seg in route_segments], dtype=np.float64)
+    return mid[:, 0], mid[:, 1], distance_m, base_speed
+
+
+def incident_speeds(mid_lat: np.ndarray, mid_lon: np.ndarray, base_speed: np.ndarray,
+                    incidents: List[dict]) -> np.ndarray:
+    """Each segment's speed capped by incidents closer than their affected_distance"""
+    speeds = base_speed.copy()
+    if not incidents or not len(speeds):
+        return speeds
+    inc_lat = np.array([inc['lat'] for inc in incidents], dtype=np.float64)
+    inc_lng = np.array([inc['lng'] for inc in incidents], dtype=np.float64)
+    affected = np.array([inc['affected_distance'] for inc in incidents], dtype=np.float64)
+    inc_speed = np.array([inc['speed'] for inc in incidents], dtype=np.float64)
+
+    index = PointIndex(mid_lat, mid_lon)
+    inc_idx, seg_idx, dist = index.query_radius(inc_lat, inc_lng, affected)
+    # The affected distance is an exclusive bound
+    inside = dist < affected[inc_idx]
+    np.minimum.at(speeds, seg_idx[inside], inc_speed[inc_idx[inside]])
+    return speeds
+
+
+def travel_time_seconds(distance_m: np.ndarray, speeds: np.ndarray) -> np.ndarray:
+    """Per-segment seconds; non-positive speeds fall back to the default city speed"""
+    effective = np.where(speeds > 0, speeds, DEFAULT_SPEED_KMH)
+    return distance_m / 1000 / effective * 3600
+
+
+def navigation_timing(route_segments: List[dict], incidents: List[dict]) -> tuple:
+    """(segment_speeds, total_time_seconds) for a route and the incidents snapped to it"""
+    mid_lat, mid_lon, distance_m, base_speed = segment_arrays(route_segments)
+    speeds = incident_speeds(mid_lat, mid_lon, base_speed, incidents)
+    total_time_seconds = float(travel_time_seconds(distance_m, speeds).sum())
+    return speeds.tolist(), total_time_seconds
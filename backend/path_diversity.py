@@ -0,0 +1,139 @@
+"""
+K-diverse path search for the route optimizer
+Edge penalties live in a small overlay read through a weight function, so the
+graph is never copied; via-node alternatives (one shortest-path tree from each
+end) are offered as an alternative.
+"""
+
+from typing import Callable, List
+
+import networkx as nx
+
+MAX_OVERLAP = 0.7
+PENALTY_STEP = 0.3
+MAX_STRETCH = 1.4  # via-node alternatives may be at most 40% longer than the best route
+
+
+def path_edges(path: List[int]) -> set:
+    return set(zip(path[:-1], path[1:]))
+
+
+def max_overlap(path: List[int], existing_paths: List[List[int]]) -> float:
+    """Largest share of this path's edges that any existing path already uses"""
+    edges = path_edges(path)
+    if not edges or not existing_paths:
+        return 0
+    return max(len(edges & path_edges(p)) / len(edges) for p in existing_paths)
+
+
+class PenaltyOverlay:
+    """Per-edge usage counts applied on top of the graph's own weights"""
+
+    def __init__(self, weight: str):
+        self.weight = weight
+        self.counts = {}
+
+    def add_path(self, path: List[int]):
+        for e in zip(path[:-1], path[1:]):
+            self.counts[e] = self.counts.get(e, 0) + 1
+
+    def weight_function(self) -> Callable:
+        weight = self.weight
+        counts = self.counts
+
+        def penalized(u, v, data):
+            w = data.get(weight, 1.0)
+            count = counts.get((u, v))
+            if count:
+                return w * (1 + count * PENALTY_STEP)
+            return w
+
+        # Lets goal-directed searches pick the heuristic for the underlying weight
+        penalized.base_weight = weight
+        penalized.counts = counts
+        return penalized
+
+
+def default_search(G: nx.DiGraph) -> Callable:
+    def search(source, target, weight):
+        return nx.astar_path(G, source, target, weight=weight)
+    return search
+
+
+class DiversePathFinder:
+    """Generates up to K routes whose pairwise edge overlap stays below MAX_OVERLAP"""
+
+    def __init__(self, G: nx.DiGraph, search: Callable = None):
+        self.G = G
+        # search(source, target, weight) -> path; weight is an attribute name or (u, v, d) function
+        self.search = search or default_search(G)
+
+    def penalty_paths(self, source: int, target: int, K: int = 4,
+                      weight: str = 'combined_weight') -> List[List[int]]:
+        try:
+            first_path = self.search(source, target, weight)
+        except nx.NetworkXNoPath:
+            return []
+
+        paths = [first_path]
+        overlay = PenaltyOverlay(weight)
+        overlay.add_path(first_path)
+        penalized = overlay.weight_function()
+
+        attempts = 0
+        max_attempts = K * 3
+        while len(paths) < K and attempts < max_attempts:
+            attempts += 1
+            try:
+                alt_path = self.search(source, target, penalized)
+            except nx.NetworkXNoPath:
+                break
+
+            if max_overlap(alt_path, paths) >= MAX_OVERLAP:
+                # Penalties only change when a path is accepted, so every
+                # further attempt would return this same rejected path
+                break
+            paths.append(alt_path)
+            overlay.add_path(alt_path)
+
+        return paths
+
+    def via_paths(self, source: int, target: int, K: int = 4,
+                  weight: str = 'combined_weight', max_stretch: float = MAX_STRETCH) -> List[List[int]]:
+        """Via-node alternatives: best s -> v -> t through each node v, from two shortest-path trees
+
+        Via nodes are tried cheapest first; every node of a tried path is
+        skipped afterwards, since routing through it mostly repeats that path.
+        """
+        try:
+            pred_f, dist_f = nx.dijkstra_predecessor_and_distance(self.G, source, weight=weight)
+            pred_b, dist_b = nx.dijkstra_predecessor_and_distance(self.G.reverse(copy=False), target, weight=weight)
+        except nx.NodeNotFound:
+            return []
+        if target not in dist_f:
+            return []
+
+        def chain(pred, node):
+            nodes = [node]
+            while pred[node]:
+                node = pred[node][0]
+                nodes.append(node)
+            return nodes
+
+        best = dist_f[target]
+        paths = [chain(pred_f, target)[::-1]]
+        covered = set(paths[0])
+        vias = sorted((dist_f[v] + dist_b[v], v) for v in dist_f
+                      if v in dist_b and dist_f[v] + dist_b[v] <= best * max_stretch)
+        for _, via in vias:
+            if len(paths) >= K:
+                break
+            if via in covered:
+                continue
+            path = chain(pred_f, via)[::-1] + chain(pred_b, via)[1:]
+            covered.update(path)
+            if len(set(path)) < len(path):
+                continue  # the two halves cross; not a simple route
+            if max_overlap(path, paths) < MAX_OVERLAP:
+                paths.append(path)
+        return paths
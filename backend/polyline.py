@@ -0,0 +1,51 @@
+"""
+Encoded polyline format (Google's algorithm) for compact route geometry
+Precision 6 keeps ~0.1 m resolution; coordinates are (lat, lng) pairs.
+"""
+
+from typing import List
+
+POLYLINE_PRECISION = 6
+
+
+def _encode_value(value: int, out: List[str]):
+    value = ~(value << 1) if value < 0 else value << 1
+    while value >= 0x20:
+        out.append(chr((0x20 | (value & 0x1f)) + 63))
+        value >>= 5
+    out.append(chr(value + 63))
+
+
+def encode_polyline(coords, precision: int = POLYLINE_PRECISION) -> str:
+    factor = 10 ** precision
+    out = []
+    prev_lat = prev_lng = 0
+    for lat, lng in coords:
+        lat_i = int(round(lat * factor))
+        lng_i = int(round(lng * factor))
+        _encode_value(lat_i - prev_lat, out)
+        _encode_value(lng_i - prev_lng, out)
+        prev_lat, prev_lng = lat_i, lng_i
+    return ''.join(out)
+
+
+def decode_polyline(encoded: str, precision: int = POLYLINE_PRECISION) -> List[tuple]:
+    factor = 10 ** precision
+    coords = []
+    index = lat = lng = 0
+    while index < len(encoded):
+        deltas = []
+        for _ in range(2):
+            shift = result = 0
+            while True:
+                b = ord(encoded[index]) - 63
+                index += 1
+                result |= (b & 0x1f) << shift
+                shift += 5
+                if b < 0x20:
+                    break
+            deltas.append(~(result >> 1) if result & 1 else result >> 1)
+        lat += deltas[0]
+        lng += deltas[1]
+        coords.append((lat / factor, lng / factor))
+    return coords
@@ -0,0 +1,105 @@
+"""
+Result cache for optimize_route
+Entries are keyed by snapped (source, target), scenario, K and departure bucket.
+The incident snapshot version is deliberately not part of the key: instead of
+expiring everything when the snapshot changes, the optimizer reports which edges
+it re-weighted and only entries whose paths use one of them are dropped.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+
+ROUTE_CACHE_SIZE = int(os.getenv('ROUTE_CACHE_SIZE', '2048'))
+ROUTE_CACHE_TTL_SECONDS = float(os.getenv('ROUTE_CACHE_TTL_SECONDS', '900'))
+
+
+class RouteCache:
+    """LRU + TTL cache of (routes, metrics) with an edge -> entries index for invalidation"""
+
+    def __init__(self, max_entries: int = ROUTE_CACHE_SIZE, ttl: float = ROUTE_CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries = OrderedDict()  # key -> (created, edges, value)
+        self.by_edge = {}  # (graph token, u, v) -> set of keys
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evicted = 0
+        self.invalidated = 0
+
+    def _drop(self, key):
+        _, edges, _ = self.entries.pop(key)
+        token = key[0]
+        for u, v in edges:
+            keys = self.by_edge.get((token, u, v))
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self.by_edge[(token, u, v)]
+
+    def get(self, key: tuple):
+        """Cached value or None; key[0] must identify the graph the paths belong to"""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if time.monotonic() - entry[0] > self.ttl:
+                self._drop(key)
+                self.expired += 1
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return entry[2]
+
+    def put(self, key: tuple, routes: list, value):
+        edges = {(u, v) for route in routes for u, v in zip(route[:-1], route[1:])}
+        token = key[0]
+        with self.lock:
+            if key in self.entries:
+                self._drop(key)
+            self.entries[key] = (time.monotonic(), edges, value)
+            for u, v in edges:
+                self.by_edge.setdefault((token, u, v), set()).add(key)
+            while len(self.entries) > self.max_entries:
+                self._drop(next(iter(self.entries)))
+                self.evicted += 1
+
+    def invalidate_edges(self, token, edges) -> int:
+        """Drop entries of graph `token` whose paths use any of edges [(u, v), ...]"""
+        with self.lock:
+            keys = set()
+            for u, v in edges:
+                keys |= self.by_edge.get((token, u, v), set())
+            for key in keys:
+                self._drop(key)
+            self.invalidated += len(keys)
+            return len(keys)
+
+    def invalidate_graph(self, token) -> int:
+        with self.lock:
+            keys = [key for key in self.entries if key[0] == token]
+            for key in keys:
+                self._drop(key)
+            self.invalidated += len(keys)
+            return len(keys)
+
+    def stats(self) -> dict:
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self.entries),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'expired': self.expired,
+                'evicted': self.evicted,
+                'invalidated': self.invalidated,
+                'indexed_edges': len(self.by_edge)
+            }
@@ -0,0 +1,549 @@
+"""
+Goal-directed shortest path search for the route optimizer
+Admissible haversine heuristics per weight type, bidirectional A* and ALT
+(A*, landmarks, triangle inequality) with precomputed landmark distances,
+time-dependent A* over hourly travel-time profiles, and a multi-criteria
+label-setting search for Pareto-optimal routes.
+"""
+
+import heapq
+import math
+from typing import Callable, List
+
+import networkx as nx
+import numpy as np
+
+# Slightly below the radius osmnx uses for edge lengths, so straight-line
+# distance never exceeds an edge's recorded length
+EARTH_RADIUS_M = 6371000
+LANDMARK_COUNT = 8
+PARETO_EPSILON = 0.02  # routes within 2% of a found route on every objective are not kept
+PARETO_MAX_LABELS = 8  # non-dominated labels kept per node
+PARETO_MAX_ROUTES = 6
+PARETO_MAX_DETOUR = 1.5  # no objective may exceed 1.5x its own optimum
+
+
+def haversine_to_all(node_y: np.ndarray, node_x: np.ndarray, lat: float, lon: float) -> np.ndarray:
+    """Great-circle distance in metres from one point to every node"""
+    phi1 = np.radians(node_y)
+    phi2 = math.radians(lat)
+    dphi = phi2 - phi1
+    dlmb = math.radians(lon) - np.radians(node_x)
+    a = np.sin(dphi / 2) ** 2 + np.cos(phi1) * math.cos(phi2) * np.sin(dlmb / 2) ** 2
+    return EARTH_RADIUS_M * 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+
+
+def heuristic_rate(weight: str, edge_learner, scenario: str, max_speed: float) -> float:
+    """Lower bound of `weight` per metre of straight-line distance (0 disables the heuristic)
+
+    Every edge's adjusted speed is capped by its base speed, so travel time per
+    metre is at least 3.6 / max_speed seconds.
+    """
+    if max_speed <= 0:
+        return 0.0
+    time_per_m = 3.6 / max_speed
+    cost_per_m = 2.0 / 1000
+    best_efficiency = max(list(edge_learner.fuel_efficiency.values()) + [10])
+    fuel_per_m = 100 / best_efficiency / 1000
+
+    if weight == 'length':
+        return 1.0
+    if weight == 'travel_time':
+        return time_per_m
+    if weight == 'cost':
+        return cost_per_m
+    if weight == 'fuel':
+        return fuel_per_m
+    if weight == 'combined_weight':
+        theta = np.asarray(edge_learner.theta.get(scenario, edge_learner.theta['personal']), dtype=np.float64)
+        if (theta < 0).any():
+            return 0.0
+        return float(theta[0] / 10000 + theta[1] * time_per_m / 600 +
+                     theta[2] * cost_per_m / 20 + theta[3] * fuel_per_m / 50)
+    return 0.0
+
+
+def edge_lower_bounds(weight: str, weights: dict, edge_learner, scenario: str) -> np.ndarray:
+    """Per-edge lower bound of `weight` that holds for any traffic factor or penalty"""
+    length_km = weights['length_km']
+    free_flow_time = (length_km / weights['base_speed']) * 3600
+    if weight == 'length':
+        return length_km * 1000
+    if weight == 'travel_time':
+        return free_flow_time
+    if weight in ('cost', 'fuel'):
+        return weights[weight]
+    if weight == 'combined_weight':
+        theta = np.asarray(edge_learner.theta.get(scenario, edge_learner.theta['personal']), dtype=np.float64)
+        if (theta < 0).any():
+            return None
+        combined = (theta[0] * (length_km / 10) + theta[1] * (free_flow_time / 600) +
+                    theta[2] * (weights['cost'] / 20) + theta[3] * (weights['fuel'] / 50))
+        return np.maximum(combined, 0.01)
+    return None
+
+
+def profile_cost(flat, buckets: int, edge: int, t: float) -> float:
+    """Travel time of `edge` when entered at t seconds after midnight
+
+    Profile values sit at the middle of each bucket and are interpolated
+    linearly, so cost changes continuously and waiting never pays off (FIFO).
+    """
+    p = t * buckets / 86400 - 0.5
+    h = math.floor(p)
+    frac = p - h
+    base = edge * buckets
+    first = flat[base + h % buckets]
+    return first + frac * (flat[base + (h + 1) % buckets] - first)
+
+
+def dijkstra_csr(indptr: np.ndarray, indices: np.ndarray, edge_weights: np.ndarray,
+                 source: int, limit: float = math.inf) -> np.ndarray:
+    """Single-source distances over CSR arrays (edge_weights already in CSR order)"""
+    n = len(indptr) - 1
+    dist = np.full(n, math.inf)
+    indptr_l = indptr.tolist()
+    indices_l = indices.tolist()
+    weights_l = edge_weights.tolist()
+    best = {source: 0.0}
+    heap = [(0.0, source)]
+    settled = set()
+    while heap:
+        d, u = heapq.heappop(heap)
+        if u in settled:
+            continue
+        settled.add(u)
+        dist[u] = d
+        for k in range(indptr_l[u], indptr_l[u + 1]):
+            v = indices_l[k]
+            nd = d + weights_l[k]
+            if nd <= limit and nd < best.get(v, math.inf):
+                best[v] = nd
+                heapq.heappush(heap, (nd, v))
+    return dist
+
+
+def dijkstra_to_targets(indptr: np.ndarray, indices: np.ndarray, edge_weights: list,
+                        metric_columns: list, source: int, targets) -> dict:
+    """One-to-many Dijkstra that also sums metric columns along each shortest path
+
+    edge_weights and every metric column are plain lists in CSR order; the
+    search stops once all targets are settled. Returns {target: (dist, sums)}.
+    """
+    indptr_l = indptr.tolist() if isinstance(indptr, np.ndarray) else indptr
+    indices_l = indices.tolist() if isinstance(indices, np.ndarray) else indices
+    remaining = set(targets)
+    zero = (0.0,) * len(metric_columns)
+    best = {source: 0.0}
+    via = {source: None}
+    sums = {}
+    heap = [(0.0, source)]
+    found = {}
+    while heap and remaining:
+        d, u = heapq.heappop(heap)
+        if u in sums:
+            continue
+        k_in = via[u]
+        if k_in is None:
+            sums[u] = zero
+        else:
+            parent, k = k_in
+            sums[u] = tuple(acc + col[k] for acc, col in zip(sums[parent], metric_columns))
+        if u in remaining:
+            remaining.discard(u)
+            found[u] = (d, sums[u])
+        for k in range(indptr_l[u], indptr_l[u + 1]):
+            v = indices_l[k]
+            nd = d + edge_weights[k]
+            if nd < best.get(v, math.inf):
+                best[v] = nd
+                via[v] = (u, k)
+                heapq.heappush(heap, (nd, v))
+    return found
+
+
+def dijkstra_within(indptr: np.ndarray, indices: np.ndarray, edge_weights: list,
+                    source: int, limit: float) -> dict:
+    """Truncated one-to-all Dijkstra: {node: dist} for every node with dist <= limit"""
+    indptr_l = indptr.tolist() if isinstance(indptr, np.ndarray) else indptr
+    indices_l = indices.tolist() if isinstance(indices, np.ndarray) else indices
+    best = {source: 0.0}
+    settled = {}
+    heap = [(0.0, source)]
+    while heap:
+        d, u = heapq.heappop(heap)
+        if d > limit:
+            break
+        if u in settled:
+            continue
+        settled[u] = d
+        for k in range(indptr_l[u], indptr_l[u + 1]):
+            v = indices_l[k]
+            nd = d + edge_weights[k]
+            if nd <= limit and nd < best.get(v, math.inf):
+                best[v] = nd
+                heapq.heappush(heap, (nd, v))
+    return settled
+
+
+class Landmarks:
+    """Landmark distance tables for ALT lower bounds"""
+
+    def __init__(self, arrays, lower_bounds: np.ndarray, count: int = LANDMARK_COUNT):
+        self.arrays = arrays
+        self.landmarks = self.select(arrays, count)
+
+        fwd_indptr, fwd_indices, fwd_eids = arrays.csr()
+        rev_indptr, rev_indices, rev_eids = arrays.csr(reverse=True)
+        fwd_w = lower_bounds[fwd_eids]
+        rev_w = lower_bounds[rev_eids]
+        # from_landmark[i, v] = d(L_i, v); to_landmark[i, v] = d(v, L_i)
+        self.from_landmark = np.array([dijkstra_csr(fwd_indptr, fwd_indices, fwd_w, lm) for lm in self.landmarks])
+        self.to_landmark = np.array([dijkstra_csr(rev_indptr, rev_indices, rev_w, lm) for lm in self.landmarks])
+
+    @staticmethod
+    def select(arrays, count: int) -> List[int]:
+        """Farthest node from the centre in each of `count` angular sectors"""
+        if arrays.num_nodes == 0:
+            return []
+        dx = arrays.node_x - arrays.node_x.mean()
+        dy = arrays.node_y - arrays.node_y.mean()
+        angle = np.arctan2(dy, dx)
+        radius = dx * dx + dy * dy
+        sector = ((angle + math.pi) / (2 * math.pi) * count).astype(int) % count
+        chosen = []
+        for s in range(count):
+            members = np.nonzero(sector == s)[0]
+            if len(members):
+                chosen.append(int(members[np.argmax(radius[members])]))
+        return chosen
+
+    @staticmethod
+    def _bound(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+        diff = np.where(np.isfinite(a) & np.isfinite(b), a - b, 0.0)
+        return np.maximum(diff.max(axis=0), 0.0) if len(diff) else np.zeros(a.shape[-1])
+
+    def to_target(self, t: int) -> np.ndarray:
+        """Lower bound of d(v, t) for every node v"""
+        return np.maximum(
+            self._bound(self.from_landmark[:, [t]], self.from_landmark),
+            self._bound(self.to_landmark, self.to_landmark[:, [t]])
+        )
+
+    def from_source(self, s: int) -> np.ndarray:
+        """Lower bound of d(s, v) for every node v"""
+        return np.maximum(
+            self._bound(self.from_landmark, self.from_landmark[:, [s]]),
+            self._bound(self.to_landmark[:, [s]], self.to_landmark)
+        )
+
+    def nbytes(self) -> int:
+        return self.from_landmark.nbytes + self.to_landmark.nbytes
+
+
+class RouteSearch:
+    """A*, bidirectional A* and ALT over the optimizer's DiGraph
+
+    `rate` scales straight-line metres into a lower bound of the weight (see
+    heuristic_rate); with rate 0 and no landmarks the search is plain Dijkstra.
+    """
+
+    def __init__(self, G: nx.DiGraph, arrays):
+        self.G = G
+        self.arrays = arrays
+        self.last_settled = 0
+
+    @staticmethod
+    def _weight_function(weight) -> Callable:
+        if callable(weight):
+            return weight
+        return lambda u, v, d: d.get(weight, 1)
+
+    def _lower_bound_to(self, node: int, rate: float, landmarks: Landmarks = None, reverse: bool = False) -> np.ndarray:
+        arrays = self.arrays
+        idx = arrays.node_index[node]
+        if rate > 0:
+            h = rate * haversine_to_all(arrays.node_y, arrays.node_x, arrays.node_y[idx], arrays.node_x[idx])
+        else:
+            h = np.zeros(arrays.num_nodes)
+        if landmarks is not None:
+            h = np.maximum(h, landmarks.from_source(idx) if reverse else landmarks.to_target(idx))
+        return h
+
+    @staticmethod
+    def _unwind(parents: dict, node) -> List[int]:
+        path = [node]
+        while parents[node] is not None:
+            node = parents[node]
+            path.append(node)
+        return path
+
+    def astar(self, source: int, target: int, weight='combined_weight',
+              rate: float = 0.0, landmarks: Landmarks = None) -> List[int]:
+        if source not in self.G or target not in self.G:
+            raise nx.NodeNotFound(f"Source {source} or target {target} is not in G")
+        weight_fn = self._weight_function(weight)
+        node_index = self.arrays.node_index
+        h = self._lower_bound_to(target, rate, landmarks).tolist()
+        succ = self.G._succ
+
+        g = {source: 0.0}
+        parents = {source: None}
+        heap = [(h[node_index[source]], 0, source)]
+        closed = set()
+        counter = 1
+        while heap:
+            _, _, u = heapq.heappop(heap)
+            if u in closed:
+                continue
+            closed.add(u)
+            if u == target:
+                self.last_settled = len(closed)
+                return self._unwind(parents, u)[::-1]
+            gu = g[u]
+            for v, data in succ[u].items():
+                w = weight_fn(u, v, data)
+                if w is None or v in closed:
+                    continue
+                ng = gu + w
+                if ng < g.get(v, math.inf):
+                    g[v] = ng
+                    parents[v] = u
+                    heapq.heappush(heap, (ng + h[node_index[v]], counter, v))
+                    counter += 1
+
+        self.last_settled = len(closed)
+        raise nx.NetworkXNoPath(f"Node {target} not reachable from {source}")
+
+    def bidirectional_astar(self, source: int, target: int, weight='combined_weight',
+                            rate: float = 0.0, landmarks: Landmarks = None) -> List[int]:
+        """Bidirectional A* with average (consistent) potentials"""
+        if source not in self.G or target not in self.G:
+            raise nx.NodeNotFound(f"Source {source} or target {target} is not in G")
+        if source == target:
+            self.last_settled = 1
+            return [source]
+
+        weight_fn = self._weight_function(weight)
+        node_index = self.arrays.node_index
+        h_to_t = self._lower_bound_to(target, rate, landmarks)
+        h_from_s = self._lower_bound_to(source, rate, landmarks, reverse=True)
+        pf = ((h_to_t - h_from_s) / 2).tolist()
+
+        succ, pred = self.G._succ, self.G._pred
+        g = [{source: 0.0}, {target: 0.0}]
+        parents = [{source: None}, {target: None}]
+        closed = [set(), set()]
+        heaps = [[(pf[node_index[source]], 0, source)], [(-pf[node_index[target]], 0, target)]]
+        counter = 1
+        best = math.inf
+        meeting = None
+
+        while heaps[0] and heaps[1]:
+            # Drop entries for nodes already settled in that direction
+            for side in (0, 1):
+                while heaps[side] and heaps[side][0][2] in closed[side]:
+                    heapq.heappop(heaps[side])
+            if not heaps[0] or not heaps[1]:
+                break
+            if heaps[0][0][0] + heaps[1][0][0] >= best:
+                break
+
+            side = 0 if len(heaps[0]) <= len(heaps[1]) else 1
+            _, _, u = heapq.heappop(heaps[side])
+            closed[side].add(u)
+            gu = g[side][u]
+            other_g = g[1 - side]
+            sign = 1 if side == 0 else -1
+            neighbours = succ[u] if side == 0 else pred[u]
+
+            for v, data in neighbours.items():
+                w = weight_fn(u, v, data) if side == 0 else weight_fn(v, u, data)
+                if w is None or v in closed[side]:
+                    continue
+                ng = gu + w
+                if ng < g[side].get(v, math.inf):
+                    g[side][v] = ng
+                    parents[side][v] = u
+                    heapq.heappush(heaps[side], (ng + sign * pf[node_index[v]], counter, v))
+                    counter += 1
+                    if v in other_g and ng + other_g[v] < best:
+                        best = ng + other_g[v]
+                        meeting = v
+
+        self.last_settled = len(closed[0]) + len(closed[1])
+        if meeting is None:
+            raise nx.NetworkXNoPath(f"Node {target} not reachable from {source}")
+        forward = self._unwind(parents[0], meeting)[::-1]
+        backward = self._unwind(parents[1], meeting)
+        return forward + backward[1:]
+
+    def td_astar(self, source: int, target: int, profile: np.ndarray, depart_seconds: float,
+                 rate: float = 0.0, penalty: dict = None) -> List[int]:
+        """Time-dependent A*: each edge costs its profile value at the time it is reached
+
+        profile is (edges, buckets) travel time in seconds over one day;
+        depart_seconds counts from midnight. penalty maps edge id -> cost
+        multiplier (used for diverse alternatives). Minimizes arrival time.
+        """
+        arrays = self.arrays
+        node_index = arrays.node_index
+        if source not in node_index or target not in node_index:
+            raise nx.NodeNotFound(f"Source {source} or target {target} is not in G")
+        indptr, indices, edge_ids = arrays.csr()
+        indptr_l, indices_l, edge_ids_l = indptr.tolist(), indices.tolist(), edge_ids.tolist()
+        buckets = profile.shape[1]
+        flat = memoryview(np.ascontiguousarray(profile, dtype=np.float32).reshape(-1))
+        penalty = penalty or {}
+        h = self._lower_bound_to(target, rate).tolist()
+
+        s, t = node_index[source], node_index[target]
+        arrival = {s: float(depart_seconds)}
+        parents = {s: None}
+        heap = [(arrival[s] + h[s], s)]
+        closed = set()
+        while heap:
+            _, u = heapq.heappop(heap)
+            if u in closed:
+                continue
+            closed.add(u)
+            if u == t:
+                self.last_settled = len(closed)
+                node_ids = arrays.node_ids
+                return [node_ids[i] for i in self._unwind(parents, u)[::-1]]
+            au = arrival[u]
+            for k in range(indptr_l[u], indptr_l[u + 1]):
+                v = indices_l[k]
+                if v in closed:
+                    continue
+                e = edge_ids_l[k]
+                cost = profile_cost(flat, buckets, e, au)
+                if e in penalty:
+                    cost *= penalty[e]
+                av = au + cost
+                if av < arrival.get(v, math.inf):
+                    arrival[v] = av
+                    parents[v] = u
+                    heapq.heappush(heap, (av + h[v], v))
+
+        self.last_settled = len(closed)
+        raise nx.NetworkXNoPath(f"Node {target} not reachable from {source}")
+
+    def td_edge_times(self, path: List[int], profile: np.ndarray, depart_seconds: float) -> List[float]:
+        """Seconds spent on each edge of path when leaving at depart_seconds"""
+        arrays = self.arrays
+        buckets = profile.shape[1]
+        flat = memoryview(np.ascontiguousarray(profile, dtype=np.float32).reshape(-1))
+        t = float(depart_seconds)
+        times = []
+        for u, v in zip(path[:-1], path[1:]):
+            cost = profile_cost(flat, buckets, arrays.edge_index[(u, v)], t)
+            times.append(cost)
+            t += cost
+        return times
+
+    def pareto(self, source: int, target: int, costs: np.ndarray, epsilon: float = PARETO_EPSILON,
+               max_labels: int = PARETO_MAX_LABELS, max_detour: float = PARETO_MAX_DETOUR,
+               max_routes: int = PARETO_MAX_ROUTES) -> List[tuple]:
+        """Non-dominated paths over the columns of costs: [(path, totals)] by the first objective
+
+        costs is (edges, objectives) in edge id order. One reverse Dijkstra per
+        objective gives exact remaining costs to the target, and the optimum of
+        every single objective seeds the front. Labels are then settled
+        in order of their normalized cost-plus-remaining sum and kept per node
+        under exact dominance, at most max_labels each. A label is dropped once
+        a route already found is within a factor 1 + epsilon of its estimate on
+        every objective, or when any objective would exceed max_detour times
+        its optimum. An evenly spread max_routes of the front are returned.
+        """
+        arrays = self.arrays
+        node_index = arrays.node_index
+        if source not in node_index or target not in node_index:
+            raise nx.NodeNotFound(f"Source {source} or target {target} is not in G")
+        costs = np.asarray(costs, dtype=np.float64)
+        s, t = node_index[source], node_index[target]
+        r_indptr, r_indices, r_edge_ids = arrays.csr(reverse=True)
+        bounds = np.stack([dijkstra_csr(r_indptr, r_indices, costs[r_edge_ids, i], t)
+                           for i in range(costs.shape[1])], axis=1)
+        if not np.isfinite(bounds[s]).all():
+            raise nx.NetworkXNoPath(f"Node {target} not reachable from {source}")
+        limit = tuple((bounds[s] * max_detour).tolist())
+        scale = [1 / b if b > 0 else 1.0 for b in bounds[s].tolist()]
+        bounds_l = [tuple(row) for row in bounds.tolist()]
+        indptr, indices, edge_ids = arrays.csr()
+        indptr_l, indices_l = indptr.tolist(), indices.tolist()
+        slot_costs = [tuple(row) for row in costs[edge_ids].tolist()]
+        slack = 1 + epsilon
+
+        label_node, label_cost, label_parent, alive = [s], [(0.0,) * costs.shape[1]], [-1], [True]
+        node_labels = {s: [0]}
+        heap = [(sum(b * w for b, w in zip(bounds_l[s], scale)), 0)]
+        found = []
+        for i in range(costs.shape[1]):
+            # Follow objective i's exact remaining cost down to the target, ties broken by the others
+            lid, u = 0, s
+            for _ in range(arrays.num_nodes):
+                if u == t:
+                    found.append(lid)
+                    break
+                k = min(range(indptr_l[u], indptr_l[u + 1]),
+                        key=lambda k: (slot_costs[k][i] + bounds_l[indices_l[k]][i],
+                                       sum(c * w for c, w in zip(slot_costs[k], scale))))
+                u = indices_l[k]
+                label_node.append(u)
+                label_cost.append(tuple(a + b for a, b in zip(label_cost[lid], slot_costs[k])))
+                label_parent.append(lid)
+                alive.append(False)  # never expanded; only found[] refers to it
+                lid = len(label_node) - 1
+        while heap:
+            _, lid = heapq.heappop(heap)
+            if not alive[lid]:
+                continue
+            u, cu = label_node[lid], label_cost[lid]
+            if u == t:
+                found.append(lid)
+                continue
+            for k in range(indptr_l[u], indptr_l[u + 1]):
+                v = indices_l[k]
+                cv = tuple(a + b for a, b in zip(cu, slot_costs[k]))
+                estimate = tuple(a + b for a, b in zip(cv, bounds_l[v]))
+                if any(e > m for e, m in zip(estimate, limit)):
+                    continue
+                if any(all(f <= e * slack for f, e in zip(label_cost[x], estimate)) for x in found):
+                    continue
+                labels = node_labels.setdefault(v, [])
+                if any(all(o <= c for o, c in zip(label_cost[x], cv)) for x in labels):
+                    continue
+                for x in labels:
+                    if all(c <= o for c, o in zip(cv, label_cost[x])):
+                        alive[x] = False
+                labels[:] = [x for x in labels if alive[x]]
+                if len(labels) >= max_labels:
+                    continue
+                labels.append(len(label_node))
+                label_node.append(v)
+                label_cost.append(cv)
+                label_parent.append(lid)
+                alive.append(True)
+                heapq.heappush(heap, (sum(e * w for e, w in zip(estimate, scale)), len(label_node) - 1))
+
+        self.last_settled = len(label_node)
+        front = sorted({label_cost[x]: x for x in found}.values(), key=lambda x: label_cost[x])
+        front = [x for x in front if not any(
+            y != x and all(a <= b for a, b in zip(label_cost[y], label_cost[x])) for y in front)]
+        if not front:
+            raise nx.NetworkXNoPath(f"Node {target} not reachable from {source}")
+        if len(front) > max_routes:
+            picks = np.unique(np.round(np.linspace(0, len(front) - 1, max_routes)).astype(int))
+            front = [front[i] for i in picks.tolist()]
+
+        node_ids = arrays.node_ids
+        routes = []
+        for lid in front:
+            path = []
+            x = lid
+            while x >= 0:
+                path.append(node_ids[label_node[x]])
+                x = label_parent[x]
+            routes.append((path[::-1], label_cost[lid]))
+        return routes
@@ -0,0 +1,166 @@
+"""
+Process-pool execution layer for CPU-bound routing work
+Each worker is a single-process executor with its own warm graph cache; requests
+are pinned to a worker by region key so the same tiles stay hot in one process.
+Per-worker queue limits give backpressure (429) and every job has a timeout (504).
+"""
+
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+import traceback
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from fastapi import HTTPException
+
+ROUTE_WORKERS = int(os.getenv('ROUTE_WORKERS', str(min(4, os.cpu_count() or 1))))
+ROUTE_QUEUE_LIMIT = int(os.getenv('ROUTE_QUEUE_LIMIT', '8'))  # queued + running jobs per worker
+ROUTE_TIMEOUT_SECONDS = float(os.getenv('ROUTE_TIMEOUT_SECONDS', '30'))
+
+
+def _run_job(fn, stats_fn, args: tuple) -> tuple:
+    """Runs inside the worker; HTTPException does not survive pickling, so it is sent as data"""
+    try:
+        result = ('ok', fn(*args))
+    except HTTPException as e:
+        result = ('http_error', e.status_code, e.detail)
+    except Exception as e:
+        traceback.print_exc()
+        result = ('error', f"{type(e).__name__}: {e}")
+    return result, os.getpid(), stats_fn() if stats_fn else None
+
+
+class WorkerSlot:
+    def __init__(self, index: int):
+        self.index = index
+        self.executor = None
+        self.pending = 0
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.restarts = 0
+        self.busy_seconds = 0.0
+        self.pid = None
+        self.worker_stats = None
+
+
+class RouteWorkerPool:
+    """Region-affine pool of single-process workers"""
+
+    def __init__(self, num_workers: int = ROUTE_WORKERS, queue_limit: int = ROUTE_QUEUE_LIMIT,
+                 timeout: float = ROUTE_TIMEOUT_SECONDS, initializer=None, stats_fn=None):
+        # num_workers=0 runs jobs in-process on the event loop (debugging only)
+        self.num_workers = num_workers
+        self.queue_limit = queue_limit
+        self.timeout = timeout
+        self.initializer = initializer
+        self.stats_fn = stats_fn
+        self.slots = [WorkerSlot(i) for i in range(num_workers)]
+        # Re-entrant: cancelling futures on restart runs their done callbacks inline
+        self.lock = threading.RLock()
+        # spawn: the API process runs background threads, which fork would copy mid-state
+        self.mp_context = multiprocessing.get_context('spawn')
+
+    def slot_for(self, key) -> WorkerSlot:
+        return self.slots[zlib.crc32(repr(key).encode()) % self.num_workers]
+
+    def _executor(self, slot: WorkerSlot) -> ProcessPoolExecutor:
+        if slot.executor is None:
+            slot.executor = ProcessPoolExecutor(
+                max_workers=1, mp_context=self.mp_context, initializer=self.initializer
+            )
+        return slot.executor
+
+    def _restart(self, slot: WorkerSlot):
+        with self.lock:
+            if slot.executor is not None:
+                slot.executor.shutdown(wait=False, cancel_futures=True)
+                slot.executor = None
+                slot.restarts += 1
+
+    async def submit(self, key, fn, *args):
+        """Run fn(*args) on the worker owning `key` and return its result"""
+        if not self.num_workers:
+            return fn(*args)
+
+        slot = self.slot_for(key)
+        with self.lock:
+            if slot.pending >= self.queue_limit:
+                slot.rejected += 1
+                raise HTTPException(
+                    status_code=429, detail="Route service is busy, please retry shortly",
+                    headers={'Retry-After': '1'}
+                )
+            slot.pending += 1
+            slot.submitted += 1
+            start = time.monotonic()
+            try:
+                future = self._executor(slot).submit(_run_job, fn, self.stats_fn, args)
+            except Exception:
+                slot.pending -= 1
+                raise
+
+        def done(f):
+            # Runs when the worker finishes, even if the request already timed out
+            with self.lock:
+                slot.pending -= 1
+                slot.busy_seconds += time.monotonic() - start
+        future.add_done_callback(done)
+
+        try:
+            result, pid, worker_stats = await asyncio.wait_for(asyncio.wrap_future(future), self.timeout)
+        except asyncio.TimeoutError:
+            with self.lock:
+                slot.timeouts += 1
+            raise HTTPException(status_code=504, detail=f"Routing timed out after {self.timeout:g}s")
+        except BrokenProcessPool:
+            with self.lock:
+                slot.failed += 1
+            self._restart(slot)
+            raise HTTPException(status_code=503, detail="Route worker crashed, please retry")
+
+        with self.lock:
+            slot.pid = pid
+            slot.worker_stats = worker_stats
+            if result[0] == 'ok':
+                slot.completed += 1
+            else:
+                slot.failed += 1
+        if result[0] == 'http_error':
+            raise HTTPException(status_code=result[1], detail=result[2])
+        if result[0] == 'error':
+            raise RuntimeError(result[1])
+        return result[1]
+
+    def shutdown(self):
+        for slot in self.slots:
+            if slot.executor is not None:
+                slot.executor.shutdown(wait=False, cancel_futures=True)
+                slot.executor = None
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {
+                'workers': self.num_workers,
+                'queue_limit': self.queue_limit,
+                'timeout_seconds': self.timeout,
+                'queue_depth': sum(slot.pending for slot in self.slots),
+                'per_worker': [{
+                    'pid': slot.pid,
+                    'pending': slot.pending,
+                    'submitted': slot.submitted,
+                    'completed': slot.completed,
+                    'failed': slot.failed,
+                    'rejected': slot.rejected,
+                    'timeouts': slot.timeouts,
+                    'restarts': slot.restarts,
+                    'busy_seconds': round(slot.busy_seconds, 2),
+                    'worker': slot.worker_stats
+                } for slot in self.slots]
+            }
@@ -0,0 +1,246 @@
+"""
+Navigation session store
+Sessions expire SESSION_TTL_SECONDS after their last update and the store never
+holds more than SESSION_MAX_ENTRIES (least recently updated go first). Routes
+are kept as packed int64 bytes rather than lists of ints. By default sessions
+live in this process; set SESSION_STORE_PATH to a SQLite file (WAL mode) so
+every uvicorn worker on the host sees the same sessions.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+import numpy as np
+
+SESSION_TTL_SECONDS = float(os.getenv('SESSION_TTL_SECONDS', '7200'))
+SESSION_MAX_ENTRIES = int(os.getenv('SESSION_MAX_ENTRIES', '10000'))
+SESSION_STORE_PATH = os.getenv('SESSION_STORE_PATH', '')  # empty: in-process only
+
+# Column order of a stored record; route is packed int64 node ids
+SESSION_FIELDS = ('route', 'last_update', 'eta_minutes', 'distance_km', 'average_speed',
+                  'last_lat', 'last_lon', 'last_time')
+
+
+def pack_route(route) -> bytes:
+    return np.asarray(route, dtype='<i8').tobytes()
+
+
+def unpack_route(blob: bytes) -> list:
+    return np.frombuffer(blob, dtype='<i8').tolist()
+
+
+def to_session(session_id: str, record: tuple, with_route: bool = False) -> dict:
+    """Public view of a record: datetimes instead of epoch seconds, route decoded on request"""
+    fields = dict(zip(SESSION_FIELDS, record))
+    session = {
+        'session_id': session_id,
+        'last_update': datetime.fromtimestamp(fields['last_update']),
+        'eta_minutes': fields['eta_minutes'],
+        'distance_km': fields['distance_km'],
+        'average_speed': fields['average_speed'],
+        'last_position': None
+    }
+    if fields['last_time'] is not None:
+        session['last_position'] = (fields['last_lat'], fields['last_lon'],
+                                    datetime.fromtimestamp(fields['last_time']))
+    if with_route:
+        session['route'] = unpack_route(fields['route'])
+    return session
+
+
+class SessionStore:
+    """In-process store: an OrderedDict in last-update order, so expiry and eviction pop from the front"""
+
+    backend = 'memory'
+
+    def __init__(self, ttl: float = SESSION_TTL_SECONDS, max_entries: int = SESSION_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.records = OrderedDict()  # session_id -> tuple in SESSION_FIELDS order
+        self.lock = threading.Lock()
+        self.created = 0
+        self.expired = 0
+        self.evicted = 0
+
+    def _purge(self, now: float):
+        while self.records:
+            session_id, record = next(iter(self.records.items()))
+            if now - record[1] <= self.ttl:
+                break
+            del self.records[session_id]
+            self.expired += 1
+
+    def create(self, session_id: str, route, eta_minutes: float, distance_km: float, average_speed: float):
+        now = time.time()
+        record = (pack_route(route), now, float(eta_minutes), float(distance_km), float(average_speed),
+                  None, None, None)
+        with self.lock:
+            self._purge(now)
+            self.records.pop(session_id, None)
+            self.records[session_id] = record
+            self.created += 1
+            while len(self.records) > self.max_entries:
+                self.records.popitem(last=False)
+                self.evicted += 1
+
+    def get(self, session_id: str, with_route: bool = False) -> dict:
+        """The session, or None when unknown or expired"""
+        with self.lock:
+            self._purge(time.time())
+            record = self.records.get(session_id)
+        return to_session(session_id, record, with_route) if record is not None else None
+
+    def record_position(self, session_id: str, lat: float, lon: float, timestamp: datetime) -> tuple:
+        """Store the latest position; returns (found, previous (lat, lon, datetime) or None)"""
+        now = time.time()
+        with self.lock:
+            self._purge(now)
+            record = self.records.pop(session_id, None)
+            if record is None:
+                return False, None
+            previous = None
+            if record[7] is not None:
+                previous = (record[5], record[6], datetime.fromtimestamp(record[7]))
+            self.records[session_id] = record[:1] + (now,) + record[2:5] + (lat, lon, timestamp.timestamp())
+        return True, previous
+
+    def delete(self, session_id: str) -> bool:
+        with self.lock:
+            return self.records.pop(session_id, None) is not None
+
+    def __len__(self) -> int:
+        with self.lock:
+            self._purge(time.time())
+            return len(self.records)
+
+    def nbytes(self) -> int:
+        with self.lock:
+            return sum(len(record[0]) for record in self.records.values())
+
+    def stats(self) -> dict:
+        return {
+            'backend': self.backend,
+            'live': len(self),
+            'max_entries': self.max_entries,
+            'ttl_seconds': self.ttl,
+            'created': self.created,
+            'expired': self.expired,
+            'evicted': self.evicted,
+            'route_bytes': self.nbytes()
+        }
+
+
+class SQLiteSessionStore(SessionStore):
+    """Same interface over a SQLite file in WAL mode, shared by every process on the host
+
+    Counters in stats() are this process's; 'live' is the shared table.
+    """
+
+    backend = 'sqlite'
+
+    def __init__(self, path: str, ttl: float = SESSION_TTL_SECONDS, max_entries: int = SESSION_MAX_ENTRIES):
+        super().__init__(ttl, max_entries)
+        self.path = path
+        self.local = threading.local()
+        with self._connection() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS navigation_sessions (
+                    session_id TEXT PRIMARY KEY,
+                    route BLOB NOT NULL,
+                    last_update REAL NOT NULL,
+                    eta_minutes REAL,
+                    distance_km REAL,
+                    average_speed REAL,
+                    last_lat REAL,
+                    last_lon REAL,
+                    last_time REAL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS navigation_sessions_update ON navigation_sessions (last_update)")
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self.local.conn = conn
+        return conn
+
+    def _purge(self, conn: sqlite3.Connection, now: float):
+        self.expired += conn.execute(
+            "DELETE FROM navigation_sessions WHERE last_update < ?", (now - self.ttl,)
+        ).rowcount
+
+    def create(self, session_id: str, route, eta_minutes: float, distance_km: float, average_speed: float):
+        now = time.time()
+        conn = self._connection()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            self._purge(conn, now)
+            conn.execute(
+                "INSERT OR REPLACE INTO navigation_sessions VALUES (?, ?, ?, ?, ?, ?, NULL, NULL, NULL)",
+                (session_id, pack_route(route), now, float(eta_minutes), float(distance_km), float(average_speed))
+            )
+            (count,) = conn.execute("SELECT COUNT(*) FROM navigation_sessions").fetchone()
+            if count > self.max_entries:
+                self.evicted += conn.execute("""
+                    DELETE FROM navigation_sessions WHERE session_id IN (
+                        SELECT session_id FROM navigation_sessions ORDER BY last_update LIMIT ?
+                    )
+                """, (count - self.max_entries,)).rowcount
+        self.created += 1
+
+    def get(self, session_id: str, with_route: bool = False) -> dict:
+        row = self._connection().execute(
+            f"SELECT {', '.join(SESSION_FIELDS)} FROM navigation_sessions WHERE session_id = ? AND last_update >= ?",
+            (session_id, time.time() - self.ttl)
+        ).fetchone()
+        return to_session(session_id, row, with_route) if row is not None else None
+
+    def record_position(self, session_id: str, lat: float, lon: float, timestamp: datetime) -> tuple:
+        now = time.time()
+        conn = self._connection()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT last_lat, last_lon, last_time FROM navigation_sessions WHERE session_id = ? AND last_update >= ?",
+                (session_id, now - self.ttl)
+            ).fetchone()
+            if row is None:
+                return False, None
+            conn.execute(
+                "UPDATE navigation_sessions SET last_update = ?, last_lat = ?, last_lon = ?, last_time = ? "
+                "WHERE session_id = ?",
+                (now, lat, lon, timestamp.timestamp(), session_id)
+            )
+        previous = (row[0], row[1], datetime.fromtimestamp(row[2])) if row[2] is not None else None
+        return True, previous
+
+    def delete(self, session_id: str) -> bool:
+        conn = self._connection()
+        with conn:
+            return conn.execute("DELETE FROM navigation_sessions WHERE session_id = ?", (session_id,)).rowcount > 0
+
+    def __len__(self) -> int:
+        (count,) = self._connection().execute(
+            "SELECT COUNT(*) FROM navigation_sessions WHERE last_update >= ?", (time.time() - self.ttl,)
+        ).fetchone()
+        return count
+
+    def nbytes(self) -> int:
+        (total,) = self._connection().execute(
+            "SELECT COALESCE(SUM(LENGTH(route)), 0) FROM navigation_sessions"
+        ).fetchone()
+        return total
+
+
+def make_session_store(path: str = SESSION_STORE_PATH) -> SessionStore:
+    if path:
+        print(f"🗂️ Navigation sessions shared through {path}")
+        return SQLiteSessionStore(path)
+    return SessionStore()
@@ -0,0 +1,95 @@
+"""
+Batched map matching against one cached graph
+KD-trees over projected node positions and edge midpoints are built once per
+graph; many (lat, lon) points are snapped to nodes, or to edges with an offset
+along the edge, in a handful of array passes.
+"""
+
+import numpy as np
+
+from spatial_index import KDTree, LocalProjection
+
+
+class GraphSnapper:
+    """Nearest node / nearest edge lookups over a graph's GraphArrays"""
+
+    def __init__(self, arrays):
+        self.arrays = arrays
+        ref_lat = float(arrays.node_y.mean()) if arrays.num_nodes else 0.0
+        self.projection = LocalProjection(ref_lat)
+        self.node_xy = self.projection.project(arrays.node_y, arrays.node_x)
+        self.node_tree = KDTree(self.node_xy)
+
+        # Edges as straight segments u -> v in local metres
+        self.seg_start = self.node_xy[arrays.u_idx]
+        self.seg_end = self.node_xy[arrays.v_idx]
+        self.seg_mid = (self.seg_start + self.seg_end) / 2
+        self.seg_half = np.hypot(*(self.seg_end - self.seg_start).T) / 2
+        self.max_half = float(self.seg_half.max()) if len(self.seg_half) else 0.0
+        self.edge_tree = KDTree(self.seg_mid)
+
+    def nearest_node_indices(self, lats, lons) -> tuple:
+        """(node index, distance in metres) for every point"""
+        return self.node_tree.query_nearest(self.projection.project(lats, lons))
+
+    def nearest_nodes(self, lats, lons) -> list:
+        idx, _ = self.nearest_node_indices(lats, lons)
+        node_ids = self.arrays.node_ids
+        return [node_ids[i] for i in idx.tolist()]
+
+    def _segment_distance(self, points: np.ndarray, edge_ids: np.ndarray) -> tuple:
+        """(distance, fraction along the edge) from each point to its paired edge"""
+        start = self.seg_start[edge_ids]
+        direction = self.seg_end[edge_ids] - start
+        length_sq = (direction ** 2).sum(axis=1)
+        safe = np.where(length_sq > 0, length_sq, 1)
+        t = np.clip(((points - start) * direction).sum(axis=1) / safe, 0, 1)
+        t = np.where(length_sq > 0, t, 0)
+        closest = start + direction * t[:, None]
+        return np.hypot(*(points - closest).T), t
+
+    def nearest_edges(self, lats, lons) -> dict:
+        """Snap every point to its closest edge
+
+        Returns arrays: edge (GraphArrays edge id), fraction (0 at u, 1 at v),
+        offset_m (fraction of the edge's length attribute), distance_m, lat, lon
+        of the snapped position.
+        """
+        points = self.projection.project(lats, lons)
+        n = len(points)
+        if not self.arrays.num_edges or not n:
+            empty = np.zeros(n)
+            return {'edge': np.full(n, -1, dtype=np.int64), 'fraction': empty, 'offset_m': empty,
+                    'distance_m': np.full(n, np.inf), 'lat': empty, 'lon': empty}
+
+        # A segment whose midpoint is farther than best + max half-length cannot be closer
+        first, _ = self.edge_tree.query_nearest(points)
+        bound, _ = self._segment_distance(points, first)
+        q, candidates, _ = self.edge_tree.query_radius(points, bound + self.max_half)
+        dist, t = self._segment_distance(points[q], candidates)
+
+        order = np.lexsort((candidates, dist, q))
+        q, candidates, dist, t = q[order], candidates[order], dist[order], t[order]
+        keep = np.r_[True, q[1:] != q[:-1]]
+        edge = np.empty(n, dtype=np.int64)
+        fraction = np.empty(n)
+        distance = np.empty(n)
+        edge[q[keep]] = candidates[keep]
+        fraction[q[keep]] = t[keep]
+        distance[q[keep]] = dist[keep]
+
+        snapped = self.seg_start[edge] + (self.seg_end[edge] - self.seg_start[edge]) * fraction[:, None]
+        snapped_lat, snapped_lon = self.projection.unproject(snapped)
+        return {
+            'edge': edge,
+            'fraction': fraction,
+            'offset_m': fraction * self.arrays.length[edge],
+            'distance_m': distance,
+            'lat': snapped_lat,
+            'lon': snapped_lon
+        }
+
+    def nbytes(self) -> int:
+        arrays = (self.node_xy, self.seg_start, self.seg_end, self.seg_mid, self.seg_half,
+                  self.node_tree.points, self.edge_tree.points)
+        return sum(a.nbytes for a in arrays)
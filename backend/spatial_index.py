@@ -0,0 +1,215 @@
+"""
+NumPy-backed spatial index for the route optimizer
+Points are projected to local metres and stored in a static KD-tree that answers
+batched radius queries for many query points in a few array passes.
+"""
+
+import math
+
+import numpy as np
+
+EARTH_RADIUS_M = 6371000
+
+
+def haversine_pairs(lat1, lon1, lat2, lon2) -> np.ndarray:
+    """Element-wise great-circle distance in metres (same formula as the scalar helpers)"""
+    phi1 = np.radians(lat1)
+    phi2 = np.radians(lat2)
+    dphi = np.radians(np.asarray(lat2) - np.asarray(lat1))
+    dlmb = np.radians(np.asarray(lon2) - np.asarray(lon1))
+    a = np.sin(dphi / 2) ** 2 + np.cos(phi1) * np.cos(phi2) * np.sin(dlmb / 2) ** 2
+    return EARTH_RADIUS_M * 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+
+
+class LocalProjection:
+    """Equirectangular projection around a reference latitude (metres)"""
+
+    def __init__(self, ref_lat: float):
+        self.ref_lat = ref_lat
+        self.kx = math.radians(1) * EARTH_RADIUS_M * math.cos(math.radians(ref_lat))
+        self.ky = math.radians(1) * EARTH_RADIUS_M
+
+    def project(self, lat, lon) -> np.ndarray:
+        lat = np.asarray(lat, dtype=np.float64)
+        lon = np.asarray(lon, dtype=np.float64)
+        return np.column_stack([lon * self.kx, lat * self.ky])
+
+    def unproject(self, xy: np.ndarray) -> tuple:
+        xy = np.asarray(xy, dtype=np.float64)
+        return xy[:, 1] / self.ky, xy[:, 0] / self.kx
+
+
+class KDTree:
+    """Static KD-tree over 2-D points with bounding boxes per tree node"""
+
+    def __init__(self, points: np.ndarray, leaf_size: int = 16):
+        self.points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        n = len(self.points)
+        self.perm = np.arange(n)
+
+        starts, ends, lefts, rights, boxes = [], [], [], [], []
+        # Iterative build: (tree node id, start, end) ranges over perm
+        stack = []
+        if n:
+            starts.append(0); ends.append(n); lefts.append(-1); rights.append(-1); boxes.append(None)
+            stack.append(0)
+        while stack:
+            node = stack.pop()
+            start, end = starts[node], ends[node]
+            pts = self.points[self.perm[start:end]]
+            lo, hi = pts.min(axis=0), pts.max(axis=0)
+            boxes[node] = (lo[0], lo[1], hi[0], hi[1])
+            if end - start <= leaf_size:
+                continue
+            axis = int(np.argmax(hi - lo))
+            mid = (start + end) // 2
+            segment = self.perm[start:end]
+            split = np.argpartition(self.points[segment, axis], mid - start)
+            self.perm[start:end] = segment[split]
+            for child_start, child_end in ((start, mid), (mid, end)):
+                starts.append(child_start); ends.append(child_end)
+                lefts.append(-1); rights.append(-1); boxes.append(None)
+                stack.append(len(starts) - 1)
+            lefts[node], rights[node] = len(starts) - 2, len(starts) - 1
+
+        self.node_start = np.array(starts, dtype=np.int64)
+        self.node_end = np.array(ends, dtype=np.int64)
+        self.node_left = np.array(lefts, dtype=np.int64)
+        self.node_right = np.array(rights, dtype=np.int64)
+        self.node_box = np.array(boxes, dtype=np.float64).reshape(-1, 4)
+
+    def __len__(self) -> int:
+        return len(self.points)
+
+    def _box_distance(self, queries: np.ndarray, nodes: np.ndarray) -> np.ndarray:
+        box = self.node_box[nodes]
+        dx = np.maximum(np.maximum(box[:, 0] - queries[:, 0], queries[:, 0] - box[:, 2]), 0)
+        dy = np.maximum(np.maximum(box[:, 1] - queries[:, 1], queries[:, 1] - box[:, 3]), 0)
+        return np.hypot(dx, dy)
+
+    def query_radius(self, queries: np.ndarray, radius) -> tuple:
+        """All (query index, point index, distance) pairs within radius (scalar or per query)"""
+        queries = np.asarray(queries, dtype=np.float64).reshape(-1, 2)
+        radii = np.broadcast_to(np.asarray(radius, dtype=np.float64), (len(queries),))
+        empty = (np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0))
+        if not len(self.points) or not len(queries):
+            return empty
+
+        q = np.arange(len(queries))
+        node = np.zeros(len(queries), dtype=np.int64)
+        leaf_q, leaf_node = [], []
+        while len(q):
+            near = self._box_distance(queries[q], node) <= radii[q]
+            q, node = q[near], node[near]
+            is_leaf = self.node_left[node] < 0
+            leaf_q.append(q[is_leaf])
+            leaf_node.append(node[is_leaf])
+            q, node = q[~is_leaf], node[~is_leaf]
+            q = np.concatenate([q, q])
+            node = np.concatenate([self.node_left[node], self.node_right[node]])
+
+        leaf_q = np.concatenate(leaf_q)
+        leaf_node = np.concatenate(leaf_node)
+        if not len(leaf_q):
+            return empty
+
+        # Expand each (query, leaf) pair to the points in that leaf
+        counts = self.node_end[leaf_node] - self.node_start[leaf_node]
+        offsets = np.repeat(np.cumsum(counts) - counts, counts)
+        positions = np.arange(counts.sum()) - offsets + np.repeat(self.node_start[leaf_node], counts)
+        pair_q = np.repeat(leaf_q, counts)
+        pair_p = self.perm[positions]
+        dist = np.hypot(*(self.points[pair_p] - queries[pair_q]).T)
+        within = dist <= radii[pair_q]
+        return pair_q[within], pair_p[within], dist[within]
+
+    def query_nearest(self, queries: np.ndarray) -> tuple:
+        """(point index, distance) of the nearest point to every query"""
+        queries = np.asarray(queries, dtype=np.float64).reshape(-1, 2)
+        if not len(self.points) or not len(queries):
+            return np.zeros(len(queries), dtype=np.int64), np.full(len(queries), np.inf)
+
+        # Descend towards the closer child to get an upper bound from one leaf
+        node = np.zeros(len(queries), dtype=np.int64)
+        inner = self.node_left[node] >= 0
+        while inner.any():
+            q = np.nonzero(inner)[0]
+            left, right = self.node_left[node[q]], self.node_right[node[q]]
+            go_left = self._box_distance(queries[q], left) <= self._box_distance(queries[q], right)
+            node[q] = np.where(go_left, left, right)
+            inner = self.node_left[node] >= 0
+        counts = self.node_end[node] - self.node_start[node]
+        offsets = np.repeat(np.cumsum(counts) - counts, counts)
+        positions = np.arange(counts.sum()) - offsets + np.repeat(self.node_start[node], counts)
+        pair_q = np.repeat(np.arange(len(queries)), counts)
+        dist = np.hypot(*(self.points[self.perm[positions]] - queries[pair_q]).T)
+        bound = np.full(len(queries), np.inf)
+        np.minimum.at(bound, pair_q, dist)
+
+        # The true nearest point lies within that bound
+        q, p, dist = self.query_radius(queries, bound)
+        order = np.lexsort((p, dist, q))
+        q, p, dist = q[order], p[order], dist[order]
+        first = np.r_[True, q[1:] != q[:-1]]
+        nearest = np.zeros(len(queries), dtype=np.int64)
+        best = np.full(len(queries), np.inf)
+        nearest[q[first]] = p[first]
+        best[q[first]] = dist[first]
+        return nearest, best
+
+
+class PointIndex:
+    """KD-tree over lat/lon points with haversine-exact radius queries"""
+
+    # Equirectangular distances can differ slightly from haversine, so the
+    # tree is searched with a small margin and candidates are re-checked
+    SEARCH_MARGIN = 1.02
+
+    def __init__(self, lats, lons, ref_lat: float = None):
+        self.lats = np.asarray(lats, dtype=np.float64)
+        self.lons = np.asarray(lons, dtype=np.float64)
+        if ref_lat is None:
+            ref_lat = float(self.lats.mean()) if len(self.lats) else 0.0
+        self.projection = LocalProjection(ref_lat)
+        self.tree = KDTree(self.projection.project(self.lats, self.lons))
+
+    def __len__(self) -> int:
+        return len(self.lats)
+
+    def query_radius(self, lats, lons, radius) -> tuple:
+        """(query index, point index, haversine distance) for every pair within radius (scalar or per query)"""
+        lats = np.atleast_1d(np.asarray(lats, dtype=np.float64))
+        lons = np.atleast_1d(np.asarray(lons, dtype=np.float64))
+        radii = np.broadcast_to(np.asarray(radius, dtype=np.float64), lats.shape)
+        queries = self.projection.project(lats, lons)
+        q, p, _ = self.tree.query_radius(queries, radii * self.SEARCH_MARGIN)
+        dist = haversine_pairs(lats[q], lons[q], self.lats[p], self.lons[p])
+        within = dist <= radii[q]
+        return q[within], p[within], dist[within]
+
+    def query_nearest(self, lats, lons) -> tuple:
+        """(point index, haversine distance) of the nearest point to every query"""
+        lats = np.atleast_1d(np.asarray(lats, dtype=np.float64))
+        lons = np.atleast_1d(np.asarray(lons, dtype=np.float64))
+        idx, _ = self.tree.query_nearest(self.projection.project(lats, lons))
+        if not len(self.lats):
+            return idx, np.full(len(lats), np.inf)
+        return idx, haversine_pairs(lats, lons, self.lats[idx], self.lons[idx])
+
+    def query_radius_top(self, lats, lons, radius: float, k: int, keep: np.ndarray = None) -> tuple:
+        """Like query_radius but only the k nearest points per query, ordered by distance
+
+        keep: optional boolean mask over the points; points where it is False are skipped.
+        """
+        q, p, dist = self.query_radius(lats, lons, radius)
+        if keep is not None:
+            kept = keep[p]
+            q, p, dist = q[kept], p[kept], dist[kept]
+        order = np.lexsort((dist, q))
+        q, p, dist = q[order], p[order], dist[order]
+        if not len(q):
+            return q, p, dist
+        group_start = np.r_[0, np.nonzero(np.diff(q))[0] + 1]
+        rank = np.arange(len(q)) - np.repeat(group_start, np.diff(np.r_[group_start, len(q)]))
+        keep = rank < k
+        return q[keep], p[keep], dist[keep]
@@ -0,0 +1,255 @@
+"""
+Observed edge speeds from live GPS positions
+Consecutive positions of a vehicle are snapped to graph edges; pairs on the same
+road or on adjacent edges give an along-road distance and so a speed. Speeds are
+aggregated per (edge, 15-minute bucket) with exponential decay and keyed by
+(u, v) node ids, so any graph holding the edge reads them. Positions reach
+whichever route worker owns their tile, so by default the store is a SQLite
+file (WAL mode) shared by every worker on the host; with
+OBSERVED_SPEED_STORE_PATH set to an empty string it is in-process arrays that
+only hold rows for observed edges.
+"""
+
+import math
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+SPEED_BUCKETS = 96  # 15-minute buckets over a day
+OBSERVED_SPEED_HALF_LIFE_HOURS = float(os.getenv('OBSERVED_SPEED_HALF_LIFE_HOURS', '168'))
+OBSERVED_SPEED_MIN_WEIGHT = float(os.getenv('OBSERVED_SPEED_MIN_WEIGHT', '3'))  # decayed observations needed
+OBSERVED_SPEED_REFRESH_SECONDS = float(os.getenv('OBSERVED_SPEED_REFRESH_SECONDS', '60'))
+OBSERVED_SPEED_STORE_PATH = os.getenv(
+    'OBSERVED_SPEED_STORE_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'observed_speeds.sqlite')
+)
+MATCH_MAX_SNAP_M = 30.0
+MATCH_MIN_SECONDS = 1.0
+MATCH_MAX_SECONDS = 120.0
+MATCH_MIN_DISTANCE_M = 5.0
+SPEED_RANGE_KMH = (1.0, 120.0)
+
+
+def speed_bucket(when) -> int:
+    return (when.hour * 60 + when.minute) // (1440 // SPEED_BUCKETS)
+
+
+class ObservedSpeedStore:
+    """In-process store: decayed speed sums and weights per (observed edge, bucket)"""
+
+    backend = 'memory'
+
+    def __init__(self, half_life_hours: float = OBSERVED_SPEED_HALF_LIFE_HOURS):
+        self.tau = half_life_hours * 3600 / math.log(2)
+        self.row_of = {}  # (u, v) -> row
+        self.edges = []
+        self.weight = np.zeros((0, SPEED_BUCKETS), dtype=np.float32)
+        self.speed_sum = np.zeros((0, SPEED_BUCKETS), dtype=np.float32)
+        self.updated = np.zeros((0, SPEED_BUCKETS), dtype=np.float64)  # epoch seconds
+        self.observations = 0
+        self.lock = threading.Lock()
+
+    def _row(self, edge: tuple) -> int:
+        row = self.row_of.get(edge)
+        if row is None:
+            row = len(self.row_of)
+            if row == len(self.weight):
+                grow = max(64, len(self.weight))
+                self.weight = np.vstack([self.weight, np.zeros((grow, SPEED_BUCKETS), dtype=np.float32)])
+                self.speed_sum = np.vstack([self.speed_sum, np.zeros((grow, SPEED_BUCKETS), dtype=np.float32)])
+                self.updated = np.vstack([self.updated, np.zeros((grow, SPEED_BUCKETS))])
+            self.row_of[edge] = row
+            self.edges.append(edge)
+        return row
+
+    def add(self, edges: list, speeds_kmh, timestamps: list):
+        """Record observations for (u, v) edges; timestamps are datetimes"""
+        with self.lock:
+            for edge, speed, when in zip(edges, speeds_kmh, timestamps):
+                row = self._row(edge)
+                bucket = speed_bucket(when)
+                t = when.timestamp()
+                decay = math.exp(-max(t - self.updated[row, bucket], 0) / self.tau)
+                self.weight[row, bucket] = self.weight[row, bucket] * decay + 1
+                self.speed_sum[row, bucket] = self.speed_sum[row, bucket] * decay + speed
+                self.updated[row, bucket] = max(t, self.updated[row, bucket])
+                self.observations += 1
+
+    def has_observations(self) -> bool:
+        return self.observations > 0
+
+    def speeds_for(self, edge_index: dict, num_edges: int, bucket: int, now: float = None,
+                   min_weight: float = OBSERVED_SPEED_MIN_WEIGHT) -> np.ndarray:
+        """Mean observed speed in this bucket for a graph's edges (edge_index: (u, v) -> id)
+
+        NaN where the decayed evidence is below min_weight or the edge was never seen.
+        """
+        now = time.time() if now is None else now
+        with self.lock:
+            n = len(self.row_of)
+            return observed_means(self.edges[:n], self.weight[:n, bucket].astype(np.float64),
+                                  self.speed_sum[:n, bucket], self.updated[:n, bucket],
+                                  edge_index, num_edges, now, self.tau, min_weight)
+
+    def nbytes(self) -> int:
+        return self.weight.nbytes + self.speed_sum.nbytes + self.updated.nbytes
+
+    def stats(self) -> dict:
+        return {'backend': self.backend, 'observed_edges': len(self.row_of),
+                'observations': self.observations, 'bytes': self.nbytes()}
+
+
+def observed_means(edges: list, weight: np.ndarray, speed_sum: np.ndarray, updated: np.ndarray,
+                   edge_index: dict, num_edges: int, now: float, tau: float, min_weight: float) -> np.ndarray:
+    """Per-graph-edge mean speed from one bucket's rows; NaN without enough decayed evidence"""
+    out = np.full(num_edges, np.nan)
+    if not len(edges):
+        return out
+    decayed = weight * np.exp(-np.maximum(now - updated, 0) / tau)
+    rows = np.nonzero(decayed >= min_weight)[0]
+    means = np.asarray(speed_sum, dtype=np.float64)[rows] / weight[rows]
+    for row, speed in zip(rows.tolist(), means.tolist()):
+        edge_id = edge_index.get(edges[row])
+        if edge_id is not None:
+            out[edge_id] = speed
+    return out
+
+
+class SQLiteSpeedStore(ObservedSpeedStore):
+    """Same interface over a SQLite file in WAL mode, shared by every process on the host
+
+    'observations' in stats() counts this process's; the rows are shared.
+    """
+
+    backend = 'sqlite'
+
+    def __init__(self, path: str, half_life_hours: float = OBSERVED_SPEED_HALF_LIFE_HOURS):
+        super().__init__(half_life_hours)
+        self.path = path
+        self.local = threading.local()
+        with self._connection() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS edge_speeds (
+                    u INTEGER NOT NULL,
+                    v INTEGER NOT NULL,
+                    bucket INTEGER NOT NULL,
+                    weight REAL NOT NULL,
+                    speed_sum REAL NOT NULL,
+                    updated REAL NOT NULL,
+                    PRIMARY KEY (u, v, bucket)
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS edge_speeds_bucket ON edge_speeds (bucket)")
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self.local.conn = conn
+        return conn
+
+    def add(self, edges: list, speeds_kmh, timestamps: list):
+        conn = self._connection()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            for (u, v), speed, when in zip(edges, speeds_kmh, timestamps):
+                bucket = speed_bucket(when)
+                t = when.timestamp()
+                row = conn.execute(
+                    "SELECT weight, speed_sum, updated FROM edge_speeds WHERE u = ? AND v = ? AND bucket = ?",
+                    (int(u), int(v), bucket)
+                ).fetchone()
+                weight, speed_sum, updated = row if row is not None else (0.0, 0.0, 0.0)
+                decay = math.exp(-max(t - updated, 0) / self.tau)
+                conn.execute(
+                    "INSERT OR REPLACE INTO edge_speeds VALUES (?, ?, ?, ?, ?, ?)",
+                    (int(u), int(v), bucket, weight * decay + 1, speed_sum * decay + float(speed), max(t, updated))
+                )
+        self.observations += len(edges)
+
+    def has_observations(self) -> bool:
+        return self._connection().execute("SELECT 1 FROM edge_speeds LIMIT 1").fetchone() is not None
+
+    def speeds_for(self, edge_index: dict, num_edges: int, bucket: int, now: float = None,
+                   min_weight: float = OBSERVED_SPEED_MIN_WEIGHT) -> np.ndarray:
+        now = time.time() if now is None else now
+        rows = self._connection().execute(
+            "SELECT u, v, weight, speed_sum, updated FROM edge_speeds WHERE bucket = ?", (bucket,)
+        ).fetchall()
+        values = np.array([row[2:] for row in rows], dtype=np.float64).reshape(-1, 3)
+        return observed_means([(row[0], row[1]) for row in rows], values[:, 0], values[:, 1], values[:, 2],
+                              edge_index, num_edges, now, self.tau, min_weight)
+
+    def nbytes(self) -> int:
+        (pages,) = self._connection().execute("PRAGMA page_count").fetchone()
+        (page_size,) = self._connection().execute("PRAGMA page_size").fetchone()
+        return pages * page_size
+
+    def stats(self) -> dict:
+        (edges,) = self._connection().execute("SELECT COUNT(DISTINCT u || ',' || v) FROM edge_speeds").fetchone()
+        return {'backend': self.backend, 'path': self.path, 'observed_edges': edges,
+                'observations': self.observations, 'bytes': self.nbytes()}
+
+
+def make_speed_store(path: str = OBSERVED_SPEED_STORE_PATH) -> ObservedSpeedStore:
+    if path:
+        print(f"🛰️ Observed speeds shared through {path}")
+        return SQLiteSpeedStore(path)
+    return ObservedSpeedStore()
+
+
+def match_position_pairs(snapper, lats, lons, timestamps: list) -> tuple:
+    """(graph edge ids, speeds km/h, timestamps) from consecutive positions of one vehicle
+
+    Both points of a pair must snap within MATCH_MAX_SNAP_M to the same road
+    (either direction of a two-way street) or to edges joined head to tail;
+    longer gaps are skipped rather than guessed.
+    """
+    arrays = snapper.arrays
+    snapped = snapper.nearest_edges(lats, lons)
+    edges, fractions, distances = snapped['edge'].tolist(), snapped['fraction'].tolist(), snapped['distance_m'].tolist()
+    u_idx, v_idx = arrays.u_idx, arrays.v_idx
+    node_ids = arrays.node_ids
+
+    def orientations(e, f):
+        """(edge, fraction) for the snapped edge and its reverse twin, if there is one"""
+        options = [(e, f)]
+        twin = arrays.edge_index.get((node_ids[v_idx[e]], node_ids[u_idx[e]]))
+        if twin is not None:
+            options.append((twin, 1 - f))
+        return options
+
+    out_edges, out_speeds, out_times = [], [], []
+    low, high = SPEED_RANGE_KMH
+    for i in range(len(edges) - 1):
+        dt = (timestamps[i + 1] - timestamps[i]).total_seconds()
+        if not MATCH_MIN_SECONDS <= dt <= MATCH_MAX_SECONDS:
+            continue
+        if max(distances[i], distances[i + 1]) > MATCH_MAX_SNAP_M:
+            continue
+        travelled = None
+        for a, fa in orientations(edges[i], fractions[i]):
+            for b, fb in orientations(edges[i + 1], fractions[i + 1]):
+                if a == b and fb >= fa:
+                    travelled, used = (fb - fa) * arrays.length[a], [a]
+                elif v_idx[a] == u_idx[b] and a != b:
+                    travelled, used = (1 - fa) * arrays.length[a] + fb * arrays.length[b], [a, b]
+                else:
+                    continue
+                break
+            if travelled is not None:
+                break
+        if travelled is None or travelled < MATCH_MIN_DISTANCE_M:
+            continue
+        speed = travelled / dt * 3.6
+        if not low <= speed <= high:
+            continue
+        for edge in used:
+            out_edges.append(edge)
+            out_speeds.append(speed)
+            out_times.append(timestamps[i + 1])
+    return out_edges, out_speeds, out_times
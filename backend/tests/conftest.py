@@ -0,0 +1,70 @@
+"""
+Shared fixtures for the backend tests
+Small synthetic road grids, so the tests need neither the graph store nor a database.
+Run from backend/ with: python -m pytest tests
+"""
+
+import math
+import os
+import random
+import sys
+
+import networkx as nx
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Keep observed speeds in-process rather than in the shared file next to the backend
+os.environ.setdefault('OBSERVED_SPEED_STORE_PATH', '')
+
+from edge_weighting import GraphArrays  # noqa: E402
+
+ROAD_TYPES = ('primary', 'secondary', 'tertiary', 'residential', 'trunk')
+
+
+def grid_graph(size: int = 12, seed: int = 3) -> nx.DiGraph:
+    """size x size grid near central Bangalore; a few one-way streets, lengths >= straight line"""
+    rnd = random.Random(seed)
+    G = nx.DiGraph()
+    G.graph['crs'] = 'epsg:4326'
+    for i in range(size):
+        for j in range(size):
+            G.add_node(i * size + j,
+                       x=77.58 + j * 0.002 + rnd.uniform(-0.0003, 0.0003),
+                       y=12.96 + i * 0.002 + rnd.uniform(-0.0003, 0.0003))
+
+    def straight_line(a, b):
+        na, nb = G.nodes[a], G.nodes[b]
+        dy = math.radians(nb['y'] - na['y'])
+        dx = math.radians(nb['x'] - na['x']) * math.cos(math.radians(na['y']))
+        return 6371009 * math.hypot(dx, dy)
+
+    for i in range(size):
+        for j in range(size):
+            a = i * size + j
+            for b in ([a + 1] if j < size - 1 else []) + ([a + size] if i < size - 1 else []):
+                for u, v in ((a, b), (b, a)):
+                    if rnd.random() < 0.9:
+                        length = straight_line(u, v) * rnd.uniform(1.0, 1.4)
+                        G.add_edge(u, v, length=length, travel_time=length / rnd.uniform(4, 15),
+                                   cost=length * rnd.uniform(0.5, 2.0), highway=rnd.choice(ROAD_TYPES))
+    return G
+
+
+@pytest.fixture(scope='module')
+def graph() -> nx.DiGraph:
+    return grid_graph()
+
+
+@pytest.fixture(scope='module')
+def arrays(graph) -> GraphArrays:
+    return GraphArrays(graph)
+
+
+def edge_column(arrays: GraphArrays, attribute: str):
+    """One edge attribute as an array in GraphArrays edge order"""
+    return np.array([d[attribute] for d in arrays.edge_data], dtype=np.float64)
+
+
+def path_cost(G: nx.DiGraph, path: list, attribute: str) -> float:
+    return sum(G[u][v][attribute] for u, v in zip(path[:-1], path[1:]))
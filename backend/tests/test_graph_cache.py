@@ -0,0 +1,65 @@
+"""
+Region graph cache: one load per region, waits counted apart from hits, byte budget enforced
+"""
+
+import threading
+import time
+
+from conftest import grid_graph
+from graph_cache import RegionGraphCache, estimate_graph_bytes
+
+
+class FakeRegion:
+    def __init__(self, name: str, loads: list):
+        self.name = name
+        self.loads = loads
+
+    def load_graph(self):
+        self.loads.append(self.name)
+        time.sleep(0.05)
+        return grid_graph(size=4)
+
+
+class FakeStore:
+    def __init__(self, names):
+        self.loads = []
+        self.regions = {name: FakeRegion(name, self.loads) for name in names}
+
+    def find_region(self, bbox):
+        return self.regions.get(bbox[0])
+
+
+def test_concurrent_misses_share_one_load():
+    store = FakeStore(['a'])
+    cache = RegionGraphCache(store, lambda G: object())
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get(('a', 0, 0, 0)))) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert store.loads == ['a']
+    assert len({id(r) for r in results}) == 1
+    stats = cache.stats()
+    assert (stats['misses'], stats['hits'] + stats['waits']) == (1, 5)
+    assert cache.get(('a', 0, 0, 0)) is results[0]
+    assert cache.stats()['hits'] == stats['hits'] + 1
+
+
+def test_budget_evicts_least_recently_used():
+    size = estimate_graph_bytes(grid_graph(size=4))
+    store = FakeStore(['a', 'b', 'c'])
+    cache = RegionGraphCache(store, lambda G: object(), max_bytes=2 * size)
+    for name in ('a', 'b', 'a', 'c'):
+        cache.get((name, 0, 0, 0))
+    assert list(cache.entries) == ['a', 'c']
+    assert cache.total_bytes <= cache.max_bytes
+
+
+def test_region_over_budget_is_served_uncached():
+    store = FakeStore(['a'])
+    cache = RegionGraphCache(store, lambda G: object(), max_bytes=1)
+    assert cache.get(('a', 0, 0, 0)) is not None
+    assert len(cache) == 0 and cache.total_bytes == 0
+    assert cache.get(('b', 0, 0, 0)) is None
@@ -0,0 +1,48 @@
+"""
+Incident lookups through the feed snapshot's shared index match a per-bbox index
+"""
+
+import random
+from datetime import datetime, timedelta
+
+import numpy as np
+
+import api
+from incident_feed import IncidentFeed, IncidentSnapshot
+
+
+def snapshot(count: int = 400, seed: int = 2) -> IncidentSnapshot:
+    rnd = random.Random(seed)
+    incidents = []
+    for i in range(count):
+        ty = rnd.choice(list(api.INCIDENT_TYPE_MAPPING))
+        incidents.append({'id': i, 'ty': ty, 'sd': datetime.now() - timedelta(minutes=i),
+                          'lat': rnd.uniform(12.9, 13.1), 'lon': rnd.uniform(77.5, 77.7),
+                          'severity': api.INCIDENT_TYPE_MAPPING[ty]})
+    return IncidentSnapshot(incidents, 1)
+
+
+def test_snapshot_index_matches_bbox_index():
+    feed = IncidentFeed(fetcher=None)
+    feed._snapshot = snapshot()
+    bbox = (12.95, 77.55, 13.02, 77.64)
+    shared = api.TrafficDataSimulator(None, feed)
+    shared.load_incidents(bbox)
+    rebuilt = api.TrafficDataSimulator(None)
+    rebuilt.incidents = feed.snapshot.in_bbox(bbox)
+    rebuilt._build_incident_index()
+
+    assert shared.incident_index is feed.snapshot.index
+    assert [inc['id'] for inc in shared.incidents] == [inc['id'] for inc in rebuilt.incidents]
+
+    rng = np.random.default_rng(3)
+    lats, lons = rng.uniform(12.94, 13.03, 500), rng.uniform(77.54, 77.65, 500)
+    for top in (1, 3):
+        got = shared.nearby_incidents_batch(lats, lons, radius=800, top=top)
+        expected = rebuilt.nearby_incidents_batch(lats, lons, radius=800, top=top)
+        for a, b in zip(got, expected):
+            np.testing.assert_array_equal(a, b)
+
+    near = shared.find_nearby_incidents(12.98, 77.6, radius=1500)
+    assert near == rebuilt.find_nearby_incidents(12.98, 77.6, radius=1500)
+    assert all(bbox[0] <= inc['lat'] <= bbox[2] and bbox[1] <= inc['lon'] <= bbox[3] for inc in near)
@@ -0,0 +1,35 @@
+"""
+Isochrone cache hits are answered before the graph is re-weighted
+"""
+
+from datetime import datetime
+
+import api
+from conftest import grid_graph
+from incident_feed import IncidentFeed, IncidentSnapshot
+
+
+def test_cached_isochrone_skips_weighting(monkeypatch):
+    feed = IncidentFeed(fetcher=None)
+    feed._snapshot = IncidentSnapshot([], 1)
+    optimizer = api.AdaptiveRouteOptimizer(grid_graph(), api.DB_CONFIG, feed)
+    bbox = (77.58, 12.96, 77.60, 12.98)
+    monkeypatch.setattr(api, 'incident_feed', feed)
+    monkeypatch.setattr(api, 'isochrone_bbox', lambda request: bbox)
+    monkeypatch.setattr(api, 'get_optimizer_for_bbox', lambda b: optimizer)
+    monkeypatch.setattr(api, 'optimizer_key_for_bbox', lambda b: b)
+    monkeypatch.setattr(api, 'isochrone_cache', api.TileCache(8))
+
+    request = api.IsochroneRequest(lat=12.97, lon=77.59, budgets_minutes=[2, 5])
+    departure = datetime(2026, 3, 2, 9, 0)
+    first = api.compute_isochrone(request, departure)
+    assert first['cached'] is False
+    assert optimizer.weights is not None
+
+    def weigh(*args):
+        raise AssertionError("weighted_optimizer called on a cache hit")
+
+    monkeypatch.setattr(api, 'weighted_optimizer', weigh)
+    second = api.compute_isochrone(request, departure)
+    assert second['cached'] is True
+    assert second['features'] == first['features']
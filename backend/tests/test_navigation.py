@@ -0,0 +1,37 @@
+"""
+start-navigation timing on a freshly loaded region graph
+"""
+
+import networkx as nx
+import pytest
+
+import api
+from conftest import grid_graph
+
+
+@pytest.fixture
+def fresh_optimizer(monkeypatch):
+    """An optimizer as create_optimizer leaves it: snapper built, weights not yet applied"""
+    optimizer = api.AdaptiveRouteOptimizer(grid_graph())
+    optimizer.get_snapper()
+    monkeypatch.setattr(api, 'get_optimizer', lambda lat, lon: optimizer)
+    monkeypatch.setattr(api, 'get_incidents_using_postgis', lambda coords: [])
+    return optimizer
+
+
+def test_navigation_uses_weighted_speeds(fresh_optimizer):
+    G = fresh_optimizer.G
+    route = nx.shortest_path(G, 0, max(G.nodes), weight='length')
+    src, dst = G.nodes[route[0]], G.nodes[route[-1]]
+    session = api.NavigationSession(route_id=0, selected_route=route, src_lat=src['y'], src_lon=src['x'],
+                                    dst_lat=dst['y'], dst_lon=dst['x'])
+    assert fresh_optimizer.weights is None
+
+    nav = api.compute_navigation(session)
+
+    assert fresh_optimizer.weights is not None
+    arrays = fresh_optimizer.get_weighter().arrays
+    expected = [fresh_optimizer.weights['adjusted_speed'][arrays.edge_index[(u, v)]]
+                for u, v in zip(route[:-1], route[1:])]
+    assert nav['geometry']['segment_speeds'] == pytest.approx(expected)
+    assert any(speed != 25 for speed in nav['geometry']['segment_speeds'])
@@ -0,0 +1,62 @@
+"""
+Pareto route search: the returned front must be valid and mutually non-dominated
+"""
+
+import random
+
+import networkx as nx
+import numpy as np
+import pytest
+
+from conftest import edge_column, path_cost
+from route_search import PARETO_MAX_DETOUR, RouteSearch
+
+OBJECTIVES = ('travel_time', 'cost', 'length')
+
+
+def dominates(a, b) -> bool:
+    return all(x <= y for x, y in zip(a, b)) and any(x < y for x, y in zip(a, b))
+
+
+@pytest.fixture(scope='module')
+def costs(arrays):
+    return np.stack([edge_column(arrays, name) for name in OBJECTIVES], axis=1)
+
+
+@pytest.mark.parametrize('seed', range(8))
+def test_front_is_non_dominated(graph, arrays, costs, seed):
+    s, t = random.Random(seed).sample(sorted(graph.nodes), 2)
+    front = RouteSearch(graph, arrays).pareto(s, t, costs)
+    assert front
+
+    optima = [nx.dijkstra_path_length(graph, s, t, weight=name) for name in OBJECTIVES]
+    for path, totals in front:
+        assert path[0] == s and path[-1] == t
+        assert len(set(path)) == len(path)
+        for name, total in zip(OBJECTIVES, totals):
+            assert total == pytest.approx(path_cost(graph, path, name), rel=1e-9)
+        # Single-objective optima seed the front as they are; searched routes respect the detour limit
+        if not any(total == pytest.approx(optimum, rel=1e-9) for total, optimum in zip(totals, optima)):
+            assert all(total <= optimum * PARETO_MAX_DETOUR * (1 + 1e-9) for total, optimum in zip(totals, optima))
+
+    totals = [totals for _, totals in front]
+    assert len(set(totals)) == len(totals)
+    for a in totals:
+        assert not any(dominates(b, a) for b in totals)
+
+    # Ordered by the first objective, starting from its optimum
+    assert [a[0] for a in totals] == sorted(a[0] for a in totals)
+    assert totals[0][0] == pytest.approx(optima[0], rel=1e-9)
+
+
+def test_max_routes(graph, arrays, costs):
+    front = RouteSearch(graph, arrays).pareto(0, max(graph.nodes), costs, max_routes=2)
+    assert 1 <= len(front) <= 2
+
+
+def test_unreachable_target(graph, arrays, costs):
+    G = graph.copy()
+    G.add_node(-1, x=77.6, y=12.99)
+    search = RouteSearch(G, type(arrays)(G))
+    with pytest.raises(nx.NetworkXNoPath):
+        search.pareto(0, -1, costs)
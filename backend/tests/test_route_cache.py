@@ -0,0 +1,32 @@
+"""
+Route result cache: edge-level invalidation, TTL and size bound
+"""
+
+from route_cache import RouteCache
+
+
+def test_invalidate_edges_drops_only_affected_entries():
+    cache = RouteCache()
+    cache.put((0, 1, 4), [[1, 2, 3, 4]], 'a')
+    cache.put((0, 5, 7), [[5, 6, 7]], 'b')
+    cache.put((1, 1, 4), [[1, 2, 3, 4]], 'other graph')
+
+    assert cache.invalidate_edges(0, [(2, 3)]) == 1
+    assert cache.get((0, 1, 4)) is None
+    assert cache.get((0, 5, 7)) == 'b'
+    assert cache.get((1, 1, 4)) == 'other graph'
+    assert cache.stats()['indexed_edges'] == 5
+
+
+def test_ttl_and_size_bound():
+    cache = RouteCache(max_entries=2, ttl=0)
+    cache.put((0, 1, 2), [[1, 2]], 'a')
+    assert cache.get((0, 1, 2)) is None
+    assert cache.stats()['expired'] == 1
+
+    cache = RouteCache(max_entries=2)
+    for i in range(3):
+        cache.put((0, i, i + 1), [[i, i + 1]], i)
+    assert cache.get((0, 0, 1)) is None
+    assert cache.get((0, 2, 3)) == 2
+    assert cache.stats()['evicted'] == 1
@@ -0,0 +1,54 @@
+"""
+Route search backends against networkx Dijkstra
+"""
+
+import random
+
+import networkx as nx
+import pytest
+
+from cch import CCH
+from conftest import edge_column, path_cost
+from route_search import Landmarks, RouteSearch
+
+
+def od_pairs(G: nx.DiGraph, count: int = 40, seed: int = 1) -> list:
+    rnd = random.Random(seed)
+    nodes = sorted(G.nodes)
+    return [tuple(rnd.sample(nodes, 2)) for _ in range(count)]
+
+
+@pytest.mark.parametrize('weight', ['length', 'travel_time'])
+@pytest.mark.parametrize('backend', ['dijkstra', 'astar', 'bidirectional', 'alt'])
+def test_search_matches_dijkstra(graph, arrays, weight, backend):
+    search = RouteSearch(graph, arrays)
+    # Straight-line metres bound length; travel_time gets landmarks only
+    rate = 1.0 if weight == 'length' and backend != 'dijkstra' else 0.0
+    landmarks = Landmarks(arrays, edge_column(arrays, weight)) if backend == 'alt' else None
+    for s, t in od_pairs(graph):
+        expected = nx.dijkstra_path_length(graph, s, t, weight=weight)
+        if backend == 'bidirectional' or backend == 'alt':
+            path = search.bidirectional_astar(s, t, weight, rate=rate, landmarks=landmarks)
+        else:
+            path = search.astar(s, t, weight, rate=rate)
+        assert path[0] == s and path[-1] == t
+        assert path_cost(graph, path, weight) == pytest.approx(expected, rel=1e-9)
+
+
+@pytest.mark.parametrize('weight', ['length', 'travel_time'])
+def test_cch_matches_dijkstra(graph, arrays, weight):
+    metric = CCH(arrays).customize(edge_column(arrays, weight))
+    for s, t in od_pairs(graph):
+        expected = nx.dijkstra_path_length(graph, s, t, weight=weight)
+        distance, path = metric.query(s, t)
+        assert distance == pytest.approx(expected, rel=1e-9)
+        assert path[0] == s and path[-1] == t
+        assert path_cost(graph, path, weight) == pytest.approx(expected, rel=1e-9)
+
+
+def test_unreachable_target(graph, arrays):
+    G = graph.copy()
+    G.add_node(-1, x=77.6, y=12.99)
+    search = RouteSearch(G, type(arrays)(G))
+    with pytest.raises(nx.NetworkXNoPath):
+        search.bidirectional_astar(0, -1, 'length', rate=1.0)
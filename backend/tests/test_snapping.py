@@ -0,0 +1,73 @@
+"""
+GraphSnapper against osmnx nearest_nodes / nearest_edges
+osmnx measures plain Euclidean distance in the graph's coordinates, so the
+reference graph is built in the snapper's own local-metre projection.
+"""
+
+import networkx as nx
+import numpy as np
+import osmnx as ox
+import pytest
+
+from snapping import GraphSnapper
+
+
+@pytest.fixture(scope='module')
+def snapper(arrays):
+    return GraphSnapper(arrays)
+
+
+@pytest.fixture(scope='module')
+def projected(graph, snapper):
+    """The test graph as an osmnx MultiDiGraph in the snapper's projection"""
+    G = nx.MultiDiGraph(crs='epsg:32643')
+    xy = snapper.projection.project([graph.nodes[n]['y'] for n in graph.nodes],
+                                    [graph.nodes[n]['x'] for n in graph.nodes])
+    for n, (x, y) in zip(graph.nodes, xy.tolist()):
+        G.add_node(n, x=x, y=y)
+    for u, v, data in graph.edges(data=True):
+        G.add_edge(u, v, **data)
+    return G
+
+
+@pytest.fixture(scope='module')
+def points(graph):
+    rng = np.random.default_rng(4)
+    ys = [d['y'] for _, d in graph.nodes(data=True)]
+    xs = [d['x'] for _, d in graph.nodes(data=True)]
+    # Some points fall outside the grid
+    return rng.uniform(min(ys) - 0.002, max(ys) + 0.002, 300), rng.uniform(min(xs) - 0.002, max(xs) + 0.002, 300)
+
+
+def test_nearest_nodes_match_osmnx(snapper, projected, points):
+    lats, lons = points
+    xy = snapper.projection.project(lats, lons)
+    expected, expected_dist = ox.distance.nearest_nodes(projected, xy[:, 0], xy[:, 1], return_dist=True)
+    idx, dist = snapper.nearest_node_indices(lats, lons)
+    np.testing.assert_allclose(dist, expected_dist, atol=1e-6)
+    assert snapper.nearest_nodes(lats, lons) == list(expected)
+
+
+def test_nearest_edges_match_osmnx(snapper, projected, points):
+    lats, lons = points
+    xy = snapper.projection.project(lats, lons)
+    expected, expected_dist = ox.distance.nearest_edges(projected, xy[:, 0], xy[:, 1], return_dist=True)
+    snapped = snapper.nearest_edges(lats, lons)
+    np.testing.assert_allclose(snapped['distance_m'], expected_dist, atol=1e-6)
+
+    # Ties (a point closest to a node or a two-way street) may pick either edge;
+    # any edge at the same distance is a correct answer
+    edge_index = snapper.arrays.edge_index
+    osmnx_edges = np.array([edge_index[(u, v)] for u, v, _ in expected])
+    osmnx_dist, _ = snapper._segment_distance(xy, osmnx_edges)
+    np.testing.assert_allclose(snapped['distance_m'], osmnx_dist, atol=1e-6)
+
+
+def test_snapped_position_lies_on_edge(snapper, points):
+    lats, lons = points
+    snapped = snapper.nearest_edges(lats, lons)
+    arrays = snapper.arrays
+    u, v, t = arrays.u_idx[snapped['edge']], arrays.v_idx[snapped['edge']], snapped['fraction']
+    np.testing.assert_allclose(snapped['lat'], arrays.node_y[u] + (arrays.node_y[v] - arrays.node_y[u]) * t)
+    np.testing.assert_allclose(snapped['lon'], arrays.node_x[u] + (arrays.node_x[v] - arrays.node_x[u]) * t)
+    np.testing.assert_allclose(snapped['offset_m'], t * arrays.length[snapped['edge']])
@@ -0,0 +1,75 @@
+"""
+KD-tree queries against brute force
+"""
+
+import numpy as np
+import pytest
+
+from spatial_index import KDTree, PointIndex, haversine_pairs
+
+
+@pytest.fixture(scope='module')
+def points():
+    rng = np.random.default_rng(7)
+    # Clustered and uniform points, including exact duplicates
+    uniform = rng.uniform(0, 5000, size=(600, 2))
+    clustered = rng.normal(2500, 40, size=(200, 2))
+    return np.vstack([uniform, clustered, uniform[:20]])
+
+
+@pytest.fixture(scope='module')
+def queries():
+    rng = np.random.default_rng(8)
+    return rng.uniform(-200, 5200, size=(150, 2))
+
+
+def brute_distances(points, queries):
+    return np.hypot(*(queries[:, None, :] - points[None, :, :]).transpose(2, 0, 1))
+
+
+@pytest.mark.parametrize('leaf_size', [1, 4, 16])
+def test_query_radius_matches_brute_force(points, queries, leaf_size):
+    tree = KDTree(points, leaf_size=leaf_size)
+    radii = np.linspace(0, 600, len(queries))
+    q, p, dist = tree.query_radius(queries, radii)
+
+    expected = brute_distances(points, queries) <= radii[:, None]
+    assert sorted(zip(q.tolist(), p.tolist())) == sorted(zip(*np.nonzero(expected)))
+    np.testing.assert_allclose(dist, np.hypot(*(points[p] - queries[q]).T))
+
+
+@pytest.mark.parametrize('leaf_size', [1, 4, 16])
+def test_query_nearest_matches_brute_force(points, queries, leaf_size):
+    tree = KDTree(points, leaf_size=leaf_size)
+    idx, dist = tree.query_nearest(queries)
+
+    brute = brute_distances(points, queries)
+    np.testing.assert_allclose(dist, brute.min(axis=1))
+    np.testing.assert_allclose(brute[np.arange(len(queries)), idx], brute.min(axis=1))
+
+
+def test_empty_tree():
+    tree = KDTree(np.zeros((0, 2)))
+    q, p, dist = tree.query_radius(np.zeros((3, 2)), 100)
+    assert len(q) == len(p) == len(dist) == 0
+    idx, dist = tree.query_nearest(np.zeros((3, 2)))
+    assert np.isinf(dist).all()
+
+
+def test_point_index_uses_haversine_distances():
+    rng = np.random.default_rng(9)
+    lats, lons = rng.uniform(12.9, 13.05, 500), rng.uniform(77.5, 77.7, 500)
+    q_lats, q_lons = rng.uniform(12.9, 13.05, 60), rng.uniform(77.5, 77.7, 60)
+    index = PointIndex(lats, lons)
+
+    q, p, dist = index.query_radius(q_lats, q_lons, 800)
+    brute = haversine_pairs(q_lats[:, None], q_lons[:, None], lats[None, :], lons[None, :])
+    assert sorted(zip(q.tolist(), p.tolist())) == sorted(zip(*np.nonzero(brute <= 800)))
+
+    q, p, dist = index.query_radius_top(q_lats, q_lons, 800, k=3)
+    for qi in range(len(q_lats)):
+        within = np.sort(brute[qi][brute[qi] <= 800])[:3]
+        np.testing.assert_allclose(dist[q == qi], within)
+
+    idx, dist = index.query_nearest(q_lats, q_lons)
+    np.testing.assert_allclose(dist, brute.min(axis=1))
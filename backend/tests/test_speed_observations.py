@@ -0,0 +1,47 @@
+"""
+Observed-speed stores: the SQLite store is shared between instances and matches the in-process one
+"""
+
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from speed_observations import ObservedSpeedStore, SQLiteSpeedStore, speed_bucket
+
+
+def observations(count: int = 40):
+    start = datetime(2026, 3, 2, 8, 0)
+    edges = [(1, 2), (2, 3), (3, 4), (1, 2)] * (count // 4)
+    speeds = [20 + (i % 7) for i in range(count)]
+    times = [start + timedelta(seconds=30 * i) for i in range(count)]
+    return edges, speeds, times
+
+
+def test_sqlite_store_is_shared_and_matches_memory(tmp_path):
+    path = str(tmp_path / 'speeds.sqlite')
+    writer, reader = SQLiteSpeedStore(path), SQLiteSpeedStore(path)
+    memory = ObservedSpeedStore()
+    assert not reader.has_observations()
+
+    edges, speeds, times = observations()
+    writer.add(edges, speeds, times)
+    memory.add(edges, speeds, times)
+
+    assert reader.has_observations()
+    edge_index = {(1, 2): 0, (2, 3): 1, (3, 4): 2, (9, 9): 3}
+    now = times[-1].timestamp()
+    expected = memory.speeds_for(edge_index, 4, speed_bucket(times[0]), now)
+    shared = reader.speeds_for(edge_index, 4, speed_bucket(times[0]), now)
+    np.testing.assert_allclose(shared, expected, rtol=1e-5)
+    assert np.isnan(shared[3]) and not np.isnan(shared[:3]).any()
+    assert reader.stats()['observed_edges'] == 3
+
+
+def test_min_weight(tmp_path):
+    store = SQLiteSpeedStore(str(tmp_path / 'speeds.sqlite'))
+    when = datetime(2026, 3, 2, 8, 0)
+    store.add([(1, 2), (1, 2)], [30.0, 40.0], [when, when])
+    bucket = speed_bucket(when)
+    assert np.isnan(store.speeds_for({(1, 2): 0}, 1, bucket, when.timestamp(), min_weight=3)[0])
+    assert store.speeds_for({(1, 2): 0}, 1, bucket, when.timestamp(), min_weight=2)[0] == pytest.approx(35.0)
@@ -0,0 +1,57 @@
+"""
+Traffic tile segments follow the incident snapshot without narrowing the optimizer's incident set
+"""
+
+import math
+from datetime import datetime
+
+import pytest
+
+import api
+from conftest import grid_graph
+from incident_feed import IncidentFeed, IncidentSnapshot
+
+
+def lonlat_to_tile(lon: float, lat: float, z: int) -> tuple:
+    n = 2 ** z
+    y = (1 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2 * n
+    return int((lon + 180) / 360 * n), int(y)
+
+
+def incident(i: int, lat: float, lon: float) -> dict:
+    return {'id': i, 'ty': 4, 'sd': datetime.now(), 'lat': lat, 'lon': lon,
+            'severity': api.INCIDENT_TYPE_MAPPING[4]}
+
+
+@pytest.fixture
+def feed(monkeypatch):
+    feed = IncidentFeed(fetcher=None)
+    feed._snapshot = IncidentSnapshot([], 1)
+    monkeypatch.setattr(api, 'incident_feed', feed)
+    return feed
+
+
+@pytest.fixture
+def optimizer(monkeypatch, feed):
+    optimizer = api.AdaptiveRouteOptimizer(grid_graph(), api.DB_CONFIG, feed)
+    monkeypatch.setattr(api, 'get_optimizer', lambda lat, lon: optimizer)
+    return optimizer
+
+
+def test_tile_segments_follow_snapshot_version(optimizer, feed):
+    G = optimizer.G
+    u, v = next(iter(G.edges))
+    lat = (G.nodes[u]['y'] + G.nodes[v]['y']) / 2
+    lon = (G.nodes[u]['x'] + G.nodes[v]['x']) / 2
+    z = 16
+    x, y = lonlat_to_tile(lon, lat, z)
+
+    before = api.compute_tile_segments(z, x, y)
+    # A closure on the edge, and one elsewhere in the graph, outside this tile
+    far = G.nodes[max(G.nodes)]
+    feed._snapshot = IncidentSnapshot([incident(1, lat, lon), incident(2, far['y'], far['x'])], 2)
+    after = api.compute_tile_segments(z, x, y)
+
+    assert optimizer.traffic_sim.snapshot_version == 2
+    assert min(after['speed']) < min(before['speed'])
+    assert {inc['id'] for inc in optimizer.traffic_sim.incidents} == {1, 2}
@@ -0,0 +1,144 @@
+"""
+Mapbox Vector Tiles for live traffic
+Road segments (coloured by SPEED_RANGES bucket) come from the optimizer's current
+edge weights and are sent to PostGIS as arrays; incidents are read from the
+GiST-indexed geom_indexed column. ST_AsMVT encodes both layers in one query.
+"""
+
+import math
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+ROAD_TILE_MIN_ZOOM = int(os.getenv('ROAD_TILE_MIN_ZOOM', '13'))
+TILE_CACHE_SIZE = int(os.getenv('TILE_CACHE_SIZE', '2048'))
+MVT_EXTENT = 4096
+MVT_MEDIA_TYPE = 'application/vnd.mapbox-vector-tile'
+
+
+def tile_bbox(z: int, x: int, y: int) -> tuple:
+    """(west, south, east, north) of a Web Mercator tile"""
+    n = 2 ** z
+
+    def lat(row):
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * row / n))))
+
+    return x / n * 360 - 180, lat(y + 1), (x + 1) / n * 360 - 180, lat(y)
+
+
+def valid_tile(z: int, x: int, y: int) -> bool:
+    return 0 <= z <= 22 and 0 <= x < 2 ** z and 0 <= y < 2 ** z
+
+
+def speed_buckets(speed_ranges: dict) -> tuple:
+    """Bucket codes ordered fastest first and the thresholds between them (midpoints of avg speeds)"""
+    ordered = sorted(speed_ranges, key=lambda code: speed_ranges[code]['avg'], reverse=True)
+    avgs = [speed_ranges[code]['avg'] for code in ordered]
+    thresholds = [(a + b) / 2 for a, b in zip(avgs[:-1], avgs[1:])]
+    return ordered, thresholds
+
+
+def classify_speeds(speeds: np.ndarray, speed_ranges: dict) -> list:
+    codes, thresholds = speed_buckets(speed_ranges)
+    # thresholds descend; count how many each speed falls below
+    index = (np.asarray(speeds)[:, None] < np.array(thresholds)[None, :]).sum(axis=1)
+    return [codes[i] for i in index.tolist()]
+
+
+def segments_in_bbox(arrays, weights: dict, bbox: tuple, speed_ranges: dict) -> dict:
+    """Edges whose extent intersects bbox (west, south, east, north), as plain lists"""
+    west, south, east, north = bbox
+    x1, y1 = arrays.node_x[arrays.u_idx], arrays.node_y[arrays.u_idx]
+    x2, y2 = arrays.node_x[arrays.v_idx], arrays.node_y[arrays.v_idx]
+    inside = ((np.minimum(x1, x2) <= east) & (np.maximum(x1, x2) >= west) &
+              (np.minimum(y1, y2) <= north) & (np.maximum(y1, y2) >= south))
+    ids = np.nonzero(inside)[0]
+    speed = weights['adjusted_speed'][ids]
+    return {
+        'x1': x1[ids].tolist(), 'y1': y1[ids].tolist(),
+        'x2': x2[ids].tolist(), 'y2': y2[ids].tolist(),
+        'speed': np.round(speed, 1).tolist(),
+        'traffic_factor': np.round(weights['traffic_factor'][ids], 3).tolist(),
+        'bucket': classify_speeds(speed, speed_ranges)
+    }
+
+
+EMPTY_SEGMENTS = {key: [] for key in ('x1', 'y1', 'x2', 'y2', 'speed', 'traffic_factor', 'bucket')}
+
+TILE_QUERY = """
+    WITH bounds AS (
+        SELECT ST_TileEnvelope(%(z)s, %(x)s, %(y)s) AS env
+    ),
+    roads AS (
+        SELECT
+            ST_AsMVTGeom(
+                ST_Transform(ST_SetSRID(ST_MakeLine(ST_MakePoint(r.x1, r.y1), ST_MakePoint(r.x2, r.y2)), 4326), 3857),
+                bounds.env, %(extent)s, 64, true
+            ) AS geom,
+            r.speed, r.traffic_factor, r.bucket
+        FROM unnest(
+            %(x1)s::float8[], %(y1)s::float8[], %(x2)s::float8[], %(y2)s::float8[],
+            %(speed)s::float8[], %(traffic_factor)s::float8[], %(bucket)s::text[]
+        ) AS r(x1, y1, x2, y2, speed, traffic_factor, bucket), bounds
+    ),
+    incident_points AS (
+        SELECT
+            ST_AsMVTGeom(ST_Transform(i.geom_indexed, 3857), bounds.env, %(extent)s, 64, true) AS geom,
+            i.id, i.ty, i.d AS description, i.sd::text AS start_time
+        FROM incidents i, bounds
+        WHERE i.geom_indexed && ST_Transform(bounds.env, 4326)
+        AND i.sd > NOW() - INTERVAL '24 hours'
+    )
+    SELECT
+        COALESCE((SELECT ST_AsMVT(roads, 'roads', %(extent)s, 'geom') FROM roads WHERE geom IS NOT NULL), ''::bytea)
+        || COALESCE((SELECT ST_AsMVT(incident_points, 'incidents', %(extent)s, 'geom')
+                     FROM incident_points WHERE geom IS NOT NULL), ''::bytea) AS tile
+"""
+
+
+def render_tile(conn, z: int, x: int, y: int, segments: dict) -> bytes:
+    cursor = conn.cursor()
+    cursor.execute(TILE_QUERY, {'z': z, 'x': x, 'y': y, 'extent': MVT_EXTENT, **segments})
+    tile = cursor.fetchone()[0]
+    cursor.close()
+    return bytes(tile) if tile is not None else b''
+
+
+class TileCache:
+    """LRU of rendered tiles; entries are stamped with the state they were rendered from"""
+
+    def __init__(self, max_entries: int = TILE_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, tile: tuple, stamp: tuple):
+        with self.lock:
+            entry = self.entries.get(tile)
+            if entry is not None and entry[0] == stamp:
+                self.hits += 1
+                self.entries.move_to_end(tile)
+                return entry[1]
+            self.misses += 1
+            return None
+
+    def put(self, tile: tuple, stamp: tuple, data: bytes):
+        with self.lock:
+            self.entries[tile] = (stamp, data)
+            self.entries.move_to_end(tile)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self.entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0
+            }
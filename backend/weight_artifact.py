@@ -0,0 +1,229 @@
+"""
+Versioned, memory-mappable edge weight artifacts
+One flat file: an 8-byte magic, the JSON header length, a JSON header and then
+64-byte aligned arrays. It holds scenario theta and, optionally, road-class
+tables, hourly congestion factors and per-edge speed corrections. The file is
+mapped once per process and its arrays are read-only views over the mapping, so
+every cached optimizer, and every worker process through the page cache, shares
+the same pages. The version id is a checksum of the file contents.
+
+Convert the old pickled theta once:
+    python weight_artifact.py convert --pickle learned_weights.pkl --out learned_weights.wgt
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import struct
+import threading
+from datetime import datetime
+
+import numpy as np
+
+MODULE_DIR = os.path.dirname(os.path.abspath(__file__))
+WEIGHT_ARTIFACT_PATH = os.getenv('WEIGHT_ARTIFACT_PATH', os.path.join(MODULE_DIR, 'learned_weights.wgt'))
+# Where the old pickled theta used to be read from (the working directory, in practice backend/)
+LEGACY_PICKLE_PATHS = ('learned_weights.pkl', os.path.join(MODULE_DIR, 'learned_weights.pkl'))
+ARTIFACT_MAGIC = b'RWGTART1'
+ARTIFACT_FORMAT_VERSION = 1
+ARTIFACT_ALIGN = 64
+ROAD_TABLE_COLUMNS = ('speed', 'fuel_efficiency', 'sensitivity')
+
+
+def _aligned(offset: int) -> int:
+    return -(-offset // ARTIFACT_ALIGN) * ARTIFACT_ALIGN
+
+
+def write_weight_artifact(path: str, theta: dict, road_tables: dict = None, hourly_factors: dict = None,
+                          edge_corrections: dict = None) -> str:
+    """Write an artifact atomically; returns its version id
+
+    road_tables: {column: {road_type: value}} for ROAD_TABLE_COLUMNS (NaN where a class has no value)
+    hourly_factors: {hour: congestion factor}
+    edge_corrections: {(u, v): base speed multiplier}
+    """
+    scenarios = sorted(theta)
+    arrays = {'theta': np.array([np.asarray(theta[s], dtype=np.float64) for s in scenarios])}
+    road_types = []
+    if road_tables:
+        road_types = sorted({rt for table in road_tables.values() for rt in table})
+        arrays['road_table'] = np.array(
+            [[road_tables.get(column, {}).get(rt, np.nan) for column in ROAD_TABLE_COLUMNS] for rt in road_types],
+            dtype=np.float32
+        ).reshape(len(road_types), len(ROAD_TABLE_COLUMNS))
+    if hourly_factors:
+        arrays['hourly_factors'] = np.array([hourly_factors.get(h, np.nan) for h in range(24)], dtype=np.float32)
+    if edge_corrections:
+        # Sorted by (u, v) so lookups are a binary search over the mapped columns
+        keys = sorted(edge_corrections)
+        arrays['edge_u'] = np.array([u for u, _ in keys], dtype=np.int64)
+        arrays['edge_v'] = np.array([v for _, v in keys], dtype=np.int64)
+        arrays['edge_correction'] = np.array([edge_corrections[k] for k in keys], dtype=np.float32)
+
+    layout = {}
+    offset = 0
+    for name, values in arrays.items():
+        offset = _aligned(offset)
+        layout[name] = {'dtype': values.dtype.str, 'shape': list(values.shape), 'offset': offset}
+        offset += values.nbytes
+    header = {
+        'format_version': ARTIFACT_FORMAT_VERSION,
+        'created': datetime.now().isoformat(),
+        'scenarios': scenarios,
+        'road_types': road_types,
+        'road_table_columns': list(ROAD_TABLE_COLUMNS),
+        'arrays': layout
+    }
+    header_bytes = json.dumps(header).encode('utf-8')
+    data_start = _aligned(len(ARTIFACT_MAGIC) + 8 + len(header_bytes))
+
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(ARTIFACT_MAGIC)
+        f.write(struct.pack('<Q', len(header_bytes)))
+        f.write(header_bytes)
+        for name, values in arrays.items():
+            f.write(b'\0' * (data_start + layout[name]['offset'] - f.tell()))
+            f.write(np.ascontiguousarray(values).tobytes())
+    os.replace(tmp, path)
+    return WeightArtifact(path).version
+
+
+class WeightArtifact:
+    """Read-only view of one artifact file; arrays are slices of a single mmap"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.mmap = np.memmap(path, dtype=np.uint8, mode='r')
+        if bytes(self.mmap[:len(ARTIFACT_MAGIC)]) != ARTIFACT_MAGIC:
+            raise ValueError(f"{path} is not a weight artifact")
+        start = len(ARTIFACT_MAGIC)
+        (header_len,) = struct.unpack('<Q', bytes(self.mmap[start:start + 8]))
+        self.header = json.loads(bytes(self.mmap[start + 8:start + 8 + header_len]).decode('utf-8'))
+        if self.header['format_version'] > ARTIFACT_FORMAT_VERSION:
+            raise ValueError(f"{path} has unsupported format version {self.header['format_version']}")
+        data_start = _aligned(start + 8 + header_len)
+        self.arrays = {}
+        for name, spec in self.header['arrays'].items():
+            dtype = np.dtype(spec['dtype'])
+            count = int(np.prod(spec['shape']))
+            offset = data_start + spec['offset']
+            self.arrays[name] = self.mmap[offset:offset + count * dtype.itemsize].view(dtype).reshape(spec['shape'])
+        self.version = hashlib.sha256(self.mmap).hexdigest()[:16]
+
+    def theta(self) -> dict:
+        return {s: np.array(row, dtype=np.float64) for s, row in zip(self.header['scenarios'], self.arrays['theta'])}
+
+    def road_table(self, column: str) -> dict:
+        """{road_type: value} for one ROAD_TABLE_COLUMNS column; classes without a value are left out"""
+        table = self.arrays.get('road_table')
+        if table is None:
+            return {}
+        values = table[:, self.header['road_table_columns'].index(column)].tolist()
+        return {rt: value for rt, value in zip(self.header['road_types'], values) if value == value}
+
+    def hourly_factors(self) -> dict:
+        factors = self.arrays.get('hourly_factors')
+        if factors is None:
+            return {}
+        return {h: value for h, value in enumerate(factors.tolist()) if value == value}
+
+    @property
+    def has_edge_corrections(self) -> bool:
+        return 'edge_correction' in self.arrays
+
+    def edge_corrections(self, u_ids: np.ndarray, v_ids: np.ndarray) -> np.ndarray:
+        """Speed multiplier for each (u, v) edge; 1.0 where the artifact has none"""
+        out = np.ones(len(u_ids), dtype=np.float64)
+        if not self.has_edge_corrections:
+            return out
+        edge_u, edge_v = self.arrays['edge_u'], self.arrays['edge_v']
+        correction = self.arrays['edge_correction']
+        lo = np.searchsorted(edge_u, u_ids, side='left')
+        hi = np.searchsorted(edge_u, u_ids, side='right')
+        # Runs of one tail node are as long as its out-degree, so this loop is short
+        for k in range(int((hi - lo).max(initial=0))):
+            idx = lo + k
+            hit = idx < hi
+            hit[hit] = edge_v[idx[hit]] == v_ids[hit]
+            out[hit] = correction[idx[hit]]
+        return out
+
+    def stats(self) -> dict:
+        return {
+            'version': self.version,
+            'path': self.path,
+            'created': self.header['created'],
+            'scenarios': self.header['scenarios'],
+            'road_types': len(self.header['road_types']),
+            'hourly_factors': 'hourly_factors' in self.arrays,
+            'edge_corrections': len(self.arrays['edge_correction']) if self.has_edge_corrections else 0,
+            'bytes': len(self.mmap)
+        }
+
+
+_loaded = {}
+_load_lock = threading.Lock()
+
+
+def load_weight_artifact(path: str = WEIGHT_ARTIFACT_PATH) -> WeightArtifact:
+    """The process-wide artifact for path, remapped only when the file changes; None if missing"""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    key = os.path.realpath(path)
+    stamp = (st.st_mtime_ns, st.st_size)
+    with _load_lock:
+        cached = _loaded.get(key)
+        if cached is None or cached[0] != stamp:
+            artifact = WeightArtifact(path)
+            _loaded[key] = (stamp, artifact)
+            print(f"✓ Loaded weight artifact {path} (version {artifact.version})")
+            return artifact
+        return cached[1]
+
+
+def check_legacy_pickle(path: str = WEIGHT_ARTIFACT_PATH) -> str:
+    """Warn when a pickled theta exists but no artifact does; returns the pickle's path, if any"""
+    if os.path.exists(path):
+        return None
+    for legacy in LEGACY_PICKLE_PATHS:
+        if os.path.exists(legacy):
+            print(f"⚠ {os.path.abspath(legacy)} is no longer loaded and default weights are in use. "
+                  f"Convert it with: python weight_artifact.py convert --pickle {legacy} --out {path}")
+            return legacy
+    return None
+
+
+def convert_pickle(pickle_path: str, out_path: str) -> str:
+    """One-off migration of a pickled {scenario: theta} file"""
+    import pickle
+
+    with open(pickle_path, 'rb') as f:
+        theta = pickle.load(f)
+    version = write_weight_artifact(out_path, theta)
+    print(f"✅ Wrote {out_path} (version {version}) from {pickle_path}")
+    return version
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Edge weight artifacts")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    convert = sub.add_parser('convert', help='Convert a pickled theta file')
+    convert.add_argument('--pickle', required=True, help='Path to learned_weights.pkl')
+    convert.add_argument('--out', default=WEIGHT_ARTIFACT_PATH)
+
+    sub.add_parser('inspect', help='Show an artifact header').add_argument('path', nargs='?', default=WEIGHT_ARTIFACT_PATH)
+
+    args = parser.parse_args()
+    if args.command == 'convert':
+        convert_pickle(args.pickle, args.out)
+    else:
+        print(json.dumps(WeightArtifact(args.path).stats(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
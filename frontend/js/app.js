@@ -7,6 +7,9 @@ let sourceLocation = null;
 let destinationLocation = null;
 let routeData = null;
 let navigationMapHtml = null;
+let navigationGeometry = null;
+let previewMap = null;
+let navigationMap = null;
 let selectedRouteIndex = null;
 let navigating = false;
 
@@ -249,7 +252,7 @@ function displayRoutes(data) {
         routeResults.appendChild(routeCard);
     });
     
-    // Show all routes preview map
+    // Show all routes preview map (drawn client-side from encoded polylines)
     const previewCard = document.createElement('div');
     previewCard.className = 'route-card map-preview-card';
     previewCard.innerHTML = `
@@ -257,7 +260,9 @@ function displayRoutes(data) {
             <h3>🗺️ All Routes Preview</h3>
         </div>
         <div class="map-preview-container">
-            <iframe srcdoc="${escapeHtml(data.map_html)}" style="width:100%; height:500px; border:none; border-radius:8px;"></iframe>
+            ${data.map_html
+                ? `<iframe srcdoc="${escapeHtml(data.map_html)}" style="width:100%; height:500px; border:none; border-radius:8px;"></iframe>`
+                : '<div id="routes-preview-map" style="width:100%; height:500px; border-radius:8px;"></div>'}
         </div>
         <p class="text-muted" style="margin-top:1rem; font-size:0.9rem;">
             💡 Click "Start Navigation" on any route to see detailed navigation with moving car emoji
@@ -265,6 +270,12 @@ function displayRoutes(data) {
     `;
     routeResults.appendChild(previewCard);
     
+    RouteMap.destroy(previewMap);
+    previewMap = null;
+    if (!data.map_html) {
+        previewMap = RouteMap.showRoutes('routes-preview-map', data, sourceLocation, destinationLocation);
+    }
+    
     resultsSection.style.display = 'block';
     resultsSection.scrollIntoView({ behavior: 'smooth' });
 }
@@ -308,8 +319,9 @@ async function startNavigation(routeIndex) {
         
         const data = await response.json();
         
-        if (data.map_html) {
-            navigationMapHtml = data.map_html;
+        if (data.geometry || data.map_html) {
+            navigationGeometry = data.geometry || null;
+            navigationMapHtml = data.map_html || null;
             navigating = true;
             displayNavigationView();
         } else {
@@ -333,9 +345,16 @@ function displayNavigationView() {
     }
     
     // Display navigation map
-    mapContainer.innerHTML = `
-        <iframe srcdoc="${escapeHtml(navigationMapHtml)}" style="width:100%; height:100%; border:none;"></iframe>
-    `;
+    RouteMap.destroy(navigationMap);
+    navigationMap = null;
+    if (navigationMapHtml) {
+        mapContainer.innerHTML = `
+            <iframe srcdoc="${escapeHtml(navigationMapHtml)}" style="width:100%; height:100%; border:none;"></iframe>
+        `;
+    } else {
+        mapContainer.innerHTML = '<div id="navigation-map" style="width:100%; height:100%;"></div>';
+        navigationMap = RouteMap.showNavigation('navigation-map', navigationGeometry, sourceLocation, destinationLocation);
+    }
     
     // Update navigation info
     const metric = routeData.metrics[selectedRouteIndex];
@@ -357,6 +376,9 @@ function displayNavigationView() {
 function stopNavigation() {
     navigating = false;
     navigationMapHtml = null;
+    navigationGeometry = null;
+    RouteMap.destroy(navigationMap);
+    navigationMap = null;
     
     // Show start button, hide stop button
     const startBtn = document.querySelector('.btn-start');
@@ -0,0 +1,258 @@
+// Leaflet rendering for compact route payloads (encoded polylines + speed arrays)
+// Replaces the server-rendered folium HTML; this file is static and cacheable.
+
+const RouteMap = (() => {
+    const ROUTE_COLORS = ['#0066ff', '#00cc66', '#cc6600'];
+    const SPEED_COLORS = {
+        B: '#0066ff',
+        O: '#ff9900',
+        R: '#ff0000',
+        DR: '#8b0000',
+        RC: '#660000'
+    };
+    const LEGEND_ITEMS = [
+        ['#0066ff', 'Normal (25 km/h)'],
+        ['#ff9900', 'Moderate (18 km/h)'],
+        ['#ff0000', 'Heavy (12 km/h)'],
+        ['#8b0000', 'Severe (8 km/h)'],
+        ['#660000', 'Blocked (2 km/h)']
+    ];
+    const TILE_URL = 'https://{s}.tile.openstreetmap.org/{z}/{x}/{y}.png';
+
+    function decodePolyline(encoded, precision = 6) {
+        const factor = Math.pow(10, precision);
+        const coords = [];
+        let index = 0, lat = 0, lng = 0;
+        while (index < encoded.length) {
+            const deltas = [];
+            for (let k = 0; k < 2; k++) {
+                let shift = 0, result = 0, b;
+                do {
+                    b = encoded.charCodeAt(index++) - 63;
+                    result |= (b & 0x1f) << shift;
+                    shift += 5;
+                } while (b >= 0x20);
+                deltas.push(result & 1 ? ~(result >> 1) : result >> 1);
+            }
+            lat += deltas[0];
+            lng += deltas[1];
+            coords.push([lat / factor, lng / factor]);
+        }
+        return coords;
+    }
+
+    function createMap(container, center, zoom) {
+        const map = L.map(container).setView(center, zoom);
+        L.tileLayer(TILE_URL, {
+            maxZoom: 19,
+            attribution: '&copy; OpenStreetMap contributors'
+        }).addTo(map);
+        return map;
+    }
+
+    function emojiMarker(latlng, emoji, tooltip) {
+        return L.marker(latlng, {
+            icon: L.divIcon({
+                html: `<div style="font-size: 26px;">${emoji}</div>`,
+                iconSize: [30, 30],
+                iconAnchor: [15, 15],
+                className: ''
+            })
+        }).bindTooltip(tooltip);
+    }
+
+    function addLegend(map, title, items, position) {
+        const legend = L.control({position});
+        legend.onAdd = () => {
+            const div = L.DomUtil.create('div');
+            div.innerHTML = `
+                <div style="background: white; padding: 15px; border-radius: 10px; box-shadow: 0 4px 8px rgba(0,0,0,0.2); width: 190px;">
+                    <p style="margin: 0 0 12px 0; font-weight: bold; font-size: 14px;">${title}</p>
+                    ${items.map(([color, label]) => `
+                        <div style="margin: 8px 0; font-size: 12px;">
+                            <div style="width: 20px; height: 20px; background: ${color}; border-radius: 50%; display: inline-block; margin-right: 8px; vertical-align: middle;"></div>
+                            ${label}
+                        </div>
+                    `).join('')}
+                </div>`;
+            return div;
+        };
+        legend.addTo(map);
+    }
+
+    function addIncident(map, inc, radius, withAffected) {
+        const color = SPEED_COLORS[inc.severity] || SPEED_COLORS.O;
+        let popup = `<b>${inc.icon} ${inc.type}</b><br>${inc.description || ''}<br>Speed: ${inc.speed} km/h`;
+        if (withAffected) popup += `<br>Affected: ${inc.affected_distance}m`;
+        L.circleMarker([inc.lat, inc.lng], {
+            radius,
+            color,
+            fill: true,
+            fillColor: color,
+            fillOpacity: 0.9
+        }).bindPopup(popup).bindTooltip(`${inc.icon} ${inc.type}`).addTo(map);
+    }
+
+    // All candidate routes with their (deduplicated) incidents
+    function showRoutes(container, data, src, dst) {
+        const precision = data.polyline_precision || 6;
+        const map = createMap(container, [(src.lat + dst.lat) / 2, (src.lon + dst.lon) / 2], 13);
+        const bounds = [];
+
+        data.geometry.forEach((encoded, idx) => {
+            const coords = decodePolyline(encoded, precision);
+            if (!coords.length) return;
+            const metrics = data.metrics[idx] || {};
+            L.polyline(coords, {
+                color: ROUTE_COLORS[idx % ROUTE_COLORS.length],
+                weight: 6,
+                opacity: 0.7
+            }).bindTooltip(`
+                <b>Route ${idx + 1}</b><br>
+                Time: ${(metrics.time_minutes || 0).toFixed(1)} min<br>
+                Distance: ${(metrics.distance_km || 0).toFixed(2)} km<br>
+                Incidents: ${metrics.incident_count || 0}
+            `).addTo(map);
+            bounds.push(...coords);
+        });
+
+        const seen = new Set();
+        (data.incidents || []).flat().forEach(inc => {
+            if (seen.has(inc.id)) return;
+            seen.add(inc.id);
+            addIncident(map, inc, 10, false);
+        });
+
+        emojiMarker([src.lat, src.lon], '🟢', 'Start').addTo(map);
+        emojiMarker([dst.lat, dst.lon], '🔴', 'Destination').addTo(map);
+        addLegend(map, '🚦 Traffic Incidents', LEGEND_ITEMS.slice(1), 'bottomright');
+        if (bounds.length) map.fitBounds(bounds, {padding: [20, 20]});
+        return map;
+    }
+
+    // Selected route with a car moving at each segment's speed
+    function showNavigation(container, geometry, src, dst) {
+        const routeCoords = decodePolyline(geometry.polyline, geometry.polyline_precision || 6);
+        const segmentSpeeds = geometry.segment_speeds;
+        const totalTime = geometry.total_time_seconds;
+        const map = createMap(container, [(src.lat + dst.lat) / 2, (src.lon + dst.lon) / 2], 14);
+
+        L.polyline(routeCoords, {color: '#0066ff', weight: 10, opacity: 0.9}).bindTooltip('Your Route').addTo(map);
+        (geometry.incidents || []).forEach(inc => addIncident(map, inc, 12, true));
+        emojiMarker([src.lat, src.lon], '🟢', 'Start').addTo(map);
+        emojiMarker([dst.lat, dst.lon], '🏁', 'Destination').addTo(map);
+        addLegend(map, '🚦 Traffic Conditions', LEGEND_ITEMS, 'bottomleft');
+        if (routeCoords.length) map.fitBounds(routeCoords, {padding: [20, 20]});
+
+        const animation = {map, frame: null, stopped: false};
+        if (routeCoords.length < 2) return animation;
+
+        const durations = [];
+        for (let i = 0; i < routeCoords.length - 1; i++) {
+            const lat1 = routeCoords[i][0] * Math.PI / 180;
+            const lat2 = routeCoords[i + 1][0] * Math.PI / 180;
+            const dLat = (routeCoords[i + 1][0] - routeCoords[i][0]) * Math.PI / 180;
+            const dLon = (routeCoords[i + 1][1] - routeCoords[i][1]) * Math.PI / 180;
+            const a = Math.sin(dLat / 2) ** 2 + Math.cos(lat1) * Math.cos(lat2) * Math.sin(dLon / 2) ** 2;
+            const distance = 6371 * 2 * Math.atan2(Math.sqrt(a), Math.sqrt(1 - a));
+            durations.push((distance / (segmentSpeeds[i] || 25)) * 3600 * 1000);
+        }
+
+        const carMarker = L.marker(routeCoords[0], {
+            icon: L.divIcon({
+                html: '<div style="font-size: 32px; filter: drop-shadow(2px 2px 4px rgba(0,0,0,0.3));">🚗</div>',
+                iconSize: [40, 40],
+                iconAnchor: [20, 20],
+                className: ''
+            })
+        }).addTo(map);
+
+        const display = L.control({position: 'topright'});
+        display.onAdd = () => {
+            const div = L.DomUtil.create('div');
+            div.innerHTML = `
+                <div style="background:white;padding:20px;border-radius:10px;box-shadow:0 4px 12px rgba(0,0,0,0.3);font-family:Arial">
+                    <div style="display:flex;align-items:center;margin-bottom:15px">
+                        <div style="font-size:40px;margin-right:15px">🚗</div>
+                        <div><div style="color:#666;font-size:12px;text-transform:uppercase">Current Speed</div>
+                        <div class="nav-speed" style="font-size:36px;font-weight:bold;color:#0066ff">${segmentSpeeds[0]} <span style="font-size:20px">km/h</span></div></div>
+                    </div>
+                    <div style="border-top:2px solid #eee;padding-top:15px">
+                        <div style="color:#666;font-size:12px;text-transform:uppercase">Time Remaining</div>
+                        <div class="nav-eta" style="font-size:24px;font-weight:600;color:#333">${Math.floor(totalTime / 60)} min</div>
+                    </div>
+                    <div style="margin-top:10px;"><button class="nav-pause" style="background:#0066ff;color:white;border:none;padding:8px 16px;border-radius:5px;cursor:pointer;font-size:12px;">⏸️ Pause</button></div>
+                </div>`;
+            L.DomEvent.disableClickPropagation(div);
+            return div;
+        };
+        display.addTo(map);
+        const panel = display.getContainer();
+        const spdElem = panel.querySelector('.nav-speed');
+        const etaElem = panel.querySelector('.nav-eta');
+        const pauseBtn = panel.querySelector('.nav-pause');
+
+        let startTime = Date.now();
+        let pausedAt = null;
+
+        pauseBtn.addEventListener('click', () => {
+            if (pausedAt === null) {
+                pausedAt = Date.now();
+                pauseBtn.innerHTML = '▶️ Resume';
+            } else {
+                startTime += Date.now() - pausedAt;
+                pausedAt = null;
+                pauseBtn.innerHTML = '⏸️ Pause';
+                animate();
+            }
+        });
+
+        function animate() {
+            if (pausedAt !== null || animation.stopped) return;
+            const elapsed = Date.now() - startTime;
+
+            let totalElapsed = 0;
+            let seg = 0;
+            while (seg < durations.length && totalElapsed + durations[seg] <= elapsed) {
+                totalElapsed += durations[seg];
+                seg++;
+            }
+
+            if (seg >= durations.length) {
+                carMarker.setLatLng(routeCoords[routeCoords.length - 1]);
+                etaElem.innerHTML = '🎉 Arrived!';
+                spdElem.innerHTML = '0 <span style="font-size:20px">km/h</span>';
+                pauseBtn.style.display = 'none';
+                return;
+            }
+
+            const progress = Math.min((elapsed - totalElapsed) / durations[seg], 1);
+            const start = routeCoords[seg];
+            const end = routeCoords[seg + 1];
+            carMarker.setLatLng([
+                start[0] + (end[0] - start[0]) * progress,
+                start[1] + (end[1] - start[1]) * progress
+            ]);
+
+            spdElem.innerHTML = `${segmentSpeeds[seg]} <span style="font-size:20px">km/h</span>`;
+            const remaining = totalTime - elapsed / 1000;
+            const mins = Math.max(0, Math.floor(remaining / 60));
+            const secs = Math.max(0, Math.floor(remaining % 60));
+            etaElem.innerHTML = `${mins}:${secs < 10 ? '0' : ''}${secs}`;
+
+            animation.frame = requestAnimationFrame(animate);
+        }
+
+        animate();
+        return animation;
+    }
+
+    function destroy(handle) {
+        if (!handle) return;
+        handle.stopped = true;
+        if (handle.frame) cancelAnimationFrame(handle.frame);
+        (handle.map || handle).remove();
+    }
+
+    return {decodePolyline, showRoutes, showNavigation, destroy};
+})();